@@ -3,20 +3,87 @@ from uagents_core.contrib.protocols.chat import (
     ChatMessage,
     ChatAcknowledgement,
     TextContent,
+    MetadataContent,
     StartSessionContent,
     chat_protocol_spec
 )
-from datetime import datetime
+from datetime import date, datetime
 from uuid import uuid4
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+import copy
+import hashlib
+import json
 import logging
 
-from models.messages import BOMCostingRequest, BOMCostingResponse
+from models.messages import (
+    BOMCostingRequest,
+    BOMCostingResponse,
+    CollectionBOMRequest,
+    CollectionBOMResponse
+)
 from utils.config import Config
 from utils.helpers import get_current_timestamp, format_currency
+from utils.metta_facts import get_entities, first_number
+from utils.sku_matrix import largest_remainder
+from utils.rate_cards import DateLike, RateCard, build_rate_card, get_rate_card_index, rate_card_warning
+from utils.query_extractor import extract_query_fields
+from utils.response_format import JSON_MEDIA_TYPE, encode_json, wants_structured_response
 
 logger = logging.getLogger(__name__)
 
+FALLBACK_RATE_CARD = build_rate_card("built-in", date(2025, 1, 1), {
+    "fabric_prices": {
+        "cotton-jersey-180gsm": 5.80,
+        "recycled-polyester-performance": 7.20,
+        "organic-cotton-twill": 9.50,
+        "merino-wool-blend": 18.50,
+        "tencel-lyocell-jersey": 10.80
+    },
+    "labor_rates": {
+        "EcoKnits-Tirupur": 0.65,
+        "VietnamTex-HoChiMinh": 0.75,
+        "PortugalPremium-Porto": 2.20,
+        "ChinaScale-Guangzhou": 0.45,
+        "MakersRow-LosAngeles": 3.50,
+        "BangladeshValue-Dhaka": 0.35
+    },
+    "overhead_rates": {
+        "EcoKnits-Tirupur": 0.16,
+        "VietnamTex-HoChiMinh": 0.15,
+        "PortugalPremium-Porto": 0.18,
+        "ChinaScale-Guangzhou": 0.14,
+        "MakersRow-LosAngeles": 0.22,
+        "BangladeshValue-Dhaka": 0.12
+    },
+    "profit_rates": {
+        "EcoKnits-Tirupur": 0.10,
+        "VietnamTex-HoChiMinh": 0.12,
+        "PortugalPremium-Porto": 0.15,
+        "ChinaScale-Guangzhou": 0.08,
+        "MakersRow-LosAngeles": 0.18,
+        "BangladeshValue-Dhaka": 0.07
+    },
+    "freight_costs": {
+        "EcoKnits-Tirupur": 3.60,
+        "VietnamTex-HoChiMinh": 3.40,
+        "PortugalPremium-Porto": 8.50,
+        "ChinaScale-Guangzhou": 3.15,
+        "MakersRow-LosAngeles": 1.20,
+        "BangladeshValue-Dhaka": 3.35
+    },
+    "duty_rates": {
+        "t-shirt-basic": 0.16,
+        "hoodie-pullover": 0.16,
+        "jogger-pants": 0.165,
+        "leggings-activewear": 0.16,
+        "jacket-bomber": 0.165
+    }
+})
+
+COLLECTION_CACHE_SIZE = 128
+
+_collection_cost_cache: Dict[str, Dict] = {}
+
 
 def create_bom_costing_agent(metta_kb, moq_negotiation_address: str):
     agent = Agent(
@@ -37,6 +104,8 @@ def create_bom_costing_agent(metta_kb, moq_negotiation_address: str):
             acknowledged_msg_id=msg.msg_id
         ))
 
+        structured = wants_structured_response(msg.content)
+
         for item in msg.content:
             if isinstance(item, StartSessionContent):
                 logger.info(f"Starting BOM costing session with {sender}")
@@ -90,113 +159,138 @@ Example: "Calculate BOM for hoodie-pullover, 500 units, cotton jersey"
                     parsed_request.get("size", "m"),
                     parsed_request.get("fabric", "cotton-jersey-180gsm"),
                     parsed_request.get("supplier", "EcoKnits-Tirupur"),
-                    parsed_request.get("units", 500)
+                    parsed_request.get("units", 500),
+                    as_of=parsed_request.get("as_of")
                 )
 
-                formatted_response = format_bom_response(bom_result)
+                if structured:
+                    structured_response = build_bom_costing_response(str(msg.msg_id), bom_result)
+                    content = [
+                        MetadataContent(metadata={"content-type": JSON_MEDIA_TYPE}),
+                        TextContent(type="text", text=encode_json(structured_response))
+                    ]
+                else:
+                    content = [TextContent(type="text", text=format_bom_response(bom_result))]
 
                 response = ChatMessage(
                     timestamp=datetime.utcnow(),
                     msg_id=uuid4(),
-                    content=[TextContent(type="text", text=formatted_response)]
+                    content=content
                 )
                 await ctx.send(sender, response)
 
+    @agent.on_message(BOMCostingRequest)
+    async def handle_bom_request(ctx: Context, sender: str, msg: BOMCostingRequest):
+        logger.info(f"BOM Costing Specialist: Structured costing request from {sender}")
+
+        bom_result = calculate_complete_bom(
+            metta_kb,
+            msg.garment_type,
+            msg.size,
+            msg.fabric_type,
+            msg.supplier,
+            msg.units,
+            as_of=msg.as_of
+        )
+
+        await ctx.send(sender, build_bom_costing_response(msg.request_id, bom_result))
+        logger.info(f"Sent BOM costing: ${bom_result['landed_cost_total']:.2f} landed per unit")
+
+    @agent.on_message(CollectionBOMRequest)
+    async def handle_collection_request(ctx: Context, sender: str, msg: CollectionBOMRequest):
+        logger.info(f"BOM Costing Specialist: Collection costing request from {sender}")
+        logger.info(f"Collection: {msg.collection_id}, Styles: {len(msg.styles)}, Supplier: {msg.supplier}")
+
+        collection = calculate_collection_bom(
+            metta_kb,
+            msg.styles,
+            msg.supplier,
+            msg.collection_id,
+            msg.collection_version,
+            as_of=msg.as_of
+        )
+
+        response = CollectionBOMResponse(
+            request_id=msg.request_id,
+            collection_id=collection["collection_id"],
+            collection_version=collection["collection_version"],
+            supplier=collection["supplier"],
+            fabric_pools=collection["fabric_pools"],
+            styles=collection["styles"],
+            total_units=collection["total_units"],
+            pooled_fabric_cost=collection["pooled_fabric_cost"],
+            standalone_fabric_cost=collection["standalone_fabric_cost"],
+            fabric_savings=collection["fabric_savings"],
+            fob_cost_total=collection["fob_cost_total"],
+            landed_cost_total=collection["landed_cost_total"],
+            timestamp=get_current_timestamp(),
+            rate_card_warning=collection["rate_card_warning"]
+        )
+
+        await ctx.send(sender, response)
+        logger.info(f"Sent collection costing: {len(collection['fabric_pools'])} fabric pools, ${collection['fabric_savings']:,.2f} fabric savings")
+
     agent.include(chat_proto, publish_manifest=True)
     return agent
 
 
 def parse_bom_request(user_query: str) -> Dict:
-    request = {}
-
-    garment_keywords = {
-        "t-shirt": "t-shirt-basic",
-        "tshirt": "t-shirt-basic",
-        "tee": "t-shirt-basic",
-        "hoodie": "hoodie-pullover",
-        "pullover": "hoodie-pullover",
-        "jogger": "jogger-pants",
-        "pants": "jogger-pants",
-        "legging": "leggings-activewear",
-        "leggings": "leggings-activewear",
-        "jacket": "jacket-bomber",
-        "bomber": "jacket-bomber"
-    }
+    fields = extract_query_fields(user_query)
 
-    for keyword, garment_type in garment_keywords.items():
-        if keyword in user_query:
-            request["garment_type"] = garment_type
-            break
-
-    sizes = ["xs", "s", "m", "l", "xl", "xxl"]
-    for size in sizes:
-        if f" {size} " in f" {user_query} " or f"size {size}" in user_query:
-            request["size"] = size
-            break
-
-    if "cotton" in user_query and "jersey" in user_query:
-        request["fabric"] = "cotton-jersey-180gsm"
-    elif "recycled" in user_query and "polyester" in user_query:
-        request["fabric"] = "recycled-polyester-performance"
-    elif "organic" in user_query and "twill" in user_query:
-        request["fabric"] = "organic-cotton-twill"
-
-    supplier_keywords = {
-        "india": "EcoKnits-Tirupur",
-        "tirupur": "EcoKnits-Tirupur",
-        "vietnam": "VietnamTex-HoChiMinh",
-        "portugal": "PortugalPremium-Porto",
-        "china": "ChinaScale-Guangzhou",
-        "los angeles": "MakersRow-LosAngeles",
-        "usa": "MakersRow-LosAngeles"
+    request = {
+        key: fields[key]
+        for key in ("garment_type", "size", "fabric", "supplier", "units")
+        if key in fields
     }
 
-    for keyword, supplier in supplier_keywords.items():
-        if keyword in user_query:
-            request["supplier"] = supplier
-            break
-
-    import re
-    units_match = re.search(r'(\d+)\s*units?', user_query)
-    if units_match:
-        request["units"] = int(units_match.group(1))
+    if "date" in fields:
+        request["as_of"] = fields["date"]
 
     return request
 
 
+def get_rate_card(as_of: DateLike = None) -> RateCard:
+    return get_rate_card_index().as_of(as_of) or FALLBACK_RATE_CARD
+
+
 def calculate_complete_bom(metta_kb, garment_type: str, size: str,
-                           fabric: str, supplier: str, units: int) -> Dict:
+                           fabric: str, supplier: str, units: int,
+                           fabric_cost: Optional[float] = None,
+                           as_of: DateLike = None) -> Dict:
 
-    logger.info(f"Calculating BOM: {garment_type}, {size}, {fabric}, {supplier}, {units} units")
+    rates = get_rate_card(as_of)
+
+    logger.info(f"Calculating BOM: {garment_type}, {size}, {fabric}, {supplier}, {units} units (rate card {rates.version})")
 
     fabric_consumption = calculate_fabric_consumption(
         metta_kb, garment_type, size, fabric
     )
 
-    fabric_cost = calculate_fabric_cost(
-        metta_kb, fabric, fabric_consumption
-    )
+    if fabric_cost is None:
+        fabric_cost = calculate_fabric_cost(
+            metta_kb, fabric, fabric_consumption, rates
+        )
 
     trim_costs = calculate_trim_costs(
         metta_kb, garment_type
     )
 
     labor_cost = calculate_labor_cost(
-        metta_kb, garment_type, supplier
+        metta_kb, garment_type, supplier, rates
     )
 
     overhead_profit = calculate_overhead_profit(
-        metta_kb, supplier, fabric_cost + trim_costs["total"] + labor_cost
+        metta_kb, supplier, fabric_cost + trim_costs["total"] + labor_cost, rates
     )
 
     fob_cost = (fabric_cost + trim_costs["total"] + labor_cost +
                 overhead_profit["overhead"] + overhead_profit["profit"])
 
     landed_cost = calculate_landed_cost(
-        metta_kb, fob_cost, supplier, units, garment_type
+        metta_kb, fob_cost, supplier, units, garment_type, rates
     )
 
-    pricing = calculate_pricing_recommendations(landed_cost)
+    pricing = calculate_pricing_recommendations(landed_cost["total"])
 
     return {
         "garment_type": garment_type,
@@ -213,7 +307,10 @@ def calculate_complete_bom(metta_kb, garment_type: str, size: str,
         "fob_cost": fob_cost,
         "landed_cost_breakdown": landed_cost,
         "landed_cost_total": landed_cost["total"],
-        "pricing_recommendations": pricing
+        "pricing_recommendations": pricing,
+        "rate_card_version": rates.version,
+        "rate_card_effective_date": rates.effective_date.isoformat(),
+        "rate_card_warning": rate_card_warning(rates, as_of)
     }
 
 
@@ -267,22 +364,208 @@ def calculate_fabric_consumption(metta_kb, garment_type: str, size: str, fabric:
     return round(total_meters, 2)
 
 
-def calculate_fabric_cost(metta_kb, fabric: str, meters: float) -> float:
+def calculate_fabric_cost(metta_kb, fabric: str, meters: float,
+                          rates: Optional[RateCard] = None) -> float:
 
-    fabric_prices = {
-        "cotton-jersey-180gsm": 5.80,
-        "recycled-polyester-performance": 7.20,
-        "organic-cotton-twill": 9.50,
-        "merino-wool-blend": 18.50,
-        "tencel-lyocell-jersey": 10.80
-    }
-
-    price_per_meter = fabric_prices.get(fabric, 6.00)
+    rates = rates or get_rate_card()
+    price_per_meter = rates.fabric_prices.get(fabric, 6.00)
     total_cost = meters * price_per_meter
 
     return round(total_cost, 2)
 
 
+def get_fabric_sourcing_terms(fabric: str, rates: Optional[RateCard] = None) -> Dict:
+    rates = rates or get_rate_card()
+    attributes = get_entities("materials_database.metta", "fabric").get(fabric, {})
+
+    if fabric in rates.fabric_prices:
+        price_per_meter = rates.fabric_prices[fabric]
+    else:
+        price_per_meter = first_number(attributes.get("price-per-meter"), 6.00)
+
+    return {
+        "price_per_meter": price_per_meter,
+        "moq_meters": first_number(attributes.get("moq-meters"), 0),
+        "volume_tiers": get_fabric_volume_tiers()
+    }
+
+
+def get_fabric_volume_tiers() -> List[Tuple[float, float]]:
+    strategy = get_entities("supplier_intelligence.metta", "fabric-consolidation-strategy").get("single-base-fabric", {})
+
+    tiers = []
+    for tier in strategy.get("volume-price-tiers", []):
+        if isinstance(tier, list) and len(tier) >= 2:
+            min_meters = first_number(tier[:1])
+            discount_pct = first_number(tier[1:2])
+            if min_meters is not None and discount_pct is not None:
+                tiers.append((min_meters, discount_pct / 100))
+
+    return sorted(tiers)
+
+
+def price_fabric_order(terms: Dict, required_meters: float) -> Dict:
+    order_meters = max(required_meters, terms["moq_meters"])
+
+    discount = 0.0
+    for min_meters, tier_discount in terms["volume_tiers"]:
+        if order_meters >= min_meters:
+            discount = tier_discount
+
+    price_per_meter = terms["price_per_meter"] * (1 - discount)
+
+    return {
+        "required_meters": round(required_meters, 2),
+        "order_meters": round(order_meters, 2),
+        "moq_overbuy_meters": round(order_meters - required_meters, 2),
+        "volume_discount_pct": round(discount * 100, 1),
+        "price_per_meter": round(price_per_meter, 4),
+        "total_cost": round(order_meters * price_per_meter, 2)
+    }
+
+
+def calculate_collection_bom(metta_kb, styles: List[Dict], supplier: str,
+                             collection_id: str = "collection",
+                             collection_version: Optional[str] = None,
+                             as_of: DateLike = None) -> Dict:
+
+    rates = get_rate_card(as_of)
+    version = collection_version or fingerprint_collection(styles, supplier)
+    cache_key = f"{collection_id}:{version}:{rates.version}"
+
+    cached = _collection_cost_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Collection costing cache hit: {cache_key}")
+        return {**copy.deepcopy(cached), "rate_card_warning": rate_card_warning(rates, as_of)}
+
+    style_lines = []
+    pools = {}
+
+    for index, style in enumerate(styles):
+        style_id = style.get("style_id", f"style-{index + 1}")
+        garment_type = style["garment_type"]
+        fabric = style.get("fabric", "cotton-jersey-180gsm")
+        size = style.get("size", "m")
+
+        colors = style.get("colors")
+        if isinstance(colors, dict):
+            color_units = {color: int(units) for color, units in colors.items()}
+        elif colors:
+            split = largest_remainder(int(style.get("units", 0)), [1] * len(colors))
+            color_units = {color: int(units) for color, units in zip(colors, split)}
+        else:
+            color_units = {"default": int(style.get("units", 0))}
+
+        units = sum(color_units.values())
+        meters_per_unit = calculate_fabric_consumption(metta_kb, garment_type, size, fabric)
+        style_meters = meters_per_unit * units
+
+        pool = pools.setdefault(fabric, {"required_meters": 0.0, "colors": {}, "styles": {}})
+        pool["required_meters"] += style_meters
+        pool["styles"][style_id] = style_meters
+        for color, color_qty in color_units.items():
+            pool["colors"][color] = pool["colors"].get(color, 0.0) + meters_per_unit * color_qty
+
+        style_lines.append({
+            "style_id": style_id,
+            "garment_type": garment_type,
+            "fabric": fabric,
+            "size": size,
+            "supplier": style.get("supplier", supplier),
+            "units": units,
+            "color_units": color_units,
+            "meters_per_unit": meters_per_unit,
+            "fabric_meters": style_meters
+        })
+
+    fabric_pools = []
+    for fabric, pool in pools.items():
+        terms = get_fabric_sourcing_terms(fabric, rates)
+        pooled = price_fabric_order(terms, pool["required_meters"])
+
+        standalone_cost = sum(
+            price_fabric_order(terms, meters)["total_cost"] for meters in pool["styles"].values()
+        )
+
+        pool["pooled"] = pooled
+        fabric_pools.append({
+            "fabric": fabric,
+            "moq_meters": terms["moq_meters"],
+            "styles": list(pool["styles"].keys()),
+            "color_meters": {color: round(meters, 2) for color, meters in pool["colors"].items()},
+            **pooled,
+            "standalone_cost": round(standalone_cost, 2),
+            "savings": round(standalone_cost - pooled["total_cost"], 2)
+        })
+
+    costed_styles = []
+    for line in style_lines:
+        pool = pools[line["fabric"]]
+        share = line["fabric_meters"] / pool["required_meters"] if pool["required_meters"] > 0 else 0
+        allocated_cost = pool["pooled"]["total_cost"] * share
+        fabric_cost_per_unit = allocated_cost / line["units"] if line["units"] > 0 else 0
+
+        standalone = price_fabric_order(get_fabric_sourcing_terms(line["fabric"], rates), line["fabric_meters"])
+        standalone_per_unit = standalone["total_cost"] / line["units"] if line["units"] > 0 else 0
+
+        bom = calculate_complete_bom(
+            metta_kb,
+            line["garment_type"],
+            line["size"],
+            line["fabric"],
+            line["supplier"],
+            line["units"],
+            fabric_cost=round(fabric_cost_per_unit, 2),
+            as_of=rates.effective_date
+        )
+
+        costed_styles.append({
+            "style_id": line["style_id"],
+            "garment_type": line["garment_type"],
+            "fabric": line["fabric"],
+            "supplier": line["supplier"],
+            "units": line["units"],
+            "color_units": line["color_units"],
+            "fabric_meters": round(line["fabric_meters"], 2),
+            "pool_share_pct": round(share * 100, 1),
+            "allocated_fabric_cost": round(allocated_cost, 2),
+            "fabric_cost_per_unit": round(fabric_cost_per_unit, 2),
+            "standalone_fabric_cost_per_unit": round(standalone_per_unit, 2),
+            "fob_cost": bom["fob_cost"],
+            "landed_cost_per_unit": bom["landed_cost_total"],
+            "bom": bom
+        })
+
+    pooled_fabric_cost = sum(pool["total_cost"] for pool in fabric_pools)
+    standalone_fabric_cost = sum(pool["standalone_cost"] for pool in fabric_pools)
+
+    result = {
+        "collection_id": collection_id,
+        "collection_version": version,
+        "rate_card_version": rates.version,
+        "supplier": supplier,
+        "fabric_pools": fabric_pools,
+        "styles": costed_styles,
+        "total_units": sum(style["units"] for style in costed_styles),
+        "pooled_fabric_cost": round(pooled_fabric_cost, 2),
+        "standalone_fabric_cost": round(standalone_fabric_cost, 2),
+        "fabric_savings": round(standalone_fabric_cost - pooled_fabric_cost, 2),
+        "fob_cost_total": round(sum(style["fob_cost"] * style["units"] for style in costed_styles), 2),
+        "landed_cost_total": round(sum(style["landed_cost_per_unit"] * style["units"] for style in costed_styles), 2)
+    }
+
+    if len(_collection_cost_cache) >= COLLECTION_CACHE_SIZE:
+        _collection_cost_cache.pop(next(iter(_collection_cost_cache)))
+    _collection_cost_cache[cache_key] = copy.deepcopy(result)
+
+    return {**result, "rate_card_warning": rate_card_warning(rates, as_of)}
+
+
+def fingerprint_collection(styles: List[Dict], supplier: str) -> str:
+    payload = json.dumps({"supplier": supplier, "styles": styles}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
 def calculate_trim_costs(metta_kb, garment_type: str) -> Dict:
 
     trim_specs = {
@@ -347,7 +630,8 @@ def calculate_trim_costs(metta_kb, garment_type: str) -> Dict:
     }
 
 
-def calculate_labor_cost(metta_kb, garment_type: str, supplier: str) -> float:
+def calculate_labor_cost(metta_kb, garment_type: str, supplier: str,
+                         rates: Optional[RateCard] = None) -> float:
 
     smv_map = {
         "t-shirt-basic": 10,
@@ -357,17 +641,10 @@ def calculate_labor_cost(metta_kb, garment_type: str, supplier: str) -> float:
         "jacket-bomber": 57
     }
 
-    labor_rates = {
-        "EcoKnits-Tirupur": 0.65,
-        "VietnamTex-HoChiMinh": 0.75,
-        "PortugalPremium-Porto": 2.20,
-        "ChinaScale-Guangzhou": 0.45,
-        "MakersRow-LosAngeles": 3.50,
-        "BangladeshValue-Dhaka": 0.35
-    }
+    rates = rates or get_rate_card()
 
     smv = smv_map.get(garment_type, 20)
-    rate = labor_rates.get(supplier, 0.70)
+    rate = rates.labor_rates.get(supplier, 0.70)
 
     labor_cost = smv * rate
 
@@ -376,28 +653,13 @@ def calculate_labor_cost(metta_kb, garment_type: str, supplier: str) -> float:
     return round(labor_cost, 2)
 
 
-def calculate_overhead_profit(metta_kb, supplier: str, direct_cost: float) -> Dict:
-
-    overhead_rates = {
-        "EcoKnits-Tirupur": 0.16,
-        "VietnamTex-HoChiMinh": 0.15,
-        "PortugalPremium-Porto": 0.18,
-        "ChinaScale-Guangzhou": 0.14,
-        "MakersRow-LosAngeles": 0.22,
-        "BangladeshValue-Dhaka": 0.12
-    }
+def calculate_overhead_profit(metta_kb, supplier: str, direct_cost: float,
+                              rates: Optional[RateCard] = None) -> Dict:
 
-    profit_rates = {
-        "EcoKnits-Tirupur": 0.10,
-        "VietnamTex-HoChiMinh": 0.12,
-        "PortugalPremium-Porto": 0.15,
-        "ChinaScale-Guangzhou": 0.08,
-        "MakersRow-LosAngeles": 0.18,
-        "BangladeshValue-Dhaka": 0.07
-    }
+    rates = rates or get_rate_card()
 
-    overhead_pct = overhead_rates.get(supplier, 0.16)
-    profit_pct = profit_rates.get(supplier, 0.10)
+    overhead_pct = rates.overhead_rates.get(supplier, 0.16)
+    profit_pct = rates.profit_rates.get(supplier, 0.10)
 
     overhead = direct_cost * overhead_pct
     subtotal = direct_cost + overhead
@@ -410,27 +672,13 @@ def calculate_overhead_profit(metta_kb, supplier: str, direct_cost: float) -> Di
 
 
 def calculate_landed_cost(metta_kb, fob: float, supplier: str,
-                          units: int, garment_type: str) -> Dict:
-
-    freight_costs = {
-        "EcoKnits-Tirupur": 3.60,
-        "VietnamTex-HoChiMinh": 3.40,
-        "PortugalPremium-Porto": 8.50,
-        "ChinaScale-Guangzhou": 3.15,
-        "MakersRow-LosAngeles": 1.20,
-        "BangladeshValue-Dhaka": 3.35
-    }
+                          units: int, garment_type: str,
+                          rates: Optional[RateCard] = None) -> Dict:
 
-    duty_rates = {
-        "t-shirt-basic": 0.16,
-        "hoodie-pullover": 0.16,
-        "jogger-pants": 0.165,
-        "leggings-activewear": 0.16,
-        "jacket-bomber": 0.165
-    }
+    rates = rates or get_rate_card()
 
-    freight_per_unit = freight_costs.get(supplier, 3.50)
-    duty_rate = duty_rates.get(garment_type, 0.16)
+    freight_per_unit = rates.freight_costs.get(supplier, 3.50)
+    duty_rate = rates.duty_rates.get(garment_type, 0.16)
     duty_amount = fob * duty_rate
 
     customs_broker = 125 / units if units > 0 else 0.50
@@ -481,6 +729,43 @@ def calculate_pricing_recommendations(landed_cost: float) -> Dict:
     }
 
 
+def build_bom_costing_response(request_id: str, bom: Dict) -> BOMCostingResponse:
+    landed = bom["landed_cost_breakdown"]
+    dtc = bom["pricing_recommendations"]["dtc"]
+
+    return BOMCostingResponse(
+        request_id=request_id,
+        garment_type=bom["garment_type"],
+        size=bom["size"],
+        fabric_type=bom["fabric"],
+        supplier=bom["supplier"],
+        units=bom["units"],
+        fabric_consumption_meters=bom["fabric_consumption_meters"],
+        fabric_cost=bom["fabric_cost"],
+        trim_costs=bom["trim_costs"],
+        labor_cost=bom["labor_cost"],
+        overhead_cost=bom["overhead"],
+        factory_profit=bom["factory_profit"],
+        fob_cost_per_unit=round(bom["fob_cost"], 2),
+        fob_cost_total=round(bom["fob_cost"] * bom["units"], 2),
+        freight_cost_per_unit=landed["freight"],
+        duty_cost_per_unit=landed["duty"],
+        customs_broker_per_unit=landed["customs_broker"],
+        receiving_per_unit=landed["receiving"],
+        inspection_per_unit=landed["inspection"],
+        landed_cost_per_unit=bom["landed_cost_total"],
+        landed_cost_total=round(bom["landed_cost_total"] * bom["units"], 2),
+        recommended_retail_price=dtc["price"],
+        gross_margin_percentage=dtc["margin_pct"],
+        cost_breakdown={
+            "landed_cost_breakdown": landed,
+            "pricing_recommendations": bom["pricing_recommendations"]
+        },
+        timestamp=get_current_timestamp(),
+        rate_card_warning=bom.get("rate_card_warning")
+    )
+
+
 def format_bom_response(bom: Dict) -> str:
     response = f"""
 BILL OF MATERIALS & COSTING ANALYSIS
@@ -547,4 +832,7 @@ This BOM calculation includes all direct costs with ±2% accuracy.
 Actual costs may vary based on fabric availability and supplier negotiations.
 """
 
+    if bom.get("rate_card_warning"):
+        response += f"\nRate card note: {bom['rate_card_warning']}\n"
+
     return response
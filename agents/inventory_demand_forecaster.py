@@ -1,13 +1,52 @@
 from uagents import Agent, Context
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+import asyncio
 import logging
 
-from models.messages import InventoryForecastRequest, InventoryForecastResponse
+import numpy as np
+
+from models.messages import (
+    DeadStockRiskRequest,
+    DeadStockRiskResponse,
+    DemandForecastBatchRequest,
+    DemandForecastBatchResponse,
+    InventoryForecastRequest,
+    InventoryForecastResponse,
+    LocationAllocationRequest,
+    LocationAllocationResponse,
+    MarkdownPlanRequest,
+    MarkdownPlanResponse,
+    SalesEventAck,
+    SalesEventBatch
+)
 from utils.config import Config
+from utils.dead_stock import DEFAULT_TOP_K, DeadStockMonitor
+from utils.demand_stream import DemandStream, to_period
 from utils.helpers import get_current_timestamp
+from utils.holt_winters import (
+    fit_holt_winters,
+    forecast_hierarchy,
+    forecast_holt_winters,
+    update_parameter_cache,
+    warm_start_params
+)
+from utils.location_allocation import MIN_PRESENTATION_BY_TYPE, allocate_locations
+from utils.markdown_optimizer import DEFAULT_SALVAGE_RATE, build_markdown_plans
+from utils.reorder_policy import DEFAULT_SERVICE_LEVEL, compute_reorder_policy, get_supplier_lead_time_weeks
+from utils.size_curves import SizeCurveStore
+from utils.sku_matrix import generate_sku_records, largest_remainder
+from utils.sku_store import SkuStore, open_sku_store
 
 logger = logging.getLogger(__name__)
 
+SEASON_LENGTH_WEEKS = 52
+
+FORECAST_HORIZON_WEEKS = 26
+
+DEFAULT_LEAD_TIME_WEEKS = 6
+
+DEFAULT_MARKDOWN_WEEKS = 16
+
 
 def create_inventory_forecasting_agent(metta_kb):
     agent = Agent(
@@ -17,16 +56,24 @@ def create_inventory_forecasting_agent(metta_kb):
         endpoint=Config.ENDPOINTS.get("inventory_forecasting", ["http://localhost:8003/submit"])
     )
 
+    demand_stream = DemandStream()
+    size_store = SizeCurveStore()
+    dead_stock_monitor = DeadStockMonitor(demand_stream)
+    forecast_parameters = {}
+    markdown_plans = {}
+    sku_store = open_sku_store("inventory_forecasting")
+
     @agent.on_message(InventoryForecastRequest)
     async def handle_forecast_request(ctx: Context, sender: str, msg: InventoryForecastRequest):
         logger.info(f"Inventory Demand Forecaster: Processing request from {sender}")
         logger.info(f"Product: {msg.product_name}, Units: {msg.total_units}, Fit: {msg.fit_type}, Demo: {msg.target_demographic}")
 
         size_curve = calculate_size_curve(
-            metta_kb,
+            size_store,
             msg.fit_type,
             msg.target_demographic,
-            msg.category
+            msg.category,
+            msg.region
         )
 
         size_allocation = apply_size_curve(
@@ -34,36 +81,60 @@ def create_inventory_forecasting_agent(metta_kb):
             size_curve
         )
 
-        color_allocation = calculate_color_distribution(
-            metta_kb,
-            msg.colors,
-            msg.total_units,
-            msg.color_strategy
+        color_allocation = apportion_allocation(
+            calculate_color_distribution(
+                metta_kb,
+                msg.colors,
+                msg.total_units,
+                msg.color_strategy
+            ),
+            msg.total_units
         )
 
         sku_matrix = generate_sku_matrix(
             msg.product_name,
             size_allocation,
-            color_allocation
+            color_allocation,
+            msg.location_weights
         )
 
+        demand_stream.advance()
         reorder_triggers = calculate_reorder_points(
             metta_kb,
             sku_matrix,
             msg.lead_time_weeks,
-            msg.expected_weekly_sales
+            msg.expected_weekly_sales,
+            demand_stream,
+            resolve_sku_lead_times(sku_matrix, msg.lead_time_weeks, msg.supplier, msg.sku_suppliers),
+            msg.service_level,
+            msg.fill_rate_target,
+            msg.unit_cost
         )
+        record_reorder_levels(sku_store, reorder_triggers)
 
         dead_stock_risks = identify_dead_stock_risks(
             sku_matrix,
-            msg.expected_weekly_sales
+            msg.expected_weekly_sales,
+            msg.selling_season_weeks,
+            msg.category
         )
 
+        weekly_forecast = None
+        if msg.weekly_sales_history and len(msg.weekly_sales_history) > 1:
+            weekly_forecast = forecast_weekly_sales(
+                msg.weekly_sales_history,
+                max(msg.selling_season_weeks, FORECAST_HORIZON_WEEKS),
+                msg.season_length_weeks or SEASON_LENGTH_WEEKS,
+                forecast_parameters,
+                msg.product_name
+            )
+
         sell_through_forecast = forecast_sell_through(
             metta_kb,
             msg.total_units,
             msg.expected_weekly_sales,
-            msg.selling_season_weeks
+            msg.selling_season_weeks,
+            weekly_forecast
         )
 
         recommendations = generate_inventory_recommendations(
@@ -92,110 +163,418 @@ def create_inventory_forecasting_agent(metta_kb):
         await ctx.send(sender, response)
         logger.info(f"Sent inventory forecast: {len(sku_matrix)} SKUs, {len(dead_stock_risks)} dead stock risks")
 
+    @agent.on_message(SalesEventBatch)
+    async def handle_sales_events(ctx: Context, sender: str, msg: SalesEventBatch):
+        ingested = demand_stream.ingest_events(msg.events)
+        demand_stream.advance()
+        size_store.record_events(msg.events)
+        dead_stock_monitor.record_sales(msg.events)
+        reorder_alerts = record_store_sales(sku_store, demand_stream, msg.events)
+        touched = {event.get("sku") or event.get("sku_code") for event in msg.events}
+
+        response = SalesEventAck(
+            request_id=msg.request_id,
+            events_ingested=ingested,
+            skus_tracked=len(demand_stream.skus),
+            demand_updates=[demand_stream.forecast(str(sku)) for sku in sorted(touched, key=str) if sku and str(sku) in demand_stream.index],
+            timestamp=get_current_timestamp(),
+            reorder_alerts=reorder_alerts
+        )
+
+        await ctx.send(sender, response)
+        logger.info(f"Ingested {ingested} sales events, tracking {len(demand_stream.skus)} SKUs")
+
+    @agent.on_message(DemandForecastBatchRequest)
+    async def handle_forecast_batch(ctx: Context, sender: str, msg: DemandForecastBatchRequest):
+        logger.info(f"Inventory Demand Forecaster: Forecasting {len(msg.skus)} SKUs from {sender}")
+
+        forecast = await asyncio.get_running_loop().run_in_executor(
+            None,
+            forecast_sku_hierarchy,
+            msg.skus,
+            msg.horizon_weeks or FORECAST_HORIZON_WEEKS,
+            msg.season_length_weeks or SEASON_LENGTH_WEEKS,
+            forecast_parameters
+        )
+
+        response = DemandForecastBatchResponse(
+            request_id=msg.request_id,
+            sku_forecasts=forecast["sku_forecasts"],
+            color_forecasts=forecast["color_forecasts"],
+            style_forecasts=forecast["style_forecasts"],
+            model_summary=forecast["model_summary"],
+            timestamp=get_current_timestamp()
+        )
+
+        await ctx.send(sender, response)
+        logger.info(f"Sent batch forecast for {len(forecast['sku_forecasts'])} SKUs")
+
+    @agent.on_message(DeadStockRiskRequest)
+    async def handle_dead_stock_request(ctx: Context, sender: str, msg: DeadStockRiskRequest):
+        try:
+            to_period(msg.as_of)
+        except (TypeError, ValueError):
+            logger.error(f"Invalid as_of date for dead stock request {msg.request_id}: {msg.as_of}")
+            await ctx.send(sender, DeadStockRiskResponse(
+                request_id=msg.request_id,
+                risks=[],
+                summary=dead_stock_monitor.summary(),
+                timestamp=get_current_timestamp(),
+                error=f"Invalid as_of date: {msg.as_of}"
+            ))
+            return
+
+        if msg.inventory:
+            registered = dead_stock_monitor.register_inventory(msg.inventory)
+            record_inventory_positions(sku_store, msg.inventory)
+            logger.info(f"Registered {registered} inventory positions for dead stock monitoring")
+
+        risks = dead_stock_monitor.top_risks(msg.limit or DEFAULT_TOP_K, msg.as_of)
+        for risk, plan in zip(risks, plan_risk_markdowns(risks)):
+            risk["markdown_plan"] = plan
+
+        response = DeadStockRiskResponse(
+            request_id=msg.request_id,
+            risks=risks,
+            summary=dead_stock_monitor.summary(),
+            timestamp=get_current_timestamp()
+        )
+
+        await ctx.send(sender, response)
+        logger.info(f"Sent {len(risks)} dead stock risks across {len(dead_stock_monitor.skus)} SKUs")
+
+    @agent.on_message(MarkdownPlanRequest)
+    async def handle_markdown_request(ctx: Context, sender: str, msg: MarkdownPlanRequest):
+        salvage_rate = msg.salvage_rate if msg.salvage_rate is not None else DEFAULT_SALVAGE_RATE
+
+        if msg.skus:
+            plans = build_markdown_plans(msg.skus, DEFAULT_MARKDOWN_WEEKS, salvage_rate)
+        else:
+            if not markdown_plans or msg.salvage_rate is not None:
+                refresh_markdown_plans(salvage_rate)
+            plans = sorted(markdown_plans.values(), key=lambda plan: plan["revenue_uplift"], reverse=True)
+
+        plans = plans[:msg.limit] if msg.limit else plans
+
+        response = MarkdownPlanResponse(
+            request_id=msg.request_id,
+            plans=plans,
+            summary=summarize_markdown_plans(plans),
+            timestamp=get_current_timestamp()
+        )
+
+        await ctx.send(sender, response)
+        logger.info(f"Sent {len(plans)} markdown plans")
+
+    @agent.on_message(LocationAllocationRequest)
+    async def handle_location_allocation(ctx: Context, sender: str, msg: LocationAllocationRequest):
+        logger.info(f"Inventory Demand Forecaster: Allocating {len(msg.skus)} SKUs across {len(msg.locations)} locations")
+
+        plan = plan_location_allocation(msg.skus, msg.locations, msg.sku_location_demand)
+
+        response = LocationAllocationResponse(
+            request_id=msg.request_id,
+            allocations=plan["allocations"],
+            location_summary=plan["location_summary"],
+            reserve_units=plan["reserve_units"],
+            expected_fill_rate=plan["expected_fill_rate"],
+            timestamp=get_current_timestamp()
+        )
+
+        await ctx.send(sender, response)
+        logger.info(f"Sent location allocation: {plan['reserve_units']} units held in reserve")
+
+    def refresh_markdown_plans(salvage_rate: float = DEFAULT_SALVAGE_RATE):
+        risks = dead_stock_monitor.top_risks(len(dead_stock_monitor.skus))
+        markdown_plans.clear()
+        markdown_plans.update({plan["sku_code"]: plan for plan in plan_risk_markdowns(risks, salvage_rate)})
+        logger.info(f"Refreshed markdown plans for {len(markdown_plans)} at-risk SKUs")
+
+    @agent.on_interval(period=Config.MARKDOWN_PLAN_INTERVAL_SECONDS)
+    async def refresh_markdown_schedule(ctx: Context):
+        if dead_stock_monitor.skus:
+            refresh_markdown_plans()
+            ctx.storage.set("markdown_plan_summary", summarize_markdown_plans(list(markdown_plans.values())))
+
+    @agent.on_interval(period=Config.DEMAND_STREAM_TICK_SECONDS)
+    async def advance_demand_stream(ctx: Context):
+        closed = demand_stream.advance()
+        if closed:
+            logger.info(f"Closed elapsed demand periods for {closed} SKUs")
+
+    if Config.SALES_FEED_PATH:
+        @agent.on_interval(period=Config.SALES_FEED_POLL_SECONDS)
+        async def poll_sales_feed(ctx: Context):
+            events = demand_stream.read_file_events(Config.SALES_FEED_PATH)
+            if events:
+                ingested = demand_stream.ingest_events(events)
+                demand_stream.advance()
+                size_store.record_events(events)
+                dead_stock_monitor.record_sales(events)
+                record_store_sales(sku_store, demand_stream, events)
+                logger.info(f"Ingested {ingested} sales events from {Config.SALES_FEED_PATH}")
+
     return agent
 
 
-def calculate_size_curve(metta_kb, fit_type: str, demographic: str, category: str) -> Dict:
-    size_curves = {
-        "activewear-standard": {
-            "name": "Activewear Standard Fit",
-            "xs": 4,
-            "s": 18,
-            "m": 32,
-            "l": 28,
-            "xl": 14,
-            "xxl": 4,
-            "reasoning": "Athletic demographic, M/L bias"
-        },
-        "athletic-fit": {
-            "name": "Athletic Fit (M/L Bias)",
-            "xs": 3,
-            "s": 16,
-            "m": 34,
-            "l": 30,
-            "xl": 13,
-            "xxl": 4,
-            "reasoning": "Performance-focused consumers, muscular builds"
-        },
-        "relaxed-fit": {
-            "name": "Relaxed Fit (Broader Distribution)",
-            "xs": 5,
-            "s": 20,
-            "m": 30,
-            "l": 25,
-            "xl": 15,
-            "xxl": 5,
-            "reasoning": "Comfort-focused, less size concentration"
-        },
-        "plus-inclusive": {
-            "name": "Plus-Inclusive Sizing",
-            "xs": 6,
-            "s": 18,
-            "m": 26,
-            "l": 24,
-            "xl": 16,
-            "xxl": 10,
-            "reasoning": "Inclusive sizing strategy, stronger XL/XXL"
-        },
-        "streetwear": {
-            "name": "Streetwear Oversized",
-            "xs": 2,
-            "s": 15,
-            "m": 35,
-            "l": 32,
-            "xl": 12,
-            "xxl": 4,
-            "reasoning": "Trend toward larger sizes, drop shoulder fits"
-        },
-        "womens-fashion": {
-            "name": "Women's Fashion Standard",
-            "xs": 8,
-            "s": 24,
-            "m": 32,
-            "l": 22,
-            "xl": 10,
-            "xxl": 4,
-            "reasoning": "Traditional women's sizing, S/M peak"
+def storable_records(sku_store: SkuStore, records: List[Dict]) -> List[Dict]:
+    storable = []
+    for record in records:
+        sku = record.get("sku_code") or record.get("sku")
+        if not sku:
+            continue
+        if not sku_store.accepts(sku):
+            logger.warning(f"SKU code {sku} exceeds {sku_store.code_bytes} bytes, not tracked in the SKU store")
+            continue
+        storable.append(record)
+    return storable
+
+
+def record_reorder_levels(sku_store: SkuStore, reorder_triggers: List[Dict]):
+    triggers = storable_records(sku_store, reorder_triggers)
+    if not triggers:
+        return
+
+    known = len(sku_store)
+    ids = sku_store.update_many(
+        [trigger["sku_code"] for trigger in triggers],
+        "reorder_point",
+        [trigger["reorder_point"] for trigger in triggers]
+    )
+    sku_store.velocity[ids] = [trigger["expected_weekly_sales"] for trigger in triggers]
+    sku_store.updated_at[ids] = to_period(None)
+
+    new = ids >= known
+    if new.any():
+        sku_store.on_hand[ids[new]] = [trigger["initial_stock"] for trigger, added in zip(triggers, new) if added]
+
+
+def record_inventory_positions(sku_store: SkuStore, inventory: List[Dict]):
+    codes, on_hand, on_order = [], [], []
+    for record in storable_records(sku_store, inventory):
+        try:
+            units = float(record.get("on_hand", record.get("units", 0)) or 0)
+            ordered = float(record.get("on_order", 0) or 0)
+        except (TypeError, ValueError):
+            continue
+        codes.append(str(record.get("sku_code") or record.get("sku")))
+        on_hand.append(units)
+        on_order.append(ordered)
+    if not codes:
+        return
+
+    ids = sku_store.update_many(codes, "on_hand", on_hand)
+    sku_store.on_order[ids] = on_order
+    sku_store.updated_at[ids] = to_period(None)
+
+
+def record_store_sales(sku_store: SkuStore, demand_stream: DemandStream, events: List[Dict]) -> List[Dict]:
+    sales = {}
+    for event in events:
+        sku = event.get("sku") or event.get("sku_code")
+        try:
+            units = float(event.get("units", event.get("quantity", 1)) or 0)
+        except (TypeError, ValueError):
+            continue
+        if sku:
+            sales[str(sku)] = sales.get(str(sku), 0.0) + units
+    if not sales:
+        return []
+
+    codes = list(sales)
+    ids = sku_store.lookup_many(codes)
+    registered = ids >= 0
+    if not registered.all():
+        logger.info(f"{int((~registered).sum())} sold SKUs have no registered stock position, skipping reorder checks")
+    ids = ids[registered]
+    if not len(ids):
+        return []
+
+    sku_store.on_hand[ids] = np.maximum(sku_store.on_hand[ids] - np.array([sales[code] for code in codes], dtype=np.float32)[registered], 0.0)
+    sku_store.updated_at[ids] = to_period(None)
+
+    positions = np.array([demand_stream.index.get(code, -1) for code, keep in zip(codes, registered) if keep], dtype=np.int64)
+    tracked = positions >= 0
+    if tracked.any():
+        weekly, observed = demand_stream.weekly_rates(positions[tracked])
+        sku_store.velocity[ids[tracked][observed > 0]] = weekly[observed > 0]
+
+    alerts = sku_store.below_reorder_point(ids)
+    return [
+        {
+            "sku_code": sku_store.code(sku_id),
+            "on_hand": float(sku_store.on_hand[sku_id]),
+            "on_order": float(sku_store.on_order[sku_id]),
+            "reorder_point": float(sku_store.reorder_point[sku_id]),
+            "weekly_velocity": round(float(sku_store.velocity[sku_id]), 2)
+        }
+        for sku_id in alerts.tolist()
+    ]
+
+
+def plan_location_allocation(skus: List[Dict], locations: List[Dict],
+                             sku_location_demand: Optional[Dict[str, Dict[str, float]]] = None) -> Dict:
+    location_names = [location.get("name") or f"location-{index + 1}" for index, location in enumerate(locations)]
+    if not skus or not locations:
+        return {"allocations": [], "location_summary": [], "reserve_units": 0, "expected_fill_rate": 0.0}
+
+    shares = np.array([float(location.get("demand_share", 1.0) or 0.0) for location in locations])
+    shares = shares / shares.sum() if shares.sum() > 0 else np.full(len(locations), 1 / len(locations))
+    sku_codes = [sku.get("sku_code") or sku.get("sku") for sku in skus]
+    units = np.array([int(sku.get("units", 0) or 0) for sku in skus])
+    forecast_units = np.array([float(sku.get("forecast_units") or sku.get("units", 0) or 0) for sku in skus])
+
+    demand = forecast_units[:, None] * shares[None, :]
+    for row, sku_code in enumerate(sku_codes):
+        overrides = (sku_location_demand or {}).get(sku_code)
+        if overrides:
+            demand[row] = [float(overrides.get(name, 0.0)) for name in location_names]
+
+    min_presentation = np.array([
+        location.get("min_presentation", MIN_PRESENTATION_BY_TYPE.get(str(location.get("type", "")).lower(), 0)) or 0
+        for location in locations
+    ])
+    location_value = np.array([float(location.get("unit_value", 1.0) or 1.0) for location in locations])
+    sku_value = np.array([float(sku.get("unit_value", 1.0) or 1.0) for sku in skus])
+    capacities = [location.get("capacity") for location in locations]
+    capacity = None if all(value is None for value in capacities) else [float("inf") if value is None else value for value in capacities]
+
+    result = allocate_locations(
+        units,
+        demand,
+        [int(sku.get("pack_size", 1) or 1) for sku in skus],
+        min_presentation[None, :],
+        None,
+        sku_value[:, None] * location_value[None, :],
+        capacity
+    )
+
+    allocation, expected_sales = result["allocation"], result["expected_sales"]
+    allocations = [
+        {
+            "sku_code": sku_code,
+            "units": int(units[row]),
+            "locations": {name: int(value) for name, value in zip(location_names, allocation[row]) if value > 0},
+            "reserve_units": int(result["reserve"][row]),
+            "expected_sales": round(float(expected_sales[row].sum()), 1),
+            "expected_fill_rate": round(float(expected_sales[row].sum() / max(demand[row].sum(), 1e-9)), 3)
         }
+        for row, sku_code in enumerate(sku_codes)
+    ]
+    location_summary = [
+        {
+            "location": name,
+            "type": location.get("type"),
+            "units": int(allocation[:, column].sum()),
+            "skus_stocked": int((allocation[:, column] > 0).sum()),
+            "forecast_demand": round(float(demand[:, column].sum()), 1),
+            "expected_sales": round(float(expected_sales[:, column].sum()), 1)
+        }
+        for column, (name, location) in enumerate(zip(location_names, locations))
+    ]
+
+    return {
+        "allocations": allocations,
+        "location_summary": location_summary,
+        "reserve_units": int(result["reserve"].sum()),
+        "expected_fill_rate": round(float(expected_sales.sum() / max(demand.sum(), 1e-9)), 3)
     }
 
-    key = f"{category}-{fit_type}".lower()
 
-    for curve_key in size_curves:
-        if curve_key in key or fit_type.lower() in curve_key:
-            return size_curves[curve_key]
+def forecast_sku_hierarchy(skus: List[Dict], horizon: int, season_length: int,
+                           cache: Optional[Dict[str, Dict]] = None) -> Dict:
+    history_length = max((len(sku.get("weekly_sales") or []) for sku in skus), default=0)
+    if history_length < 2:
+        return {"sku_forecasts": [], "color_forecasts": [], "style_forecasts": [], "model_summary": {"series": 0}}
+
+    sales = np.zeros((len(skus), history_length))
+    lengths = np.zeros(len(skus), dtype=np.int64)
+    for row, sku in enumerate(skus):
+        history = sku.get("weekly_sales") or []
+        if history:
+            sales[row, history_length - len(history):] = history
+            lengths[row] = len(history)
+
+    result = forecast_hierarchy(
+        sales,
+        [sku.get("color") or "default" for sku in skus],
+        [sku.get("style") or "default" for sku in skus],
+        season_length,
+        horizon,
+        [sku["sku_code"] for sku in skus],
+        cache,
+        lengths=lengths
+    )
+
+    fit = result["fit"]
+    sku_count = len(skus)
+    lead_times = [
+        sku.get("lead_time_weeks") or get_supplier_lead_time_weeks(sku.get("supplier") or "") or DEFAULT_LEAD_TIME_WEEKS
+        for sku in skus
+    ]
+    policy = compute_reorder_policy(
+        result["sku_forecast"].mean(axis=1),
+        np.sqrt(fit["sse"][:sku_count] / np.maximum(lengths, 1)),
+        np.asarray(lead_times, dtype=float),
+        service_level=[sku.get("service_level") or DEFAULT_SERVICE_LEVEL for sku in skus],
+        on_hand=[sku.get("on_hand") or 0 for sku in skus]
+    )
+
+    return {
+        "sku_forecasts": [
+            {
+                "sku_code": sku["sku_code"],
+                "weekly_forecast": np.round(row, 1).tolist(),
+                "total_units": round(float(row.sum()), 1),
+                "lead_time_weeks": round(float(lead_times[index]), 1),
+                "safety_stock_units": int(np.ceil(policy["safety_stock"][index])),
+                "reorder_point": int(np.ceil(policy["reorder_point"][index])),
+                "order_up_to_level": int(np.ceil(policy["order_up_to"][index])),
+                "suggested_order_units": int(np.ceil(policy["suggested_order"][index]))
+            }
+            for index, (sku, row) in enumerate(zip(skus, result["sku_forecast"]))
+        ],
+        "color_forecasts": [
+            {"color": label, "weekly_forecast": np.round(row, 1).tolist(), "total_units": round(float(row.sum()), 1)}
+            for label, row in zip(result["color_labels"], result["color_forecast"])
+        ],
+        "style_forecasts": [
+            {"style": label, "weekly_forecast": np.round(row, 1).tolist(), "total_units": round(float(row.sum()), 1)}
+            for label, row in zip(result["style_labels"], result["style_forecast"])
+        ],
+        "model_summary": {
+            "series": len(fit["sse"]),
+            "multiplicative_series": int(fit["multiplicative"].sum()),
+            "warm_started_series": result["warm_started"],
+            "season_length_weeks": int(fit["season_length"]),
+            "horizon_weeks": horizon,
+            "reconciliation": "ols"
+        }
+    }
 
-    if "athletic" in fit_type.lower():
-        return size_curves["athletic-fit"]
-    elif "relaxed" in fit_type.lower() or "oversized" in fit_type.lower():
-        return size_curves["relaxed-fit"]
-    elif "inclusive" in fit_type.lower() or "plus" in fit_type.lower():
-        return size_curves["plus-inclusive"]
-    elif "womens" in demographic.lower() or "female" in demographic.lower():
-        return size_curves["womens-fashion"]
 
-    return size_curves["activewear-standard"]
+def calculate_size_curve(size_store: SizeCurveStore, fit_type: str, demographic: str, category: str,
+                         region: Optional[str] = None) -> Dict:
+    return size_store.get_curve(category, fit_type, demographic, region)
 
 
 def apply_size_curve(total_units: int, size_curve: Dict) -> Dict:
-    allocation = {}
-
-    sizes = ["xs", "s", "m", "l", "xl", "xxl"]
+    sizes = size_curve["sizes"]
+    units = largest_remainder(total_units, list(sizes.values()))
 
-    for size in sizes:
-        percentage = size_curve.get(size, 0)
-        units = int(round(total_units * (percentage / 100)))
-        allocation[size.upper()] = {
+    return {
+        size: {
             "percentage": percentage,
-            "units": units
+            "units": int(size_units)
         }
+        for (size, percentage), size_units in zip(sizes.items(), units)
+    }
 
-    allocated_total = sum(a["units"] for a in allocation.values())
-    diff = total_units - allocated_total
-
-    if diff != 0:
-        allocation["M"]["units"] += diff
 
+def apportion_allocation(allocation: Dict, total_units: int) -> Dict:
+    units = largest_remainder(total_units, [data["percentage"] for data in allocation.values()])
+    for data, allocated in zip(allocation.values(), units):
+        data["units"] = int(allocated)
     return allocation
 
 
@@ -285,70 +664,108 @@ def distribute_evenly_with_bias(colors: List[str], total_units: int, bias_first:
     return distribution
 
 
-def generate_sku_matrix(product_name: str, size_allocation: Dict, color_allocation: Dict) -> List[Dict]:
-    sku_matrix = []
-
-    sku_counter = 1
-    for color, color_data in color_allocation.items():
-        color_total = color_data["units"]
-
-        for size, size_data in size_allocation.items():
-            size_pct = size_data["percentage"] / 100
-
-            sku_units = int(round(color_total * size_pct))
-
-            sku_code = f"{product_name[:3].upper()}-{color[:3].upper()}-{size}"
-
-            sku_matrix.append({
-                "sku_code": sku_code,
-                "color": color,
-                "size": size,
-                "units": sku_units,
-                "status": "pending_production"
-            })
+def generate_sku_matrix(product_name: str, size_allocation: Dict, color_allocation: Dict,
+                        location_weights: Optional[Dict[str, float]] = None) -> List[Dict]:
+    total_units = sum(data["units"] for data in color_allocation.values())
 
-            sku_counter += 1
-
-    return sku_matrix
+    records = generate_sku_records(
+        product_name,
+        total_units,
+        {color: data["percentage"] for color, data in color_allocation.items()},
+        {size: data["percentage"] for size, data in size_allocation.items()},
+        location_weights
+    )
 
+    sku_matrix = {}
+    for sku_code, color, size, location, units in records.tolist():
+        sku = sku_matrix.setdefault((color, size), {
+            "sku_code": sku_code,
+            "color": color,
+            "size": size,
+            "units": 0,
+            "status": "pending_production"
+        })
+        sku["units"] += units
+        if location_weights:
+            sku.setdefault("location_units", {})[location] = units
+
+    return list(sku_matrix.values())
+
+
+def calculate_reorder_points(metta_kb, sku_matrix: List[Dict], lead_time_weeks: int, expected_weekly_sales: float,
+                             demand_stream: Optional[DemandStream] = None,
+                             sku_lead_times: Optional[List[float]] = None,
+                             service_level: Optional[float] = None, fill_rate: Optional[float] = None,
+                             unit_cost: Optional[float] = None) -> List[Dict]:
+    if not sku_matrix:
+        return []
+
+    avg_weekly_per_sku = expected_weekly_sales / len(sku_matrix)
+
+    mean_demand = np.empty(len(sku_matrix))
+    demand_std = np.empty(len(sku_matrix))
+    observed = np.zeros(len(sku_matrix), dtype=bool)
+    for row, sku in enumerate(sku_matrix):
+        weekly = demand_stream.weekly_demand(sku["sku_code"]) if demand_stream else None
+        if weekly:
+            mean_demand[row], demand_std[row] = weekly
+            observed[row] = True
+        else:
+            mean_demand[row] = avg_weekly_per_sku * get_size_velocity_multiplier(sku["size"])
+            demand_std[row] = np.sqrt(mean_demand[row])
+
+    lead_times = np.asarray(sku_lead_times if sku_lead_times is not None else [lead_time_weeks] * len(sku_matrix), dtype=float)
+    on_hand = np.array([sku["units"] for sku in sku_matrix], dtype=float)
+
+    policy = compute_reorder_policy(
+        mean_demand,
+        demand_std,
+        lead_times,
+        service_level=service_level or DEFAULT_SERVICE_LEVEL,
+        fill_rate=fill_rate,
+        unit_cost=unit_cost,
+        on_hand=on_hand
+    )
 
-def calculate_reorder_points(metta_kb, sku_matrix: List[Dict], lead_time_weeks: int, expected_weekly_sales: float) -> List[Dict]:
     reorder_triggers = []
-
-    avg_weekly_per_sku = expected_weekly_sales / len(sku_matrix) if len(sku_matrix) > 0 else 0
-
-    safety_stock_weeks = 2
-
-    for sku in sku_matrix:
-        initial_stock = sku["units"]
-
-        size_multiplier = get_size_velocity_multiplier(sku["size"])
-        sku_weekly_sales = avg_weekly_per_sku * size_multiplier
-
-        lead_time_demand = sku_weekly_sales * lead_time_weeks
-        safety_stock = sku_weekly_sales * safety_stock_weeks
-
-        reorder_point = lead_time_demand + safety_stock
-
-        reorder_quantity = int(lead_time_demand + safety_stock)
-
-        weeks_of_inventory = initial_stock / sku_weekly_sales if sku_weekly_sales > 0 else 999
+    for row, sku in enumerate(sku_matrix):
+        weeks_of_inventory = float(min(policy["weeks_of_inventory"][row], 999))
+        lead_time = float(lead_times[row])
 
         reorder_triggers.append({
             "sku_code": sku["sku_code"],
-            "initial_stock": initial_stock,
-            "expected_weekly_sales": round(sku_weekly_sales, 1),
-            "reorder_point": int(reorder_point),
-            "reorder_quantity": reorder_quantity,
-            "lead_time_weeks": lead_time_weeks,
-            "safety_stock_units": int(safety_stock),
+            "initial_stock": sku["units"],
+            "expected_weekly_sales": round(float(mean_demand[row]), 1),
+            "weekly_demand_std": round(float(demand_std[row]), 1),
+            "demand_source": "observed" if observed[row] else "planned",
+            "reorder_point": int(np.ceil(policy["reorder_point"][row])),
+            "order_up_to_level": int(np.ceil(policy["order_up_to"][row])),
+            "reorder_quantity": int(policy["order_quantity"][row]),
+            "suggested_order_units": int(np.ceil(policy["suggested_order"][row])),
+            "lead_time_weeks": round(lead_time, 1),
+            "safety_stock_units": int(np.ceil(policy["safety_stock"][row])),
+            "cycle_service_level": round(float(policy["cycle_service_level"][row]), 3),
+            "expected_fill_rate": round(float(policy["expected_fill_rate"][row]), 3),
             "weeks_of_inventory": round(weeks_of_inventory, 1),
-            "reorder_urgency": "high" if weeks_of_inventory < lead_time_weeks else "medium" if weeks_of_inventory < lead_time_weeks + 4 else "low"
+            "reorder_urgency": "high" if weeks_of_inventory < lead_time else "medium" if weeks_of_inventory < lead_time + 4 else "low"
         })
 
     return reorder_triggers
 
 
+def resolve_sku_lead_times(sku_matrix: List[Dict], lead_time_weeks: int, supplier: Optional[str],
+                           sku_suppliers: Optional[Dict[str, str]]) -> List[float]:
+    lead_times = []
+    for sku in sku_matrix:
+        supplier_name = (sku_suppliers or {}).get(sku["sku_code"]) or (sku_suppliers or {}).get(sku["color"]) or supplier
+        if lead_time_weeks and supplier_name == supplier:
+            lead_times.append(lead_time_weeks)
+            continue
+        catalog_weeks = get_supplier_lead_time_weeks(supplier_name) if supplier_name else None
+        lead_times.append(catalog_weeks or lead_time_weeks or DEFAULT_LEAD_TIME_WEEKS)
+    return lead_times
+
+
 def get_size_velocity_multiplier(size: str) -> float:
     multipliers = {
         "XS": 0.5,
@@ -356,13 +773,17 @@ def get_size_velocity_multiplier(size: str) -> float:
         "M": 1.3,
         "L": 1.1,
         "XL": 0.8,
-        "XXL": 0.5
+        "XXL": 0.5,
+        "3XL": 0.4,
+        "4XL": 0.3
     }
 
     return multipliers.get(size.upper(), 1.0)
 
 
-def identify_dead_stock_risks(sku_matrix: List[Dict], expected_weekly_sales: float) -> List[Dict]:
+def identify_dead_stock_risks(sku_matrix: List[Dict], expected_weekly_sales: float,
+                              selling_season_weeks: int = DEFAULT_MARKDOWN_WEEKS,
+                              category: Optional[str] = None) -> List[Dict]:
     dead_stock_risks = []
 
     avg_weekly_per_sku = expected_weekly_sales / len(sku_matrix) if len(sku_matrix) > 0 else 0
@@ -385,22 +806,62 @@ def identify_dead_stock_risks(sku_matrix: List[Dict], expected_weekly_sales: flo
         dead_stock_risks.append({
             "sku_code": sku["sku_code"],
             "units": sku["units"],
+            "weekly_velocity": sku_weekly_sales,
             "estimated_weeks_to_sell": round(weeks_to_sell, 1),
             "risk_level": risk_level,
-            "recommendation": recommendation,
-            "markdown_timing": "Week 8-10" if risk_level == "high" else "Week 10-14",
-            "markdown_percentage": "30-40%" if risk_level == "high" else "20-30%"
+            "recommendation": recommendation
         })
 
+    plans = build_markdown_plans(
+        [{**risk, "remaining_weeks": selling_season_weeks, "category": category} for risk in dead_stock_risks],
+        selling_season_weeks
+    )
+    for risk, plan in zip(dead_stock_risks, plans):
+        week = plan["first_markdown_week"]
+        risk["weekly_velocity"] = round(risk["weekly_velocity"], 2)
+        risk["markdown_timing"] = f"Week {week}" if week else "No markdown needed"
+        risk["markdown_percentage"] = f"{plan['first_markdown_pct']}%"
+        risk["markdown_schedule"] = plan["markdown_schedule"]
+
     return dead_stock_risks
 
 
-def forecast_sell_through(metta_kb, total_units: int, expected_weekly_sales: float, selling_season_weeks: int) -> Dict:
-    total_expected_sales = expected_weekly_sales * selling_season_weeks
+def plan_risk_markdowns(risks: List[Dict], salvage_rate: float = DEFAULT_SALVAGE_RATE) -> List[Dict]:
+    skus = [
+        {**risk, "on_hand": risk["units"], "remaining_weeks": int(np.ceil(risk["remaining_season_weeks"]))}
+        for risk in risks
+    ]
+    return build_markdown_plans(skus, DEFAULT_MARKDOWN_WEEKS, salvage_rate)
+
+
+def summarize_markdown_plans(plans: List[Dict]) -> Dict:
+    marked_down = [plan for plan in plans if plan["first_markdown_week"]]
+
+    return {
+        "skus_planned": len(plans),
+        "skus_marked_down": len(marked_down),
+        "immediate_markdowns": len([plan for plan in marked_down if plan["first_markdown_week"] == 1]),
+        "expected_revenue": round(sum(plan["expected_revenue"] for plan in plans), 2),
+        "revenue_uplift": round(sum(plan["revenue_uplift"] for plan in plans), 2),
+        "expected_leftover_units": sum(plan["expected_leftover_units"] for plan in plans)
+    }
+
+
+def forecast_sell_through(metta_kb, total_units: int, expected_weekly_sales: float, selling_season_weeks: int,
+                          weekly_forecast: Optional[List[float]] = None) -> Dict:
+    cumulative = np.concatenate([[0.0], np.cumsum(weekly_forecast)]) if weekly_forecast else None
+    weekly_rate = float(cumulative[-1] / (len(cumulative) - 1)) if cumulative is not None else expected_weekly_sales
+
+    total_expected_sales = get_cumulative_sales(cumulative, weekly_rate, selling_season_weeks)
 
     sell_through_pct = (total_expected_sales / total_units * 100) if total_units > 0 else 0
 
-    weeks_to_sell_out = total_units / expected_weekly_sales if expected_weekly_sales > 0 else 999
+    if cumulative is not None and total_units <= cumulative[-1]:
+        weeks_to_sell_out = float(np.argmax(cumulative >= total_units))
+    elif cumulative is not None and weekly_rate > 0:
+        weeks_to_sell_out = len(cumulative) - 1 + (total_units - float(cumulative[-1])) / weekly_rate
+    else:
+        weeks_to_sell_out = total_units / weekly_rate if weekly_rate > 0 else 999
 
     if sell_through_pct >= 85:
         performance = "excellent"
@@ -423,10 +884,9 @@ def forecast_sell_through(metta_kb, total_units: int, expected_weekly_sales: flo
         if month_end_week > selling_season_weeks:
             month_end_week = selling_season_weeks
 
-        weeks_in_month = month_end_week - month_start_week
-        units_sold_month = int(expected_weekly_sales * weeks_in_month)
+        units_sold_month = int(get_cumulative_sales(cumulative, weekly_rate, month_end_week) - get_cumulative_sales(cumulative, weekly_rate, month_start_week))
 
-        cumulative_sold = int(expected_weekly_sales * month_end_week)
+        cumulative_sold = int(get_cumulative_sales(cumulative, weekly_rate, month_end_week))
         remaining = max(0, total_units - cumulative_sold)
 
         monthly_breakdown.append({
@@ -435,7 +895,7 @@ def forecast_sell_through(metta_kb, total_units: int, expected_weekly_sales: flo
             "units_sold": units_sold_month,
             "cumulative_sold": cumulative_sold,
             "remaining_inventory": remaining,
-            "inventory_weeks_remaining": round(remaining / expected_weekly_sales, 1) if expected_weekly_sales > 0 else 0
+            "inventory_weeks_remaining": round(remaining / weekly_rate, 1) if weekly_rate > 0 else 0
         })
 
     return {
@@ -445,10 +905,33 @@ def forecast_sell_through(metta_kb, total_units: int, expected_weekly_sales: flo
         "weeks_to_sell_out": round(weeks_to_sell_out, 1),
         "performance_rating": performance,
         "risk_assessment": risk,
+        "forecast_method": "holt-winters" if cumulative is not None else "flat-rate",
+        "weekly_forecast": [round(float(units), 1) for units in weekly_forecast[:selling_season_weeks]] if weekly_forecast else None,
         "monthly_breakdown": monthly_breakdown
     }
 
 
+def get_cumulative_sales(cumulative: Optional[np.ndarray], weekly_rate: float, week: float) -> float:
+    if cumulative is None:
+        return weekly_rate * week
+    if week <= len(cumulative) - 1:
+        return float(np.interp(week, np.arange(len(cumulative)), cumulative))
+    return float(cumulative[-1] + (week - len(cumulative) + 1) * weekly_rate)
+
+
+def forecast_weekly_sales(history: List[float], horizon: int, season_length: int,
+                          cache: Optional[Dict[str, Dict]] = None, key: str = None) -> List[float]:
+    season_length = season_length if len(history) > season_length else 1
+    keys = [key or "product"]
+
+    warm = warm_start_params(keys, cache) if cache is not None else None
+    fit = fit_holt_winters(np.asarray([history], dtype=float), season_length, warm, workers=1)
+    if cache is not None:
+        update_parameter_cache(cache, keys, fit)
+
+    return forecast_holt_winters(fit, horizon)[0].tolist()
+
+
 def generate_inventory_recommendations(size_allocation: Dict, color_allocation: Dict, dead_stock_risks: List[Dict], sell_through_forecast: Dict) -> List[str]:
     recommendations = []
 
@@ -3,6 +3,8 @@ import logging
 import asyncio
 from typing import Dict, List
 
+import numpy as np
+
 from models.messages import (
     ProductionCompleteMessage,
     InventoryAllocationPlan,
@@ -17,6 +19,7 @@ from utils.helpers import (
     generate_tracking_number,
     get_current_timestamp
 )
+from utils.sku_store import SkuStore, open_sku_store
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +34,7 @@ def create_logistics_fulfillment_agent(metta_kb: MettaKnowledgeBase,
     )
 
     inventory_state = {}
+    sku_store = open_sku_store("logistics_fulfillment")
 
     @agent.on_message(ProductionCompleteMessage)
     async def coordinate_shipping(ctx: Context, sender: str, msg: ProductionCompleteMessage):
@@ -95,15 +99,24 @@ def create_logistics_fulfillment_agent(metta_kb: MettaKnowledgeBase,
             "status": "in_transit",
             "shipment_id": shipment_id
         }
+        shipped = np.array([alloc["quantity"] for alloc in allocations])
+        shipment_ids = sku_store.update_many(
+            [f"{msg.product_id}-{alloc['size']}" for alloc in allocations],
+            "on_order",
+            shipped,
+            accumulate=True
+        )
 
         await asyncio.sleep(0.2)
 
         logger.info(f"Inventory received at {Config.DEFAULT_WAREHOUSE_LOCATION}")
         inventory_state[msg.product_id]["status"] = "in_warehouse"
+        np.add.at(sku_store.on_hand, shipment_ids, shipped)
+        np.subtract.at(sku_store.on_order, shipment_ids, shipped)
 
         await simulate_sales_and_reorder(
             ctx, msg.product_id, msg.product_name, size_allocation,
-            production_coordinator_address
+            production_coordinator_address, sku_store
         )
 
     return agent
@@ -111,7 +124,7 @@ def create_logistics_fulfillment_agent(metta_kb: MettaKnowledgeBase,
 
 async def simulate_sales_and_reorder(ctx: Context, product_id: str, product_name: str,
                                       size_allocation: Dict[str, int],
-                                      production_address: str):
+                                      production_address: str, sku_store: SkuStore):
 
     await asyncio.sleep(0.2)
 
@@ -133,6 +146,7 @@ async def simulate_sales_and_reorder(ctx: Context, product_id: str, product_name
     for size in ["M", "L"]:
         units_sold = int(size_allocation[size] * sales_velocity[size])
         current_stock[size] -= units_sold
+        sku_store.add(f"{product_id}-{size}", "on_hand", -units_sold)
 
         logger.info(f"Size {size}: {units_sold} units sold, {current_stock[size]} remaining")
 
@@ -168,6 +182,7 @@ async def simulate_sales_and_reorder(ctx: Context, product_id: str, product_name
                 )
 
                 await ctx.send(production_address, reorder)
+                sku_store.add(sku, "on_order", reorder_qty)
                 logger.info(f"Reorder request sent: {reorder_qty} units of size {size}")
 
     await asyncio.sleep(0.2)
@@ -1,13 +1,50 @@
 from uagents import Agent, Context
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import calendar
 import logging
+import zlib
+
+import numpy as np
 
 from models.messages import MOQNegotiationRequest, MOQNegotiationResponse
 from utils.config import Config
-from utils.helpers import get_current_timestamp
+from utils.consolidation import analyze_collection_consolidation, style_colorways
+from utils.helpers import clamp_trials, get_current_timestamp
+from utils.metta_facts import get_entities, parse_number
+from utils.moq_allocation import SupplierOption, solve_moq_allocation
+from utils.supplier_index import DEFAULT_DEPOSIT_PCT, get_supplier_index
 
 logger = logging.getLogger(__name__)
 
+ESTIMATED_UNIT_COST = 55
+
+MAX_TOTAL_REDUCTION = 0.65
+
+PAYMENT_OPTIONS = [
+    ("standard", "Standard terms", 0.0, None),
+    ("50_deposit", "50% deposit", 0.15, 0.50),
+    ("prepayment", "100% prepayment", 0.20, 1.00)
+]
+
+DEFAULT_SIMULATION_TRIALS = 100000
+
+MAX_SIMULATION_TRIALS = 1000000
+
+ESTIMATED_MATERIAL_COST = 18
+
+STANDARD_SEWING_MINUTES = 30
+
+LEVER_FLEX_FLOOR = 0.5
+
+LEVER_KB_KEYS = {
+    "Multi-style commitment": "multi-style-commitment",
+    "Off-peak timing": "off-peak-timing",
+    "100% prepayment": "payment-terms",
+    "50% deposit": "payment-terms"
+}
+
 
 def create_moq_negotiation_agent(metta_kb):
     agent = Agent(
@@ -26,7 +63,8 @@ def create_moq_negotiation_agent(metta_kb):
             metta_kb,
             msg.category,
             msg.target_units,
-            msg.budget
+            msg.budget,
+            msg.certifications
         )
 
         strategies = []
@@ -44,13 +82,58 @@ def create_moq_negotiation_agent(metta_kb):
 
         strategies.sort(key=lambda x: x["expected_moq_per_style"])
 
+        seed = msg.simulation_seed if msg.simulation_seed is not None else zlib.crc32(msg.request_id.encode("utf-8"))
+        rng = np.random.default_rng(seed)
+        trials = clamp_trials(msg.simulation_trials, DEFAULT_SIMULATION_TRIALS, MAX_SIMULATION_TRIALS)
+        if msg.simulation_trials is not None and trials != msg.simulation_trials:
+            logger.warning(f"Clamped simulation_trials {msg.simulation_trials} to {trials}")
+        flex_floor = LEVER_FLEX_FLOOR if msg.lever_flex_floor is None else msg.lever_flex_floor
+        await asyncio.get_running_loop().run_in_executor(
+            None,
+            simulate_strategy_outcomes,
+            suppliers,
+            strategies,
+            msg.num_styles,
+            msg.budget,
+            rng,
+            trials,
+            flex_floor
+        )
+
+        pareto_frontier = None
+        if msg.search_mode == "pareto":
+            frontier = search_negotiation_frontier(
+                metta_kb,
+                suppliers,
+                msg.num_styles,
+                msg.target_units,
+                msg.budget,
+                msg.payment_flexibility
+            )
+            pareto_frontier = frontier["pareto_frontier"]
+            logger.info(f"Pareto search: {frontier['feasible_combinations']} combinations, {len(pareto_frontier)} on frontier")
+
         best_strategy = strategies[0] if strategies else None
 
+        collection_allocation = await asyncio.get_running_loop().run_in_executor(
+            None,
+            allocate_collection,
+            suppliers,
+            msg.styles,
+            msg.num_styles,
+            msg.target_units,
+            msg.budget,
+            msg.timing_month,
+            msg.payment_flexibility,
+            msg.allocation_objective or "cost"
+        )
+
         consolidation_opportunities = analyze_consolidation_opportunities(
             metta_kb,
             msg.num_styles,
             msg.fabrics,
-            msg.colors
+            msg.colors,
+            msg.styles
         )
 
         response = MOQNegotiationResponse(
@@ -62,6 +145,8 @@ def create_moq_negotiation_agent(metta_kb):
             estimated_final_moq=best_strategy["expected_moq_per_style"] if best_strategy else 0,
             total_units_required=best_strategy["total_units"] if best_strategy else 0,
             alternative_options=strategies[1:3] if len(strategies) > 1 else [],
+            pareto_frontier=pareto_frontier,
+            collection_allocation=collection_allocation,
             timestamp=get_current_timestamp()
         )
 
@@ -71,70 +156,19 @@ def create_moq_negotiation_agent(metta_kb):
     return agent
 
 
-def identify_suitable_suppliers(metta_kb, category: str, target_units: int, budget: float) -> List[Dict]:
+def identify_suitable_suppliers(metta_kb, category: str, target_units: int, budget: float,
+                                certifications: Optional[List[str]] = None) -> List[Dict]:
 
-    supplier_database = {
-        "EcoKnits-Tirupur": {
-            "specialization": ["knit-activewear", "t-shirts", "hoodies"],
-            "moq_standard": 300,
-            "moq_negotiable": 150,
-            "success_rate": 0.75,
-            "labor_rate": 0.65,
-            "location": "India"
-        },
-        "VietnamTex-HoChiMinh": {
-            "specialization": ["technical-activewear", "performance-wear"],
-            "moq_standard": 500,
-            "moq_negotiable": 250,
-            "success_rate": 0.65,
-            "labor_rate": 0.75,
-            "location": "Vietnam"
-        },
-        "PortugalPremium-Porto": {
-            "specialization": ["premium-knits", "sustainable-luxury", "small-batch"],
-            "moq_standard": 200,
-            "moq_negotiable": 100,
-            "success_rate": 0.85,
-            "labor_rate": 2.20,
-            "location": "Portugal"
-        },
-        "ChinaScale-Guangzhou": {
-            "specialization": ["high-volume-basics", "streetwear"],
-            "moq_standard": 1000,
-            "moq_negotiable": 600,
-            "success_rate": 0.55,
-            "labor_rate": 0.45,
-            "location": "China"
-        },
-        "MakersRow-LosAngeles": {
-            "specialization": ["small-batch", "custom-development", "made-in-usa"],
-            "moq_standard": 100,
-            "moq_negotiable": 50,
-            "success_rate": 0.90,
-            "labor_rate": 3.50,
-            "location": "USA"
-        },
-        "BangladeshValue-Dhaka": {
-            "specialization": ["basics-volume", "t-shirts", "budget-production"],
-            "moq_standard": 1500,
-            "moq_negotiable": 1000,
-            "success_rate": 0.45,
-            "labor_rate": 0.35,
-            "location": "Bangladesh"
-        }
-    }
+    index = get_supplier_index()
+    max_moq = target_units * 1.5
 
-    suitable = []
-    estimated_cost_per_unit = budget / target_units if target_units > 0 else 50
+    suitable = index.query(category=category, certifications=certifications, max_moq=max_moq)
 
-    for name, data in supplier_database.items():
-        if data["moq_negotiable"] <= (target_units * 1.5):
-            suitable.append({
-                "name": name,
-                **data
-            })
+    if not suitable and category:
+        logger.warning(f"No suppliers specialize in {category}, falling back to MOQ-only match")
+        suitable = index.query(certifications=certifications, max_moq=max_moq)
 
-    return suitable
+    return [dict(supplier, success_rate=index.planning_success_rate(supplier)) for supplier in suitable]
 
 
 def calculate_negotiation_strategy(metta_kb, supplier: Dict, num_styles: int,
@@ -157,8 +191,7 @@ def calculate_negotiation_strategy(metta_kb, supplier: Dict, num_styles: int,
             "reasoning": "Suppliers prefer volume across multiple styles"
         })
 
-    off_peak_months = ["february", "march", "august", "september"]
-    if timing_month and timing_month.lower() in off_peak_months:
+    if timing_month and timing_month.lower() in get_off_peak_months():
         timing_reduction = 0.25
         total_reduction_pct += timing_reduction
         strategies_applied.append({
@@ -207,6 +240,7 @@ def calculate_negotiation_strategy(metta_kb, supplier: Dict, num_styles: int,
         "expected_moq_per_style": units_per_style,
         "total_units": total_units,
         "success_probability": round(success_probability * 100, 1),
+        "success_rate_source": supplier.get("success_rate_source", "knowledge-base"),
         "labor_rate": supplier["labor_rate"],
         "location": supplier["location"],
         "recommendation": generate_recommendation(
@@ -215,8 +249,260 @@ def calculate_negotiation_strategy(metta_kb, supplier: Dict, num_styles: int,
     }
 
 
+def get_off_peak_months() -> List[str]:
+    timing = get_entities("supplier_intelligence.metta", "negotiation-timing").get("off-peak-advantage", {})
+    months = [month for month in timing.get("months", []) if isinstance(month, str)]
+    return months or ["february", "march", "august", "september"]
+
+
+def search_negotiation_frontier(metta_kb, suppliers: List[Dict], num_styles: int,
+                                target_units: int, budget: float,
+                                payment_flexibility: Optional[str] = None) -> Dict:
+
+    if not suppliers:
+        return {"evaluated_combinations": 0, "feasible_combinations": 0, "pareto_frontier": []}
+
+    months = [calendar.month_name[m].lower() for m in range(1, 13)]
+    off_peak = set(get_off_peak_months())
+
+    allowed_payments = [option[0] for option in PAYMENT_OPTIONS]
+    if payment_flexibility in allowed_payments:
+        allowed_payments = allowed_payments[:allowed_payments.index(payment_flexibility) + 1]
+
+    base_moq = np.array([s["moq_standard"] for s in suppliers], dtype=float)[:, None, None, None]
+    negotiable_moq = np.array([s["moq_negotiable"] for s in suppliers], dtype=float)[:, None, None, None]
+    success_rate = np.array([s["success_rate"] for s in suppliers], dtype=float)[:, None, None, None]
+    unit_cost = np.array([estimate_unit_cost(s) for s in suppliers], dtype=float)[:, None, None, None]
+    standard_deposit = np.array([s.get("deposit_pct", DEFAULT_DEPOSIT_PCT) for s in suppliers])[:, None, None, None]
+
+    timing_reduction = np.array([0.25 if month in off_peak else 0.0 for month in months])[None, :, None, None]
+    multi_style_reduction = np.array([0.0, 0.40 if num_styles >= 5 else 0.30])[None, None, :, None]
+    payment_reduction = np.array([option[2] for option in PAYMENT_OPTIONS])[None, None, None, :]
+    payment_deposit = np.array([option[3] or 0.0 for option in PAYMENT_OPTIONS])[None, None, None, :]
+
+    total_reduction = np.minimum(timing_reduction + multi_style_reduction + payment_reduction, MAX_TOTAL_REDUCTION)
+
+    expected_moq = np.maximum(np.floor(base_moq * (1 - total_reduction)), negotiable_moq)
+    total_units = expected_moq * num_styles
+    success = np.clip(success_rate * (1 - total_reduction * 0.3), 0.30, 0.95)
+    upfront_pct = np.maximum(standard_deposit, payment_deposit)
+    order_cost = total_units * unit_cost
+    cash_impact = upfront_pct * order_cost
+
+    shape = np.broadcast_shapes(expected_moq.shape, success.shape, cash_impact.shape)
+    feasible = np.ones(shape, dtype=bool)
+    if num_styles < 3:
+        feasible[:, :, 1, :] = False
+    for index, option in enumerate(PAYMENT_OPTIONS):
+        if option[0] not in allowed_payments:
+            feasible[:, :, :, index] = False
+
+    expected_moq = np.broadcast_to(expected_moq, shape)[feasible]
+    total_units = np.broadcast_to(total_units, shape)[feasible]
+    success = np.broadcast_to(success, shape)[feasible]
+    cash_impact = np.broadcast_to(cash_impact, shape)[feasible]
+    order_cost = np.broadcast_to(order_cost, shape)[feasible]
+    reduction = np.broadcast_to(total_reduction, shape)[feasible]
+    combos = np.argwhere(feasible)
+
+    objectives = np.column_stack([expected_moq, -success, cash_impact])
+    frontier_mask = pareto_mask(objectives)
+
+    grouped = {}
+    for row in np.flatnonzero(frontier_mask):
+        supplier_idx, month_idx, multi_idx, payment_idx = combos[row]
+        key = (supplier_idx, multi_idx, payment_idx, expected_moq[row], success[row], cash_impact[row])
+
+        if key in grouped:
+            grouped[key]["timing_months"].append(months[month_idx])
+            continue
+
+        supplier = suppliers[supplier_idx]
+        levers = []
+        if multi_idx:
+            levers.append("Multi-style commitment")
+        if months[month_idx] in off_peak:
+            levers.append("Off-peak timing")
+        if PAYMENT_OPTIONS[payment_idx][3] is not None:
+            levers.append(PAYMENT_OPTIONS[payment_idx][1])
+
+        grouped[key] = {
+            "supplier": supplier["name"],
+            "location": supplier["location"],
+            "levers": levers,
+            "payment_option": PAYMENT_OPTIONS[payment_idx][0],
+            "timing_months": [months[month_idx]],
+            "total_reduction_pct": round(float(reduction[row]) * 100, 1),
+            "expected_moq_per_style": int(expected_moq[row]),
+            "total_units": int(total_units[row]),
+            "success_probability": round(float(success[row]) * 100, 1),
+            "success_rate_source": supplier.get("success_rate_source", "knowledge-base"),
+            "upfront_cash_required": round(float(cash_impact[row]), 2),
+            "within_budget": bool(order_cost[row] <= budget),
+            "units_over_target": int(max(total_units[row] - target_units, 0))
+        }
+
+    frontier = sorted(grouped.values(), key=lambda x: (x["expected_moq_per_style"], -x["success_probability"]))
+
+    return {
+        "evaluated_combinations": int(np.prod(shape)),
+        "feasible_combinations": int(feasible.sum()),
+        "pareto_frontier": frontier
+    }
+
+
+def pareto_mask(objectives: np.ndarray, chunk_size: int = 1024) -> np.ndarray:
+    count = len(objectives)
+    dominated = np.zeros(count, dtype=bool)
+
+    for start in range(0, count, chunk_size):
+        block = objectives[start:start + chunk_size]
+        no_worse = (objectives[None, :, :] <= block[:, None, :]).all(axis=2)
+        strictly_better = (objectives[None, :, :] < block[:, None, :]).any(axis=2)
+        dominated[start:start + chunk_size] = (no_worse & strictly_better).any(axis=1)
+
+    return ~dominated
+
+
+def estimate_unit_cost(supplier: Dict) -> float:
+    if supplier.get("cost_per_unit"):
+        return supplier["cost_per_unit"]
+    if supplier.get("labor_rate"):
+        labor = supplier["labor_rate"] * STANDARD_SEWING_MINUTES * (1 + supplier.get("overhead_pct", 0.15))
+        return round(ESTIMATED_MATERIAL_COST + labor, 2)
+    return ESTIMATED_UNIT_COST
+
+
+def calculate_lever_reduction(timing_month: Optional[str], payment_flexibility: Optional[str]) -> float:
+    timing_reduction = 0.25 if timing_month and timing_month.lower() in get_off_peak_months() else 0.0
+    payment_reduction = {option[0]: option[2] for option in PAYMENT_OPTIONS}.get(payment_flexibility, 0.0)
+    return timing_reduction + payment_reduction
+
+
+def allocate_collection(suppliers: List[Dict], styles: Optional[List[Dict]], num_styles: int,
+                        target_units: int, budget: float, timing_month: Optional[str],
+                        payment_flexibility: Optional[str], objective: str = "cost") -> Optional[Dict]:
+
+    if not styles:
+        if num_styles <= 0:
+            return None
+        base_units, remainder = divmod(target_units, num_styles)
+        styles = [
+            {"style_id": f"style-{i + 1}", "target_units": base_units + (1 if i < remainder else 0)}
+            for i in range(num_styles)
+        ]
+
+    lever_reduction = calculate_lever_reduction(timing_month, payment_flexibility)
+    options = [
+        SupplierOption(
+            name=supplier["name"],
+            unit_cost=estimate_unit_cost(supplier),
+            moq_standard=supplier["moq_standard"],
+            moq_negotiable=supplier["moq_negotiable"],
+            lever_reduction=lever_reduction
+        )
+        for supplier in suppliers
+    ]
+
+    return solve_moq_allocation(styles, options, budget, objective)
+
+
+@lru_cache(maxsize=None)
+def get_supplier_lever_reductions(supplier_name: str) -> Dict[str, float]:
+    supplier = get_entities("supplier_intelligence.metta", "supplier").get(supplier_name, {})
+    reductions = {}
+
+    for entry in supplier.get("negotiation-strategies", []):
+        if not isinstance(entry, list) or "reduces-moq-by" not in entry:
+            continue
+        position = entry.index("reduces-moq-by")
+        value = parse_number(entry[position + 1]) if position + 1 < len(entry) else None
+        if value is not None:
+            reductions[entry[0]] = value / 100
+
+    return reductions
+
+
+def summarize_samples(mean: float, quantiles: np.ndarray) -> Dict:
+    return {
+        "mean": round(float(mean), 1),
+        "p5": round(float(quantiles[0]), 1),
+        "p50": round(float(quantiles[1]), 1),
+        "p95": round(float(quantiles[2]), 1)
+    }
+
+
+def simulate_strategy_outcomes(suppliers: List[Dict], strategies: List[Dict], num_styles: int, budget: float,
+                               rng: np.random.Generator, trials: int, flex_floor: float):
+    suppliers_by_name = {supplier["name"]: supplier for supplier in suppliers}
+    for strategy in strategies:
+        strategy["outcome_distribution"] = simulate_negotiation_outcomes(
+            suppliers_by_name[strategy["supplier"]], strategy, num_styles, budget, rng, trials, flex_floor
+        )
+
+
+def simulate_negotiation_outcomes(supplier: Dict, strategy: Dict, num_styles: int, budget: float,
+                                  rng: np.random.Generator,
+                                  trials: int = DEFAULT_SIMULATION_TRIALS,
+                                  flex_floor: float = LEVER_FLEX_FLOOR) -> Dict:
+
+    trials = max(int(trials), 1)
+    flex_floor = min(max(float(flex_floor), 0.0), 1.0)
+
+    kb_reductions = get_supplier_lever_reductions(supplier["name"])
+    nominal = np.array([
+        kb_reductions.get(LEVER_KB_KEYS.get(lever["name"]), lever["reduction"] / 100)
+        for lever in strategy["strategies"]
+    ], dtype=float)
+
+    if nominal.size:
+        secured = rng.random((nominal.size, trials), dtype=np.float32) < supplier["success_rate"]
+        flex = rng.random((nominal.size, trials), dtype=np.float32) * (1 - flex_floor) + flex_floor
+        total_reduction = np.minimum((flex * secured * nominal[:, None]).sum(axis=0), MAX_TOTAL_REDUCTION)
+        all_secured = float(secured.all(axis=0).mean())
+    else:
+        total_reduction = np.zeros(trials)
+        all_secured = 1.0
+
+    floor_moq = supplier["moq_negotiable"]
+    unit_cost = estimate_unit_cost(supplier)
+    final_moq = np.maximum(np.floor(supplier["moq_standard"] * (1 - total_reduction)), floor_moq).astype(np.int64)
+    over_budget = np.maximum(final_moq * (num_styles * unit_cost) - budget, 0)
+
+    cumulative = np.cumsum(np.bincount(final_moq - floor_moq))
+    moq_quantiles = np.searchsorted(cumulative, np.array([0.05, 0.50, 0.95]) * trials) + floor_moq
+    over_quantiles = np.maximum(moq_quantiles * (num_styles * unit_cost) - budget, 0)
+    mean_moq = final_moq.mean()
+
+    return {
+        "trials": trials,
+        "final_moq_per_style": summarize_samples(mean_moq, moq_quantiles),
+        "total_units": summarize_samples(mean_moq * num_styles, moq_quantiles * num_styles),
+        "cost_over_budget": {
+            **summarize_samples(over_budget.mean(), over_quantiles),
+            "probability": round(float((over_budget > 0).mean()) * 100, 1)
+        },
+        "assumptions": {
+            "unit_cost": round(unit_cost, 2),
+            "lever_flex_range": [round(flex_floor, 2), 1.0],
+            "lever_flex_source": "modelling assumption, the knowledge base gives only the nominal reduction per lever",
+            "success_rate": round(supplier["success_rate"], 2),
+            "success_rate_source": supplier.get("success_rate_source", "knowledge-base")
+        },
+        "all_levers_secured_probability": round(all_secured * 100, 1),
+        "reaches_negotiable_floor_probability": round(float(cumulative[0] / trials) * 100, 1)
+    }
+
+
 def analyze_consolidation_opportunities(metta_kb, num_styles: int,
-                                        fabrics: List[str], colors: List[str]) -> Dict:
+                                        fabrics: List[str], colors: List[str],
+                                        styles: Optional[List[Dict]] = None) -> Dict:
+
+    detailed = None
+    if styles and any(style.get("fabric") or style.get("trims") for style in styles):
+        detailed = analyze_collection_consolidation(styles)
+        fabrics = fabrics or [style["fabric"] for style in styles if style.get("fabric")]
+        colors = colors or sorted({color for style in styles for color, _ in style_colorways(style)})
 
     opportunities = []
 
@@ -265,12 +551,23 @@ def analyze_consolidation_opportunities(metta_kb, num_styles: int,
         opp.get("moq_reduction", 0) for opp in opportunities if opp["type"] != "no-consolidation-needed"
     )
 
-    return {
+    result = {
         "opportunities": opportunities,
         "total_potential_moq_reduction_pct": total_potential_reduction,
         "implementation_priority": prioritize_opportunities(opportunities)
     }
 
+    if detailed:
+        result.update(detailed)
+        pool_priorities = [
+            f"POOL: {merge['name']} across {len(merge['styles'])} styles saves ${merge['moq_savings_cost']:,.0f} in MOQ overbuy"
+            for merge in detailed["ranked_merges"][:3]
+            if merge["moq_savings_cost"] > 0
+        ]
+        result["implementation_priority"] = pool_priorities + result["implementation_priority"]
+
+    return result
+
 
 def prioritize_opportunities(opportunities: List[Dict]) -> List[str]:
 
@@ -1,14 +1,75 @@
 from uagents import Agent, Context
-from typing import Dict, List, Tuple
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 import logging
-
-from models.messages import ProductionTimelineRequest, ProductionTimelineResponse
+import zlib
+
+import numpy as np
+
+from models.messages import (
+    ProductionCapacityBooking,
+    ProductionCapacityBookingResponse,
+    ProductionTimelineBatchRequest,
+    ProductionTimelineBatchResponse,
+    ProductionTimelineRequest,
+    ProductionTimelineResponse,
+    ProductionTimelineUpdate,
+    ProductionTimelineUpdateResponse
+)
+from utils.aql import get_inspection_plans
+from utils.capacity_scheduler import DEFAULT_PRIORITY, CapacityPlanner
 from utils.config import Config
-from utils.helpers import get_current_timestamp
+from utils.critical_path import (
+    ScheduleTemplate,
+    build_schedule_state,
+    build_schedule_template,
+    compute_schedule,
+    replan_schedule,
+    sample_pert_durations,
+    simulate_completion
+)
+from utils.helpers import clamp_trials, get_current_timestamp
+from utils.metta_facts import first_number, iter_entities, parse_range
+from utils.risk_calendar import get_risk_calendar
 
 logger = logging.getLogger(__name__)
 
+TEMPLATE_CACHE_SIZE = 256
+
+CAPACITY_BOOKINGS_KEY = "capacity:bookings"
+
+DEFAULT_SIMULATION_TRIALS = 10000
+
+MAX_SIMULATION_TRIALS = 100000
+
+DEFAULT_DURATION_SPREAD = (0.8, 1.5)
+
+BULK_DURATION_SPREAD = (0.85, 1.35)
+
+MAJOR_DEFECT_AQL = 2.5
+
+MINOR_DEFECT_AQL = 4.0
+
+DEFAULT_INSPECTION_LEVEL = "II"
+
+INSPECTION_LOT_FRACTIONS = (0.2, 0.5, 1.0)
+
+RISK_PROBABILITIES = {
+    "High": 0.8,
+    "Medium-High": 0.6,
+    "Medium": 0.4,
+    "Low": 0.15
+}
+
+RISK_PHASES = {
+    "Chinese New Year Factory Closure": "Bulk Production",
+    "Monsoon Season Delays": "Shipping & Logistics",
+    "Peak Season Port Congestion": "Shipping & Logistics",
+    "Complex Construction Quality Issues": "Sample Revisions",
+    "Compliance Audits & Factory Inspections": "Bulk Production"
+}
+
 
 def create_production_timeline_agent(metta_kb):
     agent = Agent(
@@ -18,6 +79,8 @@ def create_production_timeline_agent(metta_kb):
         endpoint=Config.ENDPOINTS.get("production_timeline", ["http://localhost:8002/submit"])
     )
 
+    capacity_planner = CapacityPlanner()
+
     @agent.on_message(ProductionTimelineRequest)
     async def handle_timeline_request(ctx: Context, sender: str, msg: ProductionTimelineRequest):
         logger.info(f"Production Timeline Manager: Processing request from {sender}")
@@ -29,19 +92,35 @@ def create_production_timeline_agent(metta_kb):
             logger.error(f"Supplier not found: {msg.supplier}")
             return
 
-        phases = calculate_production_phases(
-            metta_kb,
+        start_date = resolve_start_date(msg.order_month)
+        phases, schedule = plan_production_schedule(msg.garment_type, msg.supplier)
+
+        capacity_order = build_capacity_order(
+            msg.request_id,
             msg.garment_type,
             msg.units,
+            msg.supplier,
             supplier_data,
-            msg.order_month
+            phases,
+            schedule,
+            msg.target_launch_date,
+            msg.priority,
+            start_date
         )
+        capacity_schedule = quote_capacity(capacity_planner, [capacity_order])[0]
+        if capacity_schedule["queue_delay_days"] > 0:
+            phases, schedule = plan_production_schedule(
+                msg.garment_type,
+                msg.supplier,
+                {"Bulk Production": capacity_schedule["queue_delay_days"]}
+            )
 
         quality_gates = insert_quality_checkpoints(
             metta_kb,
             msg.garment_type,
             msg.units,
-            phases
+            phases,
+            msg.inspection_level or DEFAULT_INSPECTION_LEVEL
         )
 
         risk_factors = assess_risk_factors(
@@ -49,22 +128,40 @@ def create_production_timeline_agent(metta_kb):
             supplier_data["location"],
             msg.order_month,
             msg.target_launch_date,
-            msg.complexity
+            msg.complexity,
+            phases,
+            start_date
         )
 
         critical_path = identify_critical_path(phases, risk_factors)
 
-        total_timeline_days = sum(phase["duration_days"] for phase in phases)
+        total_timeline_days = schedule["duration_days"]
+        planned_start = datetime.combine(start_date, datetime.min.time())
 
         if msg.target_launch_date:
             launch_date = datetime.strptime(msg.target_launch_date, "%Y-%m-%d")
             earliest_start = launch_date - timedelta(days=total_timeline_days)
-            is_achievable = earliest_start <= datetime.now()
-            buffer_needed = 0 if is_achievable else (datetime.now() - earliest_start).days
+            is_achievable = earliest_start >= planned_start
+            buffer_needed = 0 if is_achievable else (planned_start - earliest_start).days
         else:
             is_achievable = True
             buffer_needed = 0
 
+        seed = zlib.crc32(msg.request_id.encode("utf-8"))
+        trials = clamp_trials(msg.simulation_trials, DEFAULT_SIMULATION_TRIALS, MAX_SIMULATION_TRIALS)
+        if msg.simulation_trials is not None and trials != msg.simulation_trials:
+            logger.warning(f"Clamped simulation_trials {msg.simulation_trials} to {trials}")
+        completion_distribution = simulate_completion_distribution(
+            phases,
+            get_schedule_template(msg.garment_type, msg.supplier)[1],
+            supplier_data,
+            risk_factors,
+            msg.target_launch_date,
+            np.random.default_rng(seed),
+            trials,
+            planned_start
+        )
+
         expedite_options = calculate_expedite_options(
             supplier_data,
             phases,
@@ -82,16 +179,394 @@ def create_production_timeline_agent(metta_kb):
             is_timeline_achievable=is_achievable,
             buffer_recommendation_days=max(7, len(risk_factors) * 3),
             expedite_options=expedite_options,
-            estimated_completion_date=calculate_completion_date(datetime.now(), total_timeline_days),
+            estimated_completion_date=calculate_completion_date(planned_start, total_timeline_days),
+            completion_distribution=completion_distribution,
+            capacity_schedule=capacity_schedule,
+            timestamp=get_current_timestamp()
+        )
+
+        ctx.storage.set(f"timeline:{msg.request_id}", {
+            "garment_type": msg.garment_type,
+            "supplier": msg.supplier,
+            "start_date": start_date.isoformat(),
+            "capacity_order": serialize_capacity_order(capacity_order),
+            "state": build_schedule_state(
+                get_schedule_template(msg.garment_type, msg.supplier)[1],
+                [phase["duration_days"] for phase in phases]
+            )
+        })
+
+        await ctx.send(sender, response)
+        logger.info(f"Sent production timeline: {total_timeline_days} days total ({schedule['serial_duration_days']} if run serially)")
+
+    @agent.on_message(ProductionTimelineUpdate)
+    async def handle_timeline_update(ctx: Context, sender: str, msg: ProductionTimelineUpdate):
+        logger.info(f"Production Timeline Manager: {msg.phase_name} slipped {msg.slip_days} days on {msg.request_id}")
+
+        stored = ctx.storage.get(f"timeline:{msg.request_id}")
+        if not stored:
+            logger.error(f"No stored timeline for request: {msg.request_id}")
+            return
+
+        stored, changed_milestones = apply_timeline_slip(stored, {msg.phase_name: msg.slip_days})
+        ctx.storage.set(f"timeline:{msg.request_id}", stored)
+
+        template = get_schedule_template(stored["garment_type"], stored["supplier"])[1]
+        start_date = datetime.fromisoformat(stored["start_date"])
+
+        response = ProductionTimelineUpdateResponse(
+            request_id=msg.request_id,
+            changed_milestones=changed_milestones,
+            critical_path=[template.names[position] for position in stored["state"]["critical"]],
+            total_timeline_days=stored["state"]["project_end"],
+            estimated_completion_date=calculate_completion_date(start_date, stored["state"]["project_end"]),
+            timestamp=get_current_timestamp()
+        )
+
+        await ctx.send(sender, response)
+        logger.info(f"Sent timeline update: {len(changed_milestones)} milestones changed")
+
+    @agent.on_message(ProductionTimelineBatchRequest)
+    async def handle_timeline_batch(ctx: Context, sender: str, msg: ProductionTimelineBatchRequest):
+        logger.info(f"Production Timeline Manager: Planning {len(msg.orders)} orders from {sender}")
+
+        portfolio = plan_timeline_portfolio(capacity_planner, msg.request_id, msg.orders)
+
+        for entry in portfolio["planned"]:
+            ctx.storage.set(f"timeline:{entry['order_id']}", {
+                "garment_type": entry["order"]["garment_type"],
+                "supplier": entry["order"]["supplier"],
+                "start_date": entry["start_date"].isoformat(),
+                "capacity_order": serialize_capacity_order(entry["capacity_order"]),
+                "state": build_schedule_state(
+                    get_schedule_template(entry["order"]["garment_type"], entry["order"]["supplier"])[1],
+                    [phase["duration_days"] for phase in entry["phases"]]
+                )
+            })
+
+        response = ProductionTimelineBatchResponse(
+            request_id=msg.request_id,
+            orders=portfolio["orders"],
+            rejected_orders=portfolio["rejected_orders"],
+            gantt=portfolio["gantt"],
+            portfolio_summary=portfolio["portfolio_summary"],
+            timestamp=get_current_timestamp()
+        )
+
+        await ctx.send(sender, response)
+        logger.info(f"Sent portfolio timeline: {len(portfolio['orders'])} planned, {len(portfolio['rejected_orders'])} rejected")
+
+    @agent.on_event("startup")
+    async def restore_capacity_bookings(ctx: Context):
+        bookings = ctx.storage.get(CAPACITY_BOOKINGS_KEY) or {}
+        if bookings:
+            capacity_planner.schedule_orders(list(bookings.values()))
+        expire_capacity_bookings(ctx, capacity_planner)
+        logger.info(f"Restored {len(capacity_planner.orders)} capacity bookings")
+
+    @agent.on_message(ProductionCapacityBooking)
+    async def handle_capacity_booking(ctx: Context, sender: str, msg: ProductionCapacityBooking):
+        action = (msg.action or "confirm").strip().lower()
+        order_ids = msg.order_ids or [msg.request_id]
+        logger.info(f"Production Timeline Manager: {action} capacity for {len(order_ids)} orders from {sender}")
+
+        expire_capacity_bookings(ctx, capacity_planner)
+        bookings = ctx.storage.get(CAPACITY_BOOKINGS_KEY) or {}
+        placements, released, missing = [], [], []
+
+        if action == "confirm":
+            orders = []
+            for order_id in order_ids:
+                stored = ctx.storage.get(f"timeline:{order_id}")
+                if stored and stored.get("capacity_order"):
+                    orders.append(stored["capacity_order"])
+                else:
+                    missing.append(order_id)
+            placements = capacity_planner.schedule_orders(orders)
+            bookings.update({order["order_id"]: order for order in orders})
+        elif action in ("release", "cancel"):
+            for order_id in order_ids:
+                if capacity_planner.get_placement(order_id):
+                    capacity_planner.remove_order(order_id)
+                    released.append(order_id)
+                else:
+                    missing.append(order_id)
+                bookings.pop(order_id, None)
+        else:
+            logger.error(f"Unknown capacity booking action: {msg.action}")
+            return
+
+        ctx.storage.set(CAPACITY_BOOKINGS_KEY, bookings)
+
+        response = ProductionCapacityBookingResponse(
+            request_id=msg.request_id,
+            action=action,
+            bookings=placements,
+            released_order_ids=released,
+            missing_order_ids=missing,
             timestamp=get_current_timestamp()
         )
 
         await ctx.send(sender, response)
-        logger.info(f"Sent production timeline: {total_timeline_days} days total")
+        logger.info(f"Capacity {action}: {len(placements)} booked, {len(released)} released, {len(missing)} not found")
 
     return agent
 
 
+def quote_capacity(planner: CapacityPlanner, orders: List[Dict]) -> List[Dict]:
+    placements = planner.quote_orders(orders)
+    for placement in placements:
+        placement["booking_status"] = "booked" if planner.get_placement(placement["order_id"]) else "quoted"
+    return placements
+
+
+def serialize_capacity_order(order: Dict) -> Dict:
+    return {key: value.isoformat() if isinstance(value, date) else value for key, value in order.items()}
+
+
+def expire_capacity_bookings(ctx: Context, planner: CapacityPlanner):
+    if not planner.expire_orders():
+        return
+    bookings = ctx.storage.get(CAPACITY_BOOKINGS_KEY) or {}
+    ctx.storage.set(CAPACITY_BOOKINGS_KEY, {order_id: order for order_id, order in bookings.items() if order_id in planner.orders})
+
+
+def apply_timeline_slip(stored: Dict, slips: Dict[str, int]) -> Tuple[Dict, List[Dict]]:
+    template = get_schedule_template(stored["garment_type"], stored["supplier"])[1]
+    state, changes = replan_schedule(template, stored["state"], slips)
+
+    start_date = datetime.fromisoformat(stored["start_date"])
+    for change in changes:
+        change["start_date"] = calculate_completion_date(start_date, change["early_start"])
+        change["finish_date"] = calculate_completion_date(start_date, change["early_finish"])
+
+    return {**stored, "state": state}, changes
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def get_schedule_template(garment_type: str, supplier_name: str) -> Tuple[Tuple[Dict, ...], ScheduleTemplate]:
+    supplier_data = get_supplier_data(supplier_name)
+    phases = calculate_production_phases(None, garment_type, 0, supplier_data, None)
+    return tuple(phases), build_schedule_template(phases)
+
+
+def plan_production_schedule(garment_type: str, supplier_name: str,
+                             delays: Optional[Dict[str, int]] = None) -> Tuple[List[Dict], Dict]:
+    phase_templates, template = get_schedule_template(garment_type, supplier_name)
+
+    durations = list(template.durations)
+    for position, name in enumerate(template.names):
+        durations[position] += (delays or {}).get(name, 0)
+    schedule = compute_schedule(template, durations)
+
+    phases = []
+    for phase, timing in zip(phase_templates, schedule["phases"]):
+        phases.append({**phase, **timing})
+
+    return phases, schedule
+
+
+def build_capacity_order(order_id: str, garment_type: str, units: int, supplier_name: str, supplier: Dict,
+                         phases: List[Dict], schedule: Dict, target_launch_date: Optional[str],
+                         priority: Optional[int], start_date: date = None) -> Dict:
+
+    bulk = next(phase for phase in phases if phase["phase_name"] == "Bulk Production")
+    start_date = start_date or datetime.now().date()
+
+    due_date = None
+    if target_launch_date:
+        launch = datetime.strptime(target_launch_date, "%Y-%m-%d").date()
+        due_date = launch - timedelta(days=schedule["duration_days"] - bulk["late_finish"])
+
+    return {
+        "order_id": order_id,
+        "supplier": supplier_name,
+        "garment_type": garment_type,
+        "units": units,
+        "priority": priority if priority is not None else DEFAULT_PRIORITY,
+        "release_date": start_date + timedelta(days=bulk["early_start"]),
+        "due_date": due_date,
+        "bulk_days": supplier["lead_time_bulk"]
+    }
+
+
+def plan_timeline_portfolio(planner: CapacityPlanner, request_id: str, orders: List[Dict],
+                            today: date = None) -> Dict:
+    today = today or datetime.now().date()
+    suppliers = {}
+    calendar_risks = {}
+    planned = []
+    rejected = []
+
+    for index, order in enumerate(orders):
+        order_id = str(order.get("order_id") or f"{request_id}-{index + 1}")
+        supplier_name = order.get("supplier")
+
+        if supplier_name not in suppliers:
+            suppliers[supplier_name] = get_supplier_data(supplier_name) if supplier_name else None
+        supplier = suppliers[supplier_name]
+
+        if not supplier:
+            rejected.append({"order_id": order_id, "reason": f"Supplier not found: {supplier_name}"})
+            continue
+        if not order.get("garment_type") or not order.get("units"):
+            rejected.append({"order_id": order_id, "reason": "Missing garment_type or units"})
+            continue
+
+        start_date = resolve_start_date(order.get("order_month"), today)
+        phases, schedule = plan_production_schedule(order["garment_type"], supplier_name)
+        planned.append({
+            "order_id": order_id,
+            "order": order,
+            "supplier": supplier,
+            "start_date": start_date,
+            "phases": phases,
+            "schedule": schedule
+        })
+
+    for entry in planned:
+        entry["capacity_order"] = build_capacity_order(
+            entry["order_id"],
+            entry["order"]["garment_type"],
+            entry["order"]["units"],
+            entry["order"]["supplier"],
+            entry["supplier"],
+            entry["phases"],
+            entry["schedule"],
+            entry["order"].get("target_launch_date"),
+            entry["order"].get("priority"),
+            entry["start_date"]
+        )
+
+    placements = quote_capacity(planner, [entry["capacity_order"] for entry in planned])
+    placements = {placement["order_id"]: placement for placement in placements}
+
+    results = []
+    for entry in planned:
+        order = entry["order"]
+        supplier = entry["supplier"]
+        placement = placements[entry["order_id"]]
+
+        phases, schedule = entry["phases"], entry["schedule"]
+        if placement["queue_delay_days"] > 0:
+            phases, schedule = plan_production_schedule(
+                order["garment_type"],
+                order["supplier"],
+                {"Bulk Production": placement["queue_delay_days"]}
+            )
+        entry["phases"] = phases
+
+        window_key = (
+            supplier["location"],
+            entry["start_date"],
+            tuple((phase["phase_name"], phase["early_start"], phase["early_finish"]) for phase in phases)
+        )
+        if window_key not in calendar_risks:
+            calendar_risks[window_key] = get_risk_calendar().assess_phases(supplier["location"], phases, entry["start_date"])
+
+        risk_factors = calendar_risks[window_key] + assess_risk_factors(
+            None,
+            supplier["location"],
+            order.get("order_month"),
+            order.get("target_launch_date"),
+            order.get("complexity")
+        )
+
+        total_timeline_days = schedule["duration_days"]
+        completion_date = entry["start_date"] + timedelta(days=total_timeline_days)
+
+        launch_slack_days = None
+        if order.get("target_launch_date"):
+            launch_date = datetime.strptime(order["target_launch_date"], "%Y-%m-%d").date()
+            launch_slack_days = (launch_date - completion_date).days
+
+        results.append({
+            "order_id": entry["order_id"],
+            "garment_type": order["garment_type"],
+            "supplier": order["supplier"],
+            "units": order["units"],
+            "start_date": entry["start_date"].isoformat(),
+            "total_timeline_days": total_timeline_days,
+            "estimated_completion_date": completion_date.isoformat(),
+            "target_launch_date": order.get("target_launch_date"),
+            "launch_slack_days": launch_slack_days,
+            "is_timeline_achievable": launch_slack_days is None or launch_slack_days >= 0,
+            "critical_path": [phase["phase_name"] for phase in phases if phase["is_critical"] and phase["duration_days"] > 0],
+            "risk_factors": [
+                {
+                    "risk_name": risk["risk_name"],
+                    "phase": risk.get("phase"),
+                    "probability": risk["probability"],
+                    "delay_days": risk["delay_days"]
+                }
+                for risk in risk_factors
+            ],
+            "capacity_schedule": placement
+        })
+
+    logger.info(f"Portfolio planned {len(results)} orders across {len(suppliers)} suppliers with {len(calendar_risks)} distinct risk windows")
+
+    return {
+        "planned": planned,
+        "orders": results,
+        "rejected_orders": rejected,
+        "gantt": build_portfolio_gantt(planned),
+        "portfolio_summary": summarize_portfolio(results)
+    }
+
+
+def build_portfolio_gantt(planned: List[Dict]) -> Dict:
+    if not planned:
+        return {"origin_date": None, "order_ids": [], "phase_names": [], "start": [], "finish": [], "critical": []}
+
+    origin = min(entry["start_date"] for entry in planned)
+    phase_names = []
+    phase_index = {}
+    for entry in planned:
+        for phase in entry["phases"]:
+            if phase["phase_name"] not in phase_index:
+                phase_index[phase["phase_name"]] = len(phase_names)
+                phase_names.append(phase["phase_name"])
+
+    start = np.full((len(planned), len(phase_names)), -1, dtype=np.int32)
+    finish = np.full((len(planned), len(phase_names)), -1, dtype=np.int32)
+    critical = np.zeros((len(planned), len(phase_names)), dtype=np.int8)
+
+    for row, entry in enumerate(planned):
+        offset = (entry["start_date"] - origin).days
+        for phase in entry["phases"]:
+            column = phase_index[phase["phase_name"]]
+            start[row, column] = offset + phase["early_start"]
+            finish[row, column] = offset + phase["early_finish"]
+            critical[row, column] = phase["is_critical"] and phase["duration_days"] > 0
+
+    return {
+        "origin_date": origin.isoformat(),
+        "order_ids": [entry["order_id"] for entry in planned],
+        "phase_names": phase_names,
+        "start": start.tolist(),
+        "finish": finish.tolist(),
+        "critical": critical.tolist()
+    }
+
+
+def summarize_portfolio(results: List[Dict]) -> Dict:
+    by_supplier = {}
+    for result in results:
+        summary = by_supplier.setdefault(result["supplier"], {"orders": 0, "units": 0, "late_orders": 0})
+        summary["orders"] += 1
+        summary["units"] += result["units"]
+        summary["late_orders"] += not result["is_timeline_achievable"]
+
+    return {
+        "orders_planned": len(results),
+        "orders_achievable": sum(1 for result in results if result["is_timeline_achievable"]),
+        "latest_completion_date": max((result["estimated_completion_date"] for result in results), default=None),
+        "total_units": sum(result["units"] for result in results),
+        "suppliers": by_supplier
+    }
+
+
 def get_supplier_data(supplier_name: str) -> Dict:
     suppliers = {
         "EcoKnits-Tirupur": {
@@ -153,17 +628,112 @@ def get_supplier_data(supplier_name: str) -> Dict:
     return suppliers.get(supplier_name)
 
 
+@lru_cache(maxsize=None)
+def get_transit_range(location: str) -> Optional[Tuple[float, float]]:
+    clearance = (0, 0)
+    for _, attributes in iter_entities("financial_logistics.metta", "customs-clearance"):
+        clearance = parse_range(attributes.get("clearance-time-days", [None])[0]) or clearance
+        break
+
+    origin_prefix = location.lower().replace(" ", "-")
+    for name, attributes in iter_entities("financial_logistics.metta", "shipping-cost"):
+        origin = attributes.get("origin", [""])[0]
+        transit = parse_range(attributes.get("transit-days", [None])[0])
+        if name == "sea-freight" and isinstance(origin, str) and origin.startswith(origin_prefix) and transit:
+            return transit[0] + clearance[0], transit[1] + clearance[1]
+
+    return None
+
+
+@lru_cache(maxsize=None)
+def get_revision_day_range() -> Tuple[float, float]:
+    days = [
+        first_number(attributes.get("additional-days", []))
+        for _, attributes in iter_entities("production_workflow.metta", "revision-reason")
+    ]
+    days = [day for day in days if day is not None]
+    return (min(days), max(days)) if days else (3, 14)
+
+
+def estimate_duration_ranges(phases: List[Dict], supplier: Dict) -> Tuple[List[float], List[float], List[float]]:
+    low, mode, high = [], [], []
+
+    for phase in phases:
+        duration = phase["duration_days"]
+        name = phase["phase_name"]
+
+        if name == "Bulk Production":
+            optimistic = supplier["lead_time_rush"] or duration * BULK_DURATION_SPREAD[0]
+            bounds = (optimistic, duration * BULK_DURATION_SPREAD[1])
+        elif name == "Sample Revisions":
+            min_days, max_days = get_revision_day_range()
+            rounds = max(round(duration / 7), 1)
+            bounds = (rounds * min_days, rounds * max_days)
+        elif name == "Shipping & Logistics" and duration > 0:
+            bounds = get_transit_range(supplier["location"]) or (duration * DEFAULT_DURATION_SPREAD[0], duration * DEFAULT_DURATION_SPREAD[1])
+        else:
+            bounds = (duration * DEFAULT_DURATION_SPREAD[0], duration * DEFAULT_DURATION_SPREAD[1])
+
+        low.append(min(bounds[0], duration))
+        mode.append(duration)
+        high.append(max(bounds[1], duration))
+
+    return low, mode, high
+
+
+def simulate_completion_distribution(phases: List[Dict], template: ScheduleTemplate, supplier: Dict,
+                                     risk_factors: List[Dict], target_launch_date: str,
+                                     rng: np.random.Generator,
+                                     trials: int = DEFAULT_SIMULATION_TRIALS,
+                                     start_date: datetime = None) -> Dict:
+
+    start_date = start_date or datetime.now()
+    low, mode, high = estimate_duration_ranges(phases, supplier)
+    durations = sample_pert_durations(low, mode, high, rng, trials)
+
+    positions = {name: position for position, name in enumerate(template.names)}
+    for risk in risk_factors:
+        phase_name = risk.get("phase") or RISK_PHASES.get(risk["risk_name"], "Bulk Production")
+        position = positions.get(phase_name, positions.get("Bulk Production"))
+        delay = risk.get("delay_days", 0)
+        if position is None or delay <= 0:
+            continue
+        occurs = rng.random(trials) < RISK_PROBABILITIES.get(risk.get("probability"), 0.3)
+        durations[position] += occurs * rng.triangular(delay * 0.5, delay, delay * 1.5, trials)
+
+    completion = np.ceil(simulate_completion(template, durations))
+    p50, p80, p95 = np.percentile(completion, [50, 80, 95])
+
+    result = {
+        "trials": trials,
+        "deterministic_days": int(max(phase["early_finish"] for phase in phases)),
+        "mean_days": round(float(completion.mean()), 1),
+        "p50_days": int(p50),
+        "p80_days": int(p80),
+        "p95_days": int(p95),
+        "p50_date": calculate_completion_date(start_date, int(p50)),
+        "p80_date": calculate_completion_date(start_date, int(p80)),
+        "p95_date": calculate_completion_date(start_date, int(p95)),
+        "on_time_probability": None
+    }
+
+    if target_launch_date:
+        available_days = (datetime.strptime(target_launch_date, "%Y-%m-%d") - start_date).days
+        result["on_time_probability"] = round(float((completion <= available_days).mean()) * 100, 1)
+
+    return result
+
+
 def calculate_production_phases(metta_kb, garment_type: str, units: int, supplier: Dict, order_month: str) -> List[Dict]:
     phases = []
 
     phases.append({
-        "phase_name": "Tech Pack Finalization & Fabric Procurement",
-        "description": "Finalize technical specifications and source materials",
+        "phase_name": "Tech Pack Finalization",
+        "description": "Finalize technical specifications and approve materials",
         "duration_days": 14,
         "activities": [
             "Tech pack review and approval",
             "Fabric swatch approval",
-            "Trim procurement",
             "Sample fabric cutting"
         ],
         "dependencies": [],
@@ -171,6 +741,21 @@ def calculate_production_phases(metta_kb, garment_type: str, units: int, supplie
         "communication_frequency": "Daily"
     })
 
+    phases.append({
+        "phase_name": "Fabric & Trim Procurement",
+        "description": "Source bulk fabric and trims alongside tech pack finalization",
+        "duration_days": 14,
+        "activities": [
+            "Bulk fabric booking",
+            "Trim procurement",
+            "Lab dip approval",
+            "Fabric and trim inbound to factory"
+        ],
+        "dependencies": [],
+        "checkpoints": ["Bulk fabric in-house", "Trims in-house"],
+        "communication_frequency": "Twice weekly"
+    })
+
     phases.append({
         "phase_name": "Sampling & Development",
         "description": "Create and revise pre-production samples",
@@ -181,7 +766,7 @@ def calculate_production_phases(metta_kb, garment_type: str, units: int, supplie
             "Fit and quality review",
             "Revision request submission"
         ],
-        "dependencies": ["Tech Pack Finalization & Fabric Procurement"],
+        "dependencies": ["Tech Pack Finalization"],
         "checkpoints": ["Pre-production sample approval"],
         "communication_frequency": "Daily during development"
     })
@@ -213,7 +798,10 @@ def calculate_production_phases(metta_kb, garment_type: str, units: int, supplie
             "Finishing and pressing",
             "Inline quality inspections"
         ],
-        "dependencies": ["Sample Revisions" if revision_rounds > 0 else "Sampling & Development"],
+        "dependencies": [
+            "Sample Revisions" if revision_rounds > 0 else "Sampling & Development",
+            "Fabric & Trim Procurement"
+        ],
         "checkpoints": [
             "Fabric inspection (Day 0)",
             "First article inspection (Day 5)",
@@ -273,7 +861,8 @@ def calculate_production_phases(metta_kb, garment_type: str, units: int, supplie
     return phases
 
 
-def insert_quality_checkpoints(metta_kb, garment_type: str, units: int, phases: List[Dict]) -> List[Dict]:
+def insert_quality_checkpoints(metta_kb, garment_type: str, units: int, phases: List[Dict],
+                               inspection_level: str = DEFAULT_INSPECTION_LEVEL) -> List[Dict]:
     quality_gates = []
 
     quality_gates.append({
@@ -304,42 +893,38 @@ def insert_quality_checkpoints(metta_kb, garment_type: str, units: int, phases:
         "stop_production_if_failed": True
     })
 
-    sample_size_20 = calculate_aql_sample_size(units * 0.2)
+    major_plans, minor_plans = get_lot_inspection_plans(units, inspection_level)
+
     quality_gates.append({
         "checkpoint_name": "Inline Inspection 20%",
         "timing": "20% production complete",
         "phase": "Bulk Production",
-        "inspections": ["Random sampling AQL 2.5", "Workmanship check"],
-        "sample_size": sample_size_20,
-        "tolerance_defects": "0 critical, 1 major allowed, 3 minor allowed",
+        "inspections": [f"Random sampling AQL {MAJOR_DEFECT_AQL}", "Workmanship check"],
+        **format_inspection_plan(major_plans[0], minor_plans[0], inspection_level),
         "corrective_action": "Adjust process immediately",
         "turnaround": "4 hours",
         "cost": "Included in production",
         "critical": False
     })
 
-    sample_size_50 = calculate_aql_sample_size(units * 0.5)
     quality_gates.append({
         "checkpoint_name": "Inline Inspection 50%",
         "timing": "50% production complete",
         "phase": "Bulk Production",
-        "inspections": ["Random sampling AQL 2.5", "Packaging check"],
-        "sample_size": sample_size_50,
-        "tolerance_defects": "0 critical, 2 major allowed, 5 minor allowed",
+        "inspections": [f"Random sampling AQL {MAJOR_DEFECT_AQL}", "Packaging check"],
+        **format_inspection_plan(major_plans[1], minor_plans[1], inspection_level),
         "corrective_action": "Rework defects, adjust process",
         "turnaround": "4 hours",
         "cost": "Included in production",
         "critical": False
     })
 
-    sample_size_final = calculate_aql_sample_size(units)
     quality_gates.append({
         "checkpoint_name": "Final Random Inspection (FRI)",
         "timing": "100% production complete, before shipment",
         "phase": "Quality Control & Inspection",
-        "inspections": ["Full random inspection AQL 2.5", "Packing verification"],
-        "sample_size": sample_size_final,
-        "tolerance_defects": "0 critical, 3 major allowed, 7 minor allowed",
+        "inspections": [f"Full random inspection AQL {MAJOR_DEFECT_AQL}", "Packing verification"],
+        **format_inspection_plan(major_plans[2], minor_plans[2], inspection_level),
         "approval_requirements": "Third-party inspection certificate",
         "turnaround": "1 business day",
         "cost": "$200-400",
@@ -366,23 +951,31 @@ def get_defect_prone_areas(garment_type: str) -> List[str]:
     return ["General construction"]
 
 
-def calculate_aql_sample_size(lot_size: float) -> int:
-    lot_size = int(lot_size)
+def get_lot_inspection_plans(units: int, inspection_level: str) -> Tuple[List[Tuple], List[Tuple]]:
+    lot_sizes = [max(int(units * fraction), 1) for fraction in INSPECTION_LOT_FRACTIONS]
+    plans = []
+
+    for aql in (MAJOR_DEFECT_AQL, MINOR_DEFECT_AQL):
+        batch = get_inspection_plans(lot_sizes, aql, inspection_level)
+        plans.append(list(zip(
+            batch["code_letter"].tolist(),
+            batch["sample_size"].tolist(),
+            batch["accept"].tolist(),
+            batch["reject"].tolist()
+        )))
 
-    if lot_size <= 90:
-        return 13
-    elif lot_size <= 150:
-        return 20
-    elif lot_size <= 280:
-        return 32
-    elif lot_size <= 500:
-        return 50
-    elif lot_size <= 1200:
-        return 80
-    elif lot_size <= 3200:
-        return 125
-    else:
-        return 200
+    return plans[0], plans[1]
+
+
+def format_inspection_plan(major: Tuple, minor: Tuple, inspection_level: str) -> Dict:
+    return {
+        "inspection_level": inspection_level,
+        "code_letter": major[0],
+        "sample_size": max(major[1], minor[1]),
+        "major_plan": {"aql": MAJOR_DEFECT_AQL, "sample_size": major[1], "accept": major[2], "reject": major[3]},
+        "minor_plan": {"aql": MINOR_DEFECT_AQL, "sample_size": minor[1], "accept": minor[2], "reject": minor[3]},
+        "tolerance_defects": f"0 critical, {major[2]} major allowed, {minor[2]} minor allowed"
+    }
 
 
 def estimate_revision_rounds(garment_type: str, defect_rate: float) -> int:
@@ -420,40 +1013,30 @@ def calculate_shipping_duration(location: str) -> int:
     return shipping_durations.get(location, 18)
 
 
-def assess_risk_factors(metta_kb, location: str, order_month: str, target_launch: str, complexity: str) -> List[Dict]:
-    risk_factors = []
+def resolve_start_date(order_month: Optional[str], today: date = None) -> date:
+    today = today or datetime.now().date()
+    if not order_month:
+        return today
 
-    if location in ["China", "Vietnam", "Taiwan"]:
-        if order_month and order_month.lower() in ["january", "february"]:
-            risk_factors.append({
-                "risk_name": "Chinese New Year Factory Closure",
-                "impact": "14-21 day production halt",
-                "probability": "High",
-                "mitigation": "Place order 60 days before CNY or plan for delay",
-                "delay_days": 21,
-                "affected_regions": ["China", "Vietnam", "Taiwan"]
-            })
+    try:
+        month = datetime.strptime(order_month.strip().title(), "%B").month
+    except ValueError:
+        logger.warning(f"Unrecognized order month {order_month}, planning from today")
+        return today
 
-    if location in ["India", "Bangladesh"]:
-        if order_month and order_month.lower() in ["june", "july", "august", "september"]:
-            risk_factors.append({
-                "risk_name": "Monsoon Season Delays",
-                "impact": "Shipping delays, fabric procurement delays",
-                "probability": "Medium",
-                "mitigation": "Add 1 week buffer to timeline",
-                "delay_days": 7,
-                "affected_regions": ["India", "Bangladesh", "South Asia"]
-            })
+    if month == today.month:
+        return today
+    year = today.year if month > today.month else today.year + 1
+    return date(year, month, 1)
 
-    if order_month and order_month.lower() in ["october", "november", "december"]:
-        risk_factors.append({
-            "risk_name": "Peak Season Port Congestion",
-            "impact": "1-2 weeks customs clearance delay",
-            "probability": "Medium-High",
-            "mitigation": "Book freight early, consider air freight backup",
-            "delay_days": 10,
-            "affected_ports": ["Los Angeles", "Long Beach", "New York"]
-        })
+
+def assess_risk_factors(metta_kb, location: str, order_month: str, target_launch: str, complexity: str,
+                        phases: Optional[List[Dict]] = None, start_date: date = None) -> List[Dict]:
+    risk_factors = []
+
+    if phases:
+        start_date = start_date or resolve_start_date(order_month)
+        risk_factors.extend(get_risk_calendar().assess_phases(location, phases, start_date))
 
     if complexity and complexity.lower() in ["high", "complex"]:
         risk_factors.append({
@@ -482,15 +1065,13 @@ def identify_critical_path(phases: List[Dict], risk_factors: List[Dict]) -> List
     critical_path = []
 
     for phase in phases:
-        if phase["phase_name"] in [
-            "Sampling & Development",
-            "Bulk Production",
-            "Shipping & Logistics"
-        ]:
+        if phase.get("is_critical") and phase["duration_days"] > 0:
             critical_path.append({
                 "phase": phase["phase_name"],
                 "duration": phase["duration_days"],
-                "reasoning": "Sequential dependency, cannot be parallelized",
+                "early_start": phase["early_start"],
+                "early_finish": phase["early_finish"],
+                "reasoning": "Zero slack, any delay moves the completion date",
                 "optimization_potential": get_optimization_potential(phase["phase_name"])
             })
 
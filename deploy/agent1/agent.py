@@ -9,11 +9,11 @@ from uagents_core.contrib.protocols.chat import (
 )
 from datetime import datetime
 from uuid import uuid4
-import re
 import sys
 import os
 
 from metta_loader import MettaKnowledgeBase
+from query_extractor import extract_query_fields
 
 SYSTEM_PROMPT = """You are a BOM & Costing Specialist for fashion supply chain, a world-class expert in garment production costing and bill of materials analysis. Your role is to provide manufacturers and fashion brands with precise cost calculations that enable profitable production decisions.
 
@@ -112,6 +112,14 @@ metta_kb.load_all([
     "financial_models.metta"
 ])
 
+GARMENT_LABELS = {
+    "t-shirt-basic": "t-shirt",
+    "hoodie-pullover": "hoodie",
+    "jogger-pants": "jogger",
+    "leggings-activewear": "leggings",
+    "jacket-bomber": "bomber-jacket"
+}
+
 chat_proto = Protocol(spec=chat_protocol_spec)
 
 @chat_proto.on_message(ChatMessage)
@@ -175,19 +183,11 @@ async def handle_acknowledgement(ctx: Context, sender: str, msg: ChatAcknowledge
 
 def calculate_bom_from_query(query: str) -> str:
     query_lower = query.lower()
+    fields = extract_query_fields(query)
 
-    garment_type = "hoodie"
-    if "t-shirt" in query_lower or "tshirt" in query_lower or "tee" in query_lower:
-        garment_type = "t-shirt"
-    elif "jogger" in query_lower or "pants" in query_lower:
-        garment_type = "jogger"
-    elif "legging" in query_lower:
-        garment_type = "leggings"
-    elif "jacket" in query_lower or "bomber" in query_lower:
-        garment_type = "bomber-jacket"
-
-    units_match = re.search(r'(\d+)\s*units?', query_lower)
-    units = int(units_match.group(1)) if units_match else 500
+    garment_type = GARMENT_LABELS.get(fields.get("garment_type"), "hoodie")
+    units = fields.get("units", 500)
+    location = fields.get("country")
 
     supplier = "EcoKnits-Tirupur"
     supplier_location = "India"
@@ -201,11 +201,11 @@ def calculate_bom_from_query(query: str) -> str:
     else:
         supplier_labor = 0.045
 
-    if "china" in query_lower or "guangzhou" in query_lower:
+    if location == "China":
         supplier = "ChinaScale-Guangzhou"
         supplier_labor = 0.038
         supplier_location = "China"
-    elif "vietnam" in query_lower:
+    elif location == "Vietnam":
         supplier = "VietnamTex-HoChiMinh"
         supplier_location = "Vietnam"
         supplier_query_result = metta_kb.query(f'(supplier {supplier} (labor-cost-per-minute ?rate usd))')
@@ -216,23 +216,23 @@ def calculate_bom_from_query(query: str) -> str:
                 supplier_labor = 0.042
         else:
             supplier_labor = 0.042
-    elif "portugal" in query_lower or "porto" in query_lower:
+    elif location == "Portugal":
         supplier = "PortugalPremium-Porto"
         supplier_labor = 0.120
         supplier_location = "Portugal"
-    elif "usa" in query_lower or "los angeles" in query_lower:
+    elif location == "USA":
         supplier = "MakersRow-LosAngeles"
         supplier_labor = 0.180
         supplier_location = "USA"
-    elif "bangladesh" in query_lower or "dhaka" in query_lower:
+    elif location == "Bangladesh":
         supplier = "DhakaGarments-Bangladesh"
         supplier_labor = 0.035
         supplier_location = "Bangladesh"
-    elif "turkey" in query_lower or "istanbul" in query_lower:
+    elif location == "Turkey":
         supplier = "IstanbulTextile-Turkey"
         supplier_labor = 0.065
         supplier_location = "Turkey"
-    elif "mexico" in query_lower:
+    elif location == "Mexico":
         supplier = "MexicoMfg-Tijuana"
         supplier_labor = 0.095
         supplier_location = "Mexico"
@@ -0,0 +1,180 @@
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Tuple
+import calendar
+import logging
+import re
+
+from metta_facts import iter_entities, load_metta_file
+
+logger = logging.getLogger(__name__)
+
+PARSE_CACHE_SIZE = 1024
+MIN_BUDGET_AMOUNT = 1000
+CONTEXT_WINDOW = 40
+
+MONTH_PREFIX = re.compile(r'\b(?:in|for|by|during|until|till|before|after|from|since|of|mid|early|late|end|next|this|last)[\s\-]+$')
+MONTH_SUFFIX = re.compile(r'^[\s\-]*(?:\d{1,2}(?:st|nd|rd|th)?\b|\d{4}\b|delivery|shipment|launch|drop|production|order)')
+BUDGET_PREFIX = re.compile(r'\b(?:budget|total|spend|spending|max|maximum|up\s+to|cap|capped|under|within|afford|invest)\b[^$\d]*$')
+UNIT_PRICE_SUFFIX = re.compile(r'^\s*(?:/|per\b|each\b|ea\b|apiece\b|a\s+(?:unit|piece)\b)')
+
+
+class Entity(NamedTuple):
+    type: str
+    value: Any
+    text: str
+    start: int
+    end: int
+    confidence: float
+
+
+def normalize_term(term: str) -> str:
+    return re.sub(r'[\s\-]+', '', term.lower())
+
+
+def format_country(token: str) -> str:
+    name = token.replace("-", " ")
+    return name.upper() if len(name) <= 3 else name.title()
+
+
+def build_vocabulary() -> Tuple[Dict[str, List[Tuple[str, Any, float]]], List[str]]:
+    vocabulary = {}
+    terms = set()
+
+    def add(term, entity_type, value, confidence):
+        terms.add(term.lower())
+        entries = vocabulary.setdefault(normalize_term(term), [])
+        if not any(entry[0] == entity_type for entry in entries):
+            entries.append((entity_type, value, confidence))
+
+    for garment, attributes in iter_entities("garment_specs.metta", "garment-type"):
+        add(garment, "garment_type", garment, 1.0)
+        for alias in attributes.get("aliases", []):
+            add(alias, "garment_type", garment, 0.9)
+
+    for fabric, attributes in iter_entities("materials_database.metta", "fabric"):
+        add(fabric, "fabric", fabric, 1.0)
+        for alias in attributes.get("aliases", []):
+            add(alias, "fabric", fabric, 0.9)
+        for origin in attributes.get("origin", []):
+            add(origin, "country", format_country(origin), 0.8)
+
+    for supplier, attributes in iter_entities("supplier_intelligence.metta", "supplier"):
+        add(supplier, "supplier", supplier, 1.0)
+        add(supplier.split("-")[0], "supplier", supplier, 0.95)
+
+        location = [token for token in attributes.get("location", []) if isinstance(token, str)]
+        if location:
+            country = location[-1]
+            add(country, "country", format_country(country), 1.0)
+            add(country, "supplier", supplier, 0.8)
+            for place in location[:-1]:
+                add(place, "supplier", supplier, 0.9)
+                add(place, "country", format_country(country), 0.9)
+
+    for _, attributes in iter_entities("materials_database.metta", "size-run"):
+        for size in attributes.get("sizes", []):
+            add(size, "size", size.lower(), 0.6)
+
+    for month in range(1, 13):
+        name = calendar.month_name[month].lower()
+        add(name, "month", name, 0.7 if name == "may" else 1.0)
+        add(calendar.month_abbr[month], "month", name, 0.7)
+    add("sept", "month", "september", 0.7)
+
+    return vocabulary, sorted(terms, key=len, reverse=True)
+
+
+def compile_pattern(vocabulary: Dict[str, List[Tuple[str, Any, float]]], terms: List[str]) -> re.Pattern:
+    term_patterns = [r'[\s\-]?'.join(re.escape(part) for part in re.split(r'[\s\-]+', term)) for term in terms]
+
+    sizes = [term for term in terms if any(entry[0] == "size" for entry in vocabulary[normalize_term(term)])]
+    size_pattern = "|".join(re.escape(size) for size in sizes) or r'(?!)'
+
+    return re.compile(
+        r'\b(?P<date>\d{4}-\d{2}-\d{2})\b'
+        r'|(?P<units>\d[\d,]*)\s*(?:units?|pcs|pieces)\b'
+        r'|(?P<styles>\d+)\s*styles?\b'
+        r'|(?P<budget>\$\s*\d[\d,]*(?:\.\d+)?\s*[km]?|\b\d+(?:\.\d+)?\s*k)\b'
+        r'|\bsize\s+(?P<size>' + size_pattern + r')\b'
+        r'|\b(?P<term>' + "|".join(term_patterns or [r'(?!)']) + r')s?\b',
+        re.IGNORECASE
+    )
+
+
+def load_extractor() -> Tuple[Dict[str, List[Tuple[str, Any, float]]], re.Pattern]:
+    vocabulary, terms = build_vocabulary()
+    logger.info(f"Query extractor compiled with {len(terms)} knowledge-base terms")
+    return vocabulary, compile_pattern(vocabulary, terms)
+
+
+_vocabulary, _pattern = load_extractor()
+
+
+def reload_vocabulary():
+    global _vocabulary, _pattern
+    load_metta_file.cache_clear()
+    _vocabulary, _pattern = load_extractor()
+    extract_entities.cache_clear()
+
+
+def parse_budget(text: str) -> float:
+    amount = float(re.sub(r'[^\d.]', '', text))
+    suffix = text.strip()[-1:].lower()
+    if suffix == "k":
+        amount *= 1000
+    elif suffix == "m":
+        amount *= 1000000
+    return amount
+
+
+def has_month_context(text: str, start: int, end: int) -> bool:
+    return bool(MONTH_PREFIX.search(text[max(start - CONTEXT_WINDOW, 0):start])
+                or MONTH_SUFFIX.match(text[end:end + CONTEXT_WINDOW]))
+
+
+def is_budget(text: str, start: int, end: int, matched: str, amount: float) -> bool:
+    if UNIT_PRICE_SUFFIX.match(text[end:end + CONTEXT_WINDOW]):
+        return False
+    if amount >= MIN_BUDGET_AMOUNT or matched.strip()[-1:].lower() in ("k", "m"):
+        return True
+    return bool(BUDGET_PREFIX.search(text[max(start - CONTEXT_WINDOW, 0):start]))
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def extract_entities(text: str) -> Tuple[Entity, ...]:
+    entities = []
+
+    for match in _pattern.finditer(text):
+        kind = match.lastgroup
+        matched = match.group(kind)
+        start, end = match.span()
+
+        if kind == "date":
+            entities.append(Entity("date", matched, matched, start, end, 1.0))
+        elif kind == "units":
+            entities.append(Entity("units", int(matched.replace(",", "")), match.group(0), start, end, 0.95))
+        elif kind == "styles":
+            entities.append(Entity("styles", int(matched), match.group(0), start, end, 0.95))
+        elif kind == "budget":
+            amount = parse_budget(matched)
+            if is_budget(text, start, end, matched, amount):
+                entities.append(Entity("budget", amount, matched, start, end, 0.9))
+        elif kind == "size":
+            entities.append(Entity("size", matched.lower(), match.group(0), start, end, 1.0))
+        else:
+            for entity_type, value, confidence in _vocabulary.get(normalize_term(matched), []):
+                if entity_type == "month" and confidence < 1.0 and not has_month_context(text, start, end):
+                    continue
+                entities.append(Entity(entity_type, value, matched, start, end, confidence))
+
+    return tuple(entities)
+
+
+def extract_query_fields(text: str) -> Dict[str, Any]:
+    best = {}
+    for entity in extract_entities(text.lower()):
+        current = best.get(entity.type)
+        if current is None or entity.confidence > current.confidence:
+            best[entity.type] = entity
+
+    return {entity_type: entity.value for entity_type, entity in best.items()}
@@ -11,6 +11,7 @@ from datetime import datetime
 from uuid import uuid4
 import re
 from metta_loader import MettaKnowledgeBase
+from query_extractor import extract_query_fields
 
 agent = Agent(
     name="moq_negotiation_strategist",
@@ -85,32 +86,12 @@ async def handle_acknowledgement(ctx: Context, sender: str, msg: ChatAcknowledge
     ctx.logger.info(f"Received acknowledgement from {sender}")
 
 def negotiate_moq_from_query(query: str) -> str:
-    query_lower = query.lower()
-
-    styles_match = re.search(r'(\d+)\s*styles?', query_lower)
-    num_styles = int(styles_match.group(1)) if styles_match else 3
-
-    budget_match = re.search(r'\$?\s*(\d+)k', query_lower)
-    budget = int(budget_match.group(1)) * 1000 if budget_match else 15000
-
-    month = "August"
-    if "september" in query_lower or "sept" in query_lower:
-        month = "September"
-    elif "october" in query_lower or "oct" in query_lower:
-        month = "October"
-    elif "november" in query_lower or "nov" in query_lower:
-        month = "November"
-    elif "december" in query_lower or "dec" in query_lower:
-        month = "December"
-
-    supplier = "EcoKnits-Tirupur"
-
-    if "vietnam" in query_lower:
-        supplier = "VietnamTex-HoChiMinh"
-    elif "portugal" in query_lower:
-        supplier = "PortugalPremium-Porto"
-    elif "china" in query_lower:
-        supplier = "ChinaScale-Guangzhou"
+    fields = extract_query_fields(query)
+
+    num_styles = fields.get("styles", 3)
+    budget = int(fields.get("budget", 15000))
+    month = fields.get("month", "august").title()
+    supplier = fields.get("supplier", "EcoKnits-Tirupur")
 
     supplier_query = metta_kb.query(f'(supplier {supplier} (moq-standard ?moq))')
     if supplier_query:
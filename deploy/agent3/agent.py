@@ -13,6 +13,7 @@ import re
 import sys
 
 from metta_loader import MettaKnowledgeBase
+from query_extractor import extract_query_fields
 
 agent = Agent(
     name="production_timeline_manager",
@@ -26,6 +27,14 @@ metta_kb.load_all([
     "garment_specs.metta"
 ])
 
+GARMENT_LABELS = {
+    "t-shirt-basic": "t-shirts",
+    "hoodie-pullover": "hoodies",
+    "jogger-pants": "pants",
+    "leggings-activewear": "leggings",
+    "jacket-bomber": "jackets"
+}
+
 chat_proto = Protocol(spec=chat_protocol_spec)
 
 @chat_proto.on_message(ChatMessage)
@@ -91,31 +100,12 @@ async def handle_acknowledgement(ctx: Context, sender: str, msg: ChatAcknowledge
 def calculate_timeline_from_query(query: str) -> str:
     query_lower = query.lower()
 
-    units_match = re.search(r'(\d+)\s*units?', query_lower)
-    units = int(units_match.group(1)) if units_match else 500
-
-    garment_type = "hoodies"
-    if "t-shirt" in query_lower or "tshirt" in query_lower:
-        garment_type = "t-shirts"
-    elif "jacket" in query_lower or "bomber" in query_lower:
-        garment_type = "jackets"
-    elif "pants" in query_lower or "jogger" in query_lower:
-        garment_type = "pants"
-
-    supplier_location = "India"
-    supplier = "EcoKnits-Tirupur"
-    if "china" in query_lower:
-        supplier_location = "China"
-        supplier = "ChinaScale-Guangzhou"
-    elif "vietnam" in query_lower:
-        supplier_location = "Vietnam"
-        supplier = "VietnamTex-HoChiMinh"
-    elif "portugal" in query_lower:
-        supplier_location = "Portugal"
-        supplier = "PortugalPremium-Porto"
-    elif "usa" in query_lower or "los angeles" in query_lower:
-        supplier_location = "USA (LA)"
-        supplier = "LADomestic-Downtown"
+    fields = extract_query_fields(query)
+
+    units = fields.get("units", 500)
+    garment_type = GARMENT_LABELS.get(fields.get("garment_type"), "hoodies")
+    supplier_location = fields.get("country", "India")
+    supplier = fields.get("supplier", "EcoKnits-Tirupur")
 
     shipping_query = metta_kb.query(f'(supplier {supplier} (logistics ?logistics))')
     shipping_days = 18
@@ -13,6 +13,7 @@ import re
 import sys
 
 from metta_loader import MettaKnowledgeBase
+from query_extractor import extract_query_fields
 
 agent = Agent(
     name="inventory_demand_forecaster",
@@ -25,6 +26,14 @@ metta_kb.load_all([
     "garment_specs.metta"
 ])
 
+GARMENT_LABELS = {
+    "t-shirt-basic": "t-shirts",
+    "hoodie-pullover": "hoodies",
+    "jogger-pants": "joggers",
+    "leggings-activewear": "leggings",
+    "jacket-bomber": "jackets"
+}
+
 chat_proto = Protocol(spec=chat_protocol_spec)
 
 @chat_proto.on_message(ChatMessage)
@@ -90,16 +99,10 @@ async def handle_acknowledgement(ctx: Context, sender: str, msg: ChatAcknowledge
 def forecast_inventory_from_query(query: str) -> str:
     query_lower = query.lower()
 
-    units_match = re.search(r'(\d+)\s*units?', query_lower)
-    total_units = int(units_match.group(1)) if units_match else 500
+    fields = extract_query_fields(query)
 
-    garment_type = "hoodies"
-    if "t-shirt" in query_lower or "tshirt" in query_lower:
-        garment_type = "t-shirts"
-    elif "jacket" in query_lower or "bomber" in query_lower:
-        garment_type = "jackets"
-    elif "legging" in query_lower or "tights" in query_lower:
-        garment_type = "leggings"
+    total_units = fields.get("units", 500)
+    garment_type = GARMENT_LABELS.get(fields.get("garment_type"), "hoodies")
 
     fit_type = "athletic"
     if "standard" in query_lower or "regular" in query_lower:
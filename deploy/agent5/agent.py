@@ -13,6 +13,7 @@ import re
 import sys
 
 from metta_loader import MettaKnowledgeBase
+from query_extractor import extract_query_fields
 
 agent = Agent(
     name="cash_flow_financial_planner",
@@ -89,13 +90,11 @@ async def handle_acknowledgement(ctx: Context, sender: str, msg: ChatAcknowledge
     ctx.logger.info(f"Received acknowledgement from {sender}")
 
 def calculate_cashflow_from_query(query: str) -> str:
-    query_lower = query.lower()
 
-    budget_match = re.search(r'\$?\s*(\d+)k', query_lower)
-    startup_budget = int(budget_match.group(1)) * 1000 if budget_match else 25000
+    fields = extract_query_fields(query)
 
-    units_match = re.search(r'(\d+)\s*units?', query_lower)
-    order_units = int(units_match.group(1)) if units_match else 500
+    startup_budget = int(fields.get("budget", 25000))
+    order_units = fields.get("units", 500)
 
     landed_cost_per_unit = 61.60
     retail_price_dtc = 172.48
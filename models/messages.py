@@ -11,6 +11,7 @@ class BOMCostingRequest(Model):
     units: int
     colors: Optional[List[str]] = None
     additional_trims: Optional[Dict] = None
+    as_of: Optional[str] = None
 
 
 class BOMCostingResponse(Model):
@@ -39,6 +40,33 @@ class BOMCostingResponse(Model):
     gross_margin_percentage: float
     cost_breakdown: Dict
     timestamp: str
+    rate_card_warning: Optional[str] = None
+
+
+class CollectionBOMRequest(Model):
+    request_id: str
+    collection_id: str
+    supplier: str
+    styles: List[Dict]
+    collection_version: Optional[str] = None
+    as_of: Optional[str] = None
+
+
+class CollectionBOMResponse(Model):
+    request_id: str
+    collection_id: str
+    collection_version: str
+    supplier: str
+    fabric_pools: List[Dict]
+    styles: List[Dict]
+    total_units: int
+    pooled_fabric_cost: float
+    standalone_fabric_cost: float
+    fabric_savings: float
+    fob_cost_total: float
+    landed_cost_total: float
+    timestamp: str
+    rate_card_warning: Optional[str] = None
 
 
 class MOQNegotiationRequest(Model):
@@ -51,6 +79,13 @@ class MOQNegotiationRequest(Model):
     payment_flexibility: Optional[str] = None
     fabrics: Optional[List[str]] = None
     colors: Optional[List[str]] = None
+    search_mode: Optional[str] = None
+    certifications: Optional[List[str]] = None
+    simulation_trials: Optional[int] = None
+    simulation_seed: Optional[int] = None
+    lever_flex_floor: Optional[float] = None
+    styles: Optional[List[Dict]] = None
+    allocation_objective: Optional[str] = None
 
 
 class MOQNegotiationResponse(Model):
@@ -63,6 +98,8 @@ class MOQNegotiationResponse(Model):
     total_units_required: int
     alternative_options: List[Dict]
     timestamp: str
+    pareto_frontier: Optional[List[Dict]] = None
+    collection_allocation: Optional[Dict] = None
 
 
 class ProductionTimelineRequest(Model):
@@ -73,6 +110,9 @@ class ProductionTimelineRequest(Model):
     order_month: Optional[str] = None
     target_launch_date: Optional[str] = None
     complexity: Optional[str] = None
+    simulation_trials: Optional[int] = None
+    priority: Optional[int] = None
+    inspection_level: Optional[str] = None
 
 
 class ProductionTimelineResponse(Model):
@@ -88,6 +128,53 @@ class ProductionTimelineResponse(Model):
     expedite_options: List[Dict]
     estimated_completion_date: str
     timestamp: str
+    completion_distribution: Optional[Dict] = None
+    capacity_schedule: Optional[Dict] = None
+
+
+class ProductionTimelineUpdate(Model):
+    request_id: str
+    phase_name: str
+    slip_days: int
+    reason: Optional[str] = None
+
+
+class ProductionTimelineUpdateResponse(Model):
+    request_id: str
+    changed_milestones: List[Dict]
+    critical_path: List[str]
+    total_timeline_days: int
+    estimated_completion_date: str
+    timestamp: str
+
+
+class ProductionTimelineBatchRequest(Model):
+    request_id: str
+    orders: List[Dict]
+
+
+class ProductionTimelineBatchResponse(Model):
+    request_id: str
+    orders: List[Dict]
+    rejected_orders: List[Dict]
+    gantt: Dict
+    portfolio_summary: Dict
+    timestamp: str
+
+
+class ProductionCapacityBooking(Model):
+    request_id: str
+    order_ids: Optional[List[str]] = None
+    action: str = "confirm"
+
+
+class ProductionCapacityBookingResponse(Model):
+    request_id: str
+    action: str
+    bookings: List[Dict]
+    released_order_ids: List[str]
+    missing_order_ids: List[str]
+    timestamp: str
 
 
 class InventoryForecastRequest(Model):
@@ -102,6 +189,15 @@ class InventoryForecastRequest(Model):
     lead_time_weeks: int
     expected_weekly_sales: float
     selling_season_weeks: int
+    location_weights: Optional[Dict[str, float]] = None
+    weekly_sales_history: Optional[List[float]] = None
+    season_length_weeks: Optional[int] = None
+    supplier: Optional[str] = None
+    sku_suppliers: Optional[Dict[str, str]] = None
+    service_level: Optional[float] = None
+    fill_rate_target: Optional[float] = None
+    unit_cost: Optional[float] = None
+    region: Optional[str] = None
 
 
 class InventoryForecastResponse(Model):
@@ -120,6 +216,81 @@ class InventoryForecastResponse(Model):
     timestamp: str
 
 
+class DemandForecastBatchRequest(Model):
+    request_id: str
+    skus: List[Dict]
+    horizon_weeks: Optional[int] = None
+    season_length_weeks: Optional[int] = None
+
+
+class DemandForecastBatchResponse(Model):
+    request_id: str
+    sku_forecasts: List[Dict]
+    color_forecasts: List[Dict]
+    style_forecasts: List[Dict]
+    model_summary: Dict
+    timestamp: str
+
+
+class SalesEventBatch(Model):
+    request_id: str
+    events: List[Dict]
+
+
+class SalesEventAck(Model):
+    request_id: str
+    events_ingested: int
+    skus_tracked: int
+    demand_updates: List[Dict]
+    timestamp: str
+    reorder_alerts: Optional[List[Dict]] = None
+
+
+class DeadStockRiskRequest(Model):
+    request_id: str
+    limit: Optional[int] = None
+    inventory: Optional[List[Dict]] = None
+    as_of: Optional[str] = None
+
+
+class DeadStockRiskResponse(Model):
+    request_id: str
+    risks: List[Dict]
+    summary: Dict
+    timestamp: str
+    error: Optional[str] = None
+
+
+class MarkdownPlanRequest(Model):
+    request_id: str
+    skus: Optional[List[Dict]] = None
+    limit: Optional[int] = None
+    salvage_rate: Optional[float] = None
+
+
+class MarkdownPlanResponse(Model):
+    request_id: str
+    plans: List[Dict]
+    summary: Dict
+    timestamp: str
+
+
+class LocationAllocationRequest(Model):
+    request_id: str
+    skus: List[Dict]
+    locations: List[Dict]
+    sku_location_demand: Optional[Dict[str, Dict[str, float]]] = None
+
+
+class LocationAllocationResponse(Model):
+    request_id: str
+    allocations: List[Dict]
+    location_summary: List[Dict]
+    reserve_units: int
+    expected_fill_rate: float
+    timestamp: str
+
+
 class CashFlowRequest(Model):
     request_id: str
     initial_capital: float
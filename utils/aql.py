@@ -0,0 +1,131 @@
+from bisect import bisect_left
+from typing import Dict, NamedTuple, Sequence, Union
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LOT_SIZE_UPPER_BOUNDS = [8, 15, 25, 50, 90, 150, 280, 500, 1200, 3200, 10000, 35000, 150000, 500000]
+
+CODE_LETTERS = "ABCDEFGHJKLMNPQR"
+
+SAMPLE_SIZES = [2, 3, 5, 8, 13, 20, 32, 50, 80, 125, 200, 315, 500, 800, 1250, 2000]
+
+INSPECTION_LEVEL_LETTERS = {
+    "I": "AABCCDEFGHJKLMN",
+    "II": "ABCDEFGHJKLMNPQ",
+    "III": "BCDEFGHJKLMNPQR"
+}
+
+AQL_VALUES = [0.65, 1.0, 1.5, 2.5, 4.0, 6.5]
+
+ZERO_ACCEPT_LETTER = {0.65: "F", 1.0: "E", 1.5: "D", 2.5: "C", 4.0: "B", 6.5: "A"}
+
+ACCEPT_SEQUENCE = [0, "up", "down", 1, 2, 3, 5, 7, 10, 14, 21]
+
+
+class InspectionPlan(NamedTuple):
+    code_letter: str
+    sample_size: int
+    accept: int
+    reject: int
+
+
+def build_level_rows() -> Dict[str, list]:
+    return {
+        level: [CODE_LETTERS.index(letter) for letter in letters]
+        for level, letters in INSPECTION_LEVEL_LETTERS.items()
+    }
+
+
+def build_plan_table() -> Dict[float, list]:
+    table = {}
+
+    for aql in AQL_VALUES:
+        start = CODE_LETTERS.index(ZERO_ACCEPT_LETTER[aql])
+        cells = []
+        for row in range(len(CODE_LETTERS)):
+            offset = row - start
+            if offset < 0:
+                cells.append("down")
+            elif offset < len(ACCEPT_SEQUENCE):
+                cells.append(ACCEPT_SEQUENCE[offset])
+            else:
+                cells.append("up")
+
+        resolved = []
+        for row, cell in enumerate(cells):
+            target = row
+            while cells[target] == "down":
+                target += 1
+            while cells[target] == "up":
+                target -= 1
+            resolved.append((target, cells[target], cells[target] + 1))
+        table[aql] = resolved
+
+    return table
+
+
+LEVEL_ROWS = build_level_rows()
+
+PLAN_TABLE = build_plan_table()
+
+_row_lookup = {level: np.array(rows) for level, rows in LEVEL_ROWS.items()}
+_plan_rows = {aql: np.array([plan[0] for plan in plans]) for aql, plans in PLAN_TABLE.items()}
+_plan_accept = {aql: np.array([plan[1] for plan in plans]) for aql, plans in PLAN_TABLE.items()}
+_sample_sizes = np.array(SAMPLE_SIZES)
+_letters = np.array(list(CODE_LETTERS))
+_lot_bounds = np.array(LOT_SIZE_UPPER_BOUNDS)
+
+
+def normalize_level(level: str) -> str:
+    level = str(level or "II").upper().replace("GENERAL", "").strip()
+    if level not in LEVEL_ROWS:
+        logger.warning(f"Unknown inspection level {level}, using II")
+        return "II"
+    return level
+
+
+def normalize_aql(aql: float) -> float:
+    aql = float(aql)
+    if aql not in PLAN_TABLE:
+        nearest = min(AQL_VALUES, key=lambda value: abs(value - aql))
+        logger.warning(f"AQL {aql} not tabulated, using {nearest}")
+        return nearest
+    return aql
+
+
+def sample_size_code_letter(lot_size: int, level: str = "II") -> str:
+    row = LEVEL_ROWS[normalize_level(level)][bisect_left(LOT_SIZE_UPPER_BOUNDS, max(int(lot_size), 2))]
+    return CODE_LETTERS[row]
+
+
+def get_inspection_plan(lot_size: int, aql: float = 2.5, level: str = "II") -> InspectionPlan:
+    lot_size = max(int(lot_size), 2)
+    letter_row = LEVEL_ROWS[normalize_level(level)][bisect_left(LOT_SIZE_UPPER_BOUNDS, lot_size)]
+    plan_row, accept, reject = PLAN_TABLE[normalize_aql(aql)][letter_row]
+
+    return InspectionPlan(
+        code_letter=CODE_LETTERS[plan_row],
+        sample_size=min(SAMPLE_SIZES[plan_row], lot_size),
+        accept=accept,
+        reject=reject
+    )
+
+
+def get_inspection_plans(lot_sizes: Union[Sequence[int], np.ndarray], aql: float = 2.5,
+                         level: str = "II") -> Dict[str, np.ndarray]:
+    lots = np.maximum(np.asarray(lot_sizes, dtype=np.int64), 2)
+    aql = normalize_aql(aql)
+
+    letter_rows = _row_lookup[normalize_level(level)][np.searchsorted(_lot_bounds, lots, side="left")]
+    plan_rows = _plan_rows[aql][letter_rows]
+    accept = _plan_accept[aql][letter_rows]
+
+    return {
+        "code_letter": _letters[plan_rows],
+        "sample_size": np.minimum(_sample_sizes[plan_rows], lots),
+        "accept": accept,
+        "reject": accept + 1
+    }
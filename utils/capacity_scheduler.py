@@ -0,0 +1,206 @@
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional
+import heapq
+import logging
+import math
+
+from utils.metta_facts import first_number, iter_entities, parse_range
+from utils.rate_cards import DateLike, to_date
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_SMV = 20
+WORKING_DAYS_PER_MONTH = 26
+OPERATORS_PER_LINE = 30
+SHIFT_MINUTES = 480
+LINE_EFFICIENCY = 0.65
+LINE_MINUTES_PER_DAY = OPERATORS_PER_LINE * SHIFT_MINUTES * LINE_EFFICIENCY
+
+DEFAULT_MONTHLY_CAPACITY = 20000
+DEFAULT_SMV = 25
+DEFAULT_BULK_DAYS = 35
+DEFAULT_PRIORITY = 5
+
+
+@lru_cache(maxsize=None)
+def get_supplier_line_count(supplier_name: str) -> int:
+    monthly_units = DEFAULT_MONTHLY_CAPACITY
+    for name, attributes in iter_entities("supplier_intelligence.metta", "supplier"):
+        if name == supplier_name:
+            monthly_units = first_number(attributes.get("capacity-monthly", []), DEFAULT_MONTHLY_CAPACITY)
+            break
+
+    daily_minutes = monthly_units * REFERENCE_SMV / WORKING_DAYS_PER_MONTH
+    return max(1, round(daily_minutes / LINE_MINUTES_PER_DAY))
+
+
+@lru_cache(maxsize=None)
+def get_garment_smv(garment_type: str) -> float:
+    for garment, attributes in iter_entities("garment_specs.metta", "garment-type"):
+        if garment_type == garment or garment_type in attributes.get("aliases", []):
+            smv = parse_range(attributes.get("smv-range", [None])[0])
+            if smv:
+                return (smv[0] + smv[1]) / 2
+    return DEFAULT_SMV
+
+
+class CapacityCalendar:
+    def __init__(self, supplier: str, lines: int, origin: date):
+        self.supplier = supplier
+        self.lines = lines
+        self.daily_capacity = lines * LINE_MINUTES_PER_DAY
+        self.origin = origin
+        self.used: List[float] = []
+        self.allocations: Dict[str, Dict[int, float]] = {}
+
+    def day_index(self, when: DateLike) -> int:
+        return max((to_date(when) - self.origin).days, 0)
+
+    def day_date(self, index: int) -> date:
+        return self.origin + timedelta(days=index)
+
+    def place(self, order_id: str, minutes: float, release_day: int, max_daily_minutes: float) -> Dict:
+        self.remove(order_id)
+
+        allocation = {}
+        remaining = minutes
+        day = release_day
+        while remaining > 1e-6:
+            if day >= len(self.used):
+                self.used.extend([0.0] * (day - len(self.used) + 64))
+            take = min(max_daily_minutes, self.daily_capacity - self.used[day], remaining)
+            if take > 1e-6:
+                self.used[day] += take
+                allocation[day] = take
+                remaining -= take
+            day += 1
+
+        self.allocations[order_id] = allocation
+        return {
+            "start_day": min(allocation, default=release_day),
+            "finish_day": max(allocation, default=release_day)
+        }
+
+    def remove(self, order_id: str):
+        for day, minutes in self.allocations.pop(order_id, {}).items():
+            self.used[day] = max(self.used[day] - minutes, 0.0)
+
+    def copy(self) -> "CapacityCalendar":
+        calendar = CapacityCalendar(self.supplier, self.lines, self.origin)
+        calendar.used = list(self.used)
+        calendar.allocations = {order_id: dict(allocation) for order_id, allocation in self.allocations.items()}
+        return calendar
+
+    def utilization(self, start_day: int, end_day: int) -> float:
+        window = self.used[start_day:end_day + 1]
+        if not window:
+            return 0.0
+        return sum(window) / (self.daily_capacity * (end_day - start_day + 1))
+
+
+class CapacityPlanner:
+    def __init__(self, origin: DateLike = None):
+        self.origin = to_date(origin)
+        self.calendars: Dict[str, CapacityCalendar] = {}
+        self.orders: Dict[str, Dict] = {}
+
+    def calendar_for(self, supplier: str) -> CapacityCalendar:
+        calendar = self.calendars.get(supplier)
+        if calendar is None:
+            calendar = CapacityCalendar(supplier, get_supplier_line_count(supplier), self.origin)
+            self.calendars[supplier] = calendar
+        return calendar
+
+    def insert_order(self, order: Dict) -> Dict:
+        calendar = self.calendar_for(order["supplier"])
+
+        units = order["units"]
+        minutes = units * (order.get("smv") or get_garment_smv(order.get("garment_type", "")))
+        target_days = order.get("bulk_days") or DEFAULT_BULK_DAYS
+        order_lines = min(calendar.lines, max(1, math.ceil(minutes / (LINE_MINUTES_PER_DAY * target_days))))
+        max_daily_minutes = order_lines * LINE_MINUTES_PER_DAY
+
+        release_day = calendar.day_index(order.get("release_date"))
+        placement = calendar.place(order["order_id"], minutes, release_day, max_daily_minutes)
+
+        standalone_days = math.ceil(minutes / max_daily_minutes)
+        elapsed_days = placement["finish_day"] - release_day + 1
+        finish_date = calendar.day_date(placement["finish_day"])
+        due_date = to_date(order["due_date"]) if order.get("due_date") else None
+
+        result = {
+            "order_id": order["order_id"],
+            "supplier": order["supplier"],
+            "priority": order.get("priority", DEFAULT_PRIORITY),
+            "sewing_minutes": round(minutes),
+            "lines_allocated": order_lines,
+            "factory_lines": calendar.lines,
+            "release_date": calendar.day_date(release_day).isoformat(),
+            "bulk_start_date": calendar.day_date(placement["start_day"]).isoformat(),
+            "bulk_finish_date": finish_date.isoformat(),
+            "standalone_days": standalone_days,
+            "queue_delay_days": max(elapsed_days - standalone_days, 0),
+            "late_days": max((finish_date - due_date).days, 0) if due_date else 0,
+            "factory_utilization_pct": round(calendar.utilization(release_day, placement["finish_day"]) * 100, 1)
+        }
+        self.orders[order["order_id"]] = {**order, "placement": result}
+
+        return result
+
+    def remove_order(self, order_id: str):
+        order = self.orders.pop(order_id, None)
+        if order:
+            self.calendar_for(order["supplier"]).remove(order_id)
+
+    def copy(self, suppliers: Optional[List[str]] = None) -> "CapacityPlanner":
+        planner = CapacityPlanner(self.origin)
+        planner.calendars = {
+            supplier: calendar.copy()
+            for supplier, calendar in self.calendars.items()
+            if suppliers is None or supplier in suppliers
+        }
+        planner.orders = {
+            order_id: order
+            for order_id, order in self.orders.items()
+            if suppliers is None or order["supplier"] in suppliers
+        }
+        return planner
+
+    def quote_order(self, order: Dict) -> Dict:
+        return self.copy([order["supplier"]]).insert_order(order)
+
+    def quote_orders(self, orders: List[Dict]) -> List[Dict]:
+        return self.copy([order["supplier"] for order in orders]).schedule_orders(orders)
+
+    def expire_orders(self, today: DateLike = None) -> int:
+        today = to_date(today)
+        expired = [
+            order_id for order_id, order in self.orders.items()
+            if to_date(order["placement"]["bulk_finish_date"]) < today
+        ]
+        for order_id in expired:
+            self.remove_order(order_id)
+        return len(expired)
+
+    def schedule_orders(self, orders: List[Dict]) -> List[Dict]:
+        for order in orders:
+            self.remove_order(order["order_id"])
+
+        queue = []
+        for sequence, order in enumerate(orders):
+            due = to_date(order["due_date"]) if order.get("due_date") else date.max
+            heapq.heappush(queue, (order.get("priority", DEFAULT_PRIORITY), due, sequence, order))
+
+        placements = []
+        while queue:
+            _, _, _, order = heapq.heappop(queue)
+            placements.append(self.insert_order(order))
+
+        late = sum(1 for placement in placements if placement["late_days"] > 0)
+        logger.info(f"Capacity scheduler placed {len(placements)} orders across {len(self.calendars)} factories, {late} late")
+        return placements
+
+    def get_placement(self, order_id: str) -> Optional[Dict]:
+        order = self.orders.get(order_id)
+        return order["placement"] if order else None
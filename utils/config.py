@@ -30,11 +30,19 @@ class Config:
         "cash_flow": ["http://localhost:8004/submit"]
     }
 
+    SALES_FEED_PATH = os.getenv("SALES_FEED_PATH")
+    SALES_FEED_POLL_SECONDS = float(os.getenv("SALES_FEED_POLL_SECONDS", "30"))
+    DEMAND_STREAM_TICK_SECONDS = float(os.getenv("DEMAND_STREAM_TICK_SECONDS", "3600"))
+    SKU_STORE_DIR = os.getenv("SKU_STORE_DIR")
+    MARKDOWN_PLAN_INTERVAL_SECONDS = float(os.getenv("MARKDOWN_PLAN_INTERVAL_SECONDS", "86400"))
+
     METTA_FILES = [
         "materials_database.metta",
         "supplier_intelligence.metta",
         "garment_specs.metta",
-        "financial_logistics.metta"
+        "financial_logistics.metta",
+        "rate_cards.metta",
+        "risk_calendar.metta"
     ]
 
     @classmethod
@@ -0,0 +1,206 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import logging
+
+from utils.metta_facts import first_number, iter_entities
+from utils.moq_allocation import style_target_units
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METERS_PER_UNIT = 1.5
+REFERENCE_SIZE = "m"
+MAX_RANKED_MERGES = 20
+
+
+class DisjointSet:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.rank = [0] * size
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> int:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.rank[root_a] < self.rank[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        if self.rank[root_a] == self.rank[root_b]:
+            self.rank[root_a] += 1
+        return root_a
+
+
+@lru_cache(maxsize=None)
+def get_material_terms() -> Dict[str, Dict]:
+    terms = {}
+
+    for fabric, attributes in iter_entities("materials_database.metta", "fabric"):
+        entry = {
+            "kind": "fabric",
+            "name": fabric,
+            "moq": first_number(attributes.get("moq-meters", []), 0),
+            "unit_price": first_number(attributes.get("price-per-meter", []), 0)
+        }
+        terms[fabric] = entry
+        for alias in attributes.get("aliases", []):
+            terms.setdefault(alias, entry)
+
+    for trim, attributes in iter_entities("materials_database.metta", "trim"):
+        moq = first_number(attributes.get("moq-units", []))
+        if moq is None:
+            moq = first_number(attributes.get("moq-meters", []), 0)
+        terms[trim] = {
+            "kind": "trim",
+            "name": trim,
+            "moq": moq,
+            "unit_price": first_number(attributes.get("price-per-unit", []) or attributes.get("price-per-meter", []), 0)
+        }
+
+    return terms
+
+
+@lru_cache(maxsize=None)
+def get_garment_consumption() -> Dict[str, float]:
+    consumption = {}
+    for garment, attributes in iter_entities("garment_specs.metta", "garment-type"):
+        for entry in attributes.get("fabric-main-consumption", []):
+            if isinstance(entry, list) and len(entry) >= 2 and entry[0] == REFERENCE_SIZE:
+                meters = first_number(entry[1:])
+                if meters is not None:
+                    consumption[garment] = meters
+                    for alias in attributes.get("aliases", []):
+                        consumption.setdefault(alias, meters)
+    return consumption
+
+
+def style_colorways(style: Dict) -> List[Tuple[str, float]]:
+    colorways = style.get("colorways")
+    if colorways:
+        return [(str(cw.get("color", "default")).lower(), float(cw.get("units", 0) or 0)) for cw in colorways]
+
+    colors = style.get("colors") or ["default"]
+    units = float(style_target_units(style))
+    return [(str(color).lower(), units / len(colors)) for color in colors]
+
+
+def style_trims(style: Dict) -> List[Tuple[str, float]]:
+    trims = []
+    for trim in style.get("trims") or []:
+        if isinstance(trim, dict):
+            trims.append((trim.get("trim") or trim.get("name"), float(trim.get("quantity_per_unit", 1.0))))
+        else:
+            trims.append((trim, 1.0))
+    return [(name, quantity) for name, quantity in trims if name]
+
+
+def analyze_collection_consolidation(styles: List[Dict]) -> Dict:
+    materials = get_material_terms()
+    consumption = get_garment_consumption()
+
+    disjoint = DisjointSet(len(styles))
+    first_holder = {}
+    requirements = {}
+    style_units = []
+
+    def record(key, style_idx, quantity):
+        holder = first_holder.setdefault(key, style_idx)
+        if holder != style_idx:
+            disjoint.union(holder, style_idx)
+        per_style = requirements.setdefault(key, {})
+        per_style[style_idx] = per_style.get(style_idx, 0.0) + quantity
+
+    for style_idx, style in enumerate(styles):
+        colorways = style_colorways(style)
+        units = sum(quantity for _, quantity in colorways)
+        style_units.append(units)
+
+        fabric = style.get("fabric")
+        if fabric:
+            fabric = materials.get(fabric, {}).get("name", fabric)
+            meters_per_unit = float(style.get("meters_per_unit") or consumption.get(style.get("garment_type"), DEFAULT_METERS_PER_UNIT))
+            record(("fabric", fabric), style_idx, units * meters_per_unit)
+            for color, quantity in colorways:
+                record(("dye-lot", fabric, color), style_idx, quantity * meters_per_unit)
+
+        for trim, quantity_per_unit in style_trims(style):
+            record(("trim", trim), style_idx, units * quantity_per_unit)
+
+    merges = []
+    dye_lots = []
+    cluster_dye_lots = {}
+    cluster_savings = {}
+    for key, per_style in requirements.items():
+        kind = key[0]
+        if kind == "dye-lot":
+            root = disjoint.find(next(iter(per_style)))
+            cluster_dye_lots[root] = cluster_dye_lots.get(root, 0) + 1
+            if len(per_style) >= 2:
+                dye_lots.append({
+                    "fabric": key[1],
+                    "color": key[2],
+                    "styles": [styles[i].get("style_id", f"style-{i + 1}") for i in per_style],
+                    "pooled_meters": round(sum(per_style.values()), 1)
+                })
+            continue
+
+        terms = materials.get(key[1], {})
+        moq = terms.get("moq", 0) or 0
+        pooled = sum(per_style.values())
+        standalone_overbuy = sum(max(moq - quantity, 0) for quantity in per_style.values())
+        pooled_overbuy = max(moq - pooled, 0)
+        savings_quantity = standalone_overbuy - pooled_overbuy
+        savings_cost = savings_quantity * (terms.get("unit_price", 0) or 0)
+
+        root = disjoint.find(next(iter(per_style)))
+        cluster_savings[root] = cluster_savings.get(root, 0.0) + savings_cost
+
+        if len(per_style) < 2:
+            continue
+
+        merges.append({
+            "resource": kind,
+            "name": key[1],
+            "styles": [styles[i].get("style_id", f"style-{i + 1}") for i in per_style],
+            "pooled_quantity": round(pooled, 1),
+            "moq": moq,
+            "meets_moq": pooled >= moq,
+            "standalone_overbuy": round(standalone_overbuy, 1),
+            "pooled_overbuy": round(pooled_overbuy, 1),
+            "moq_savings_quantity": round(savings_quantity, 1),
+            "moq_savings_cost": round(savings_cost, 2)
+        })
+
+    merges.sort(key=lambda merge: (merge["moq_savings_cost"], merge["moq_savings_quantity"]), reverse=True)
+
+    members = {}
+    for style_idx in range(len(styles)):
+        members.setdefault(disjoint.find(style_idx), []).append(style_idx)
+
+    clusters = []
+    for root, indices in members.items():
+        clusters.append({
+            "styles": [styles[i].get("style_id", f"style-{i + 1}") for i in indices],
+            "style_count": len(indices),
+            "units": round(sum(style_units[i] for i in indices), 1),
+            "dye_lots": cluster_dye_lots.get(root, 0),
+            "moq_savings_cost": round(cluster_savings.get(root, 0.0), 2)
+        })
+    clusters.sort(key=lambda cluster: cluster["moq_savings_cost"], reverse=True)
+
+    dye_lots.sort(key=lambda lot: lot["pooled_meters"], reverse=True)
+
+    logger.info(f"Consolidation: {len(styles)} styles in {len(clusters)} clusters, {len(merges)} shared pools, {len(dye_lots)} shared dye lots")
+
+    return {
+        "clusters": clusters,
+        "ranked_merges": merges[:MAX_RANKED_MERGES],
+        "shared_pool_count": len(merges),
+        "shared_dye_lots": dye_lots,
+        "total_moq_savings_cost": round(sum(merge["moq_savings_cost"] for merge in merges), 2)
+    }
@@ -0,0 +1,255 @@
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import heapq
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleTemplate(NamedTuple):
+    names: Tuple[str, ...]
+    durations: Tuple[int, ...]
+    predecessors: Tuple[Tuple[int, ...], ...]
+    successors: Tuple[Tuple[int, ...], ...]
+    order: Tuple[int, ...]
+
+
+def build_schedule_template(phases: Sequence[Dict]) -> ScheduleTemplate:
+    names = tuple(phase["phase_name"] for phase in phases)
+    positions = {name: position for position, name in enumerate(names)}
+
+    predecessors = []
+    successors = [[] for _ in names]
+    for position, phase in enumerate(phases):
+        preds = []
+        for dependency in phase.get("dependencies", []):
+            if dependency not in positions:
+                logger.warning(f"Phase {phase['phase_name']} depends on unknown phase {dependency}, ignoring")
+                continue
+            preds.append(positions[dependency])
+            successors[positions[dependency]].append(position)
+        predecessors.append(tuple(preds))
+
+    in_degree = [len(preds) for preds in predecessors]
+    ready = deque(position for position, degree in enumerate(in_degree) if degree == 0)
+    order = []
+    while ready:
+        position = ready.popleft()
+        order.append(position)
+        for successor in successors[position]:
+            in_degree[successor] -= 1
+            if in_degree[successor] == 0:
+                ready.append(successor)
+
+    if len(order) != len(names):
+        raise ValueError("Phase dependencies contain a cycle")
+
+    return ScheduleTemplate(
+        names=names,
+        durations=tuple(int(phase["duration_days"]) for phase in phases),
+        predecessors=tuple(predecessors),
+        successors=tuple(tuple(succ) for succ in successors),
+        order=tuple(order)
+    )
+
+
+def forward_pass(template: ScheduleTemplate, durations: Sequence[int]) -> Tuple[List[int], List[int]]:
+    early_start = [0] * len(template.names)
+    early_finish = [0] * len(template.names)
+
+    for position in template.order:
+        preds = template.predecessors[position]
+        early_start[position] = max((early_finish[pred] for pred in preds), default=0)
+        early_finish[position] = early_start[position] + durations[position]
+
+    return early_start, early_finish
+
+
+def backward_pass(template: ScheduleTemplate, durations: Sequence[int],
+                  project_end: int) -> Tuple[List[int], List[int]]:
+    late_start = [0] * len(template.names)
+    late_finish = [0] * len(template.names)
+
+    for position in reversed(template.order):
+        succs = template.successors[position]
+        late_finish[position] = min((late_start[succ] for succ in succs), default=project_end)
+        late_start[position] = late_finish[position] - durations[position]
+
+    return late_start, late_finish
+
+
+def compute_schedule(template: ScheduleTemplate, durations: Optional[Sequence[int]] = None) -> Dict:
+    durations = list(durations if durations is not None else template.durations)
+
+    early_start, early_finish = forward_pass(template, durations)
+    project_end = max(early_finish, default=0)
+    late_start, late_finish = backward_pass(template, durations, project_end)
+
+    phases = []
+    for position, name in enumerate(template.names):
+        slack = late_start[position] - early_start[position]
+        phases.append({
+            "phase_name": name,
+            "duration_days": durations[position],
+            "early_start": early_start[position],
+            "early_finish": early_finish[position],
+            "late_start": late_start[position],
+            "late_finish": late_finish[position],
+            "slack_days": slack,
+            "is_critical": slack == 0
+        })
+
+    return {
+        "duration_days": project_end,
+        "serial_duration_days": sum(durations),
+        "phases": phases,
+        "critical_path": [template.names[position] for position in template.order if phases[position]["is_critical"]]
+    }
+
+
+def build_schedule_state(template: ScheduleTemplate, durations: Optional[Sequence[int]] = None) -> Dict:
+    durations = list(durations if durations is not None else template.durations)
+    early_start, early_finish = forward_pass(template, durations)
+
+    tail = [0] * len(template.names)
+    for position in reversed(template.order):
+        tail[position] = durations[position] + max((tail[succ] for succ in template.successors[position]), default=0)
+
+    project_end = max(early_finish, default=0)
+    return {
+        "durations": durations,
+        "early_start": early_start,
+        "early_finish": early_finish,
+        "tail": tail,
+        "project_end": project_end,
+        "critical": [position for position in template.order if early_start[position] + tail[position] == project_end]
+    }
+
+
+def replan_schedule(template: ScheduleTemplate, state: Dict, slips: Dict[str, int]) -> Tuple[Dict, List[Dict]]:
+    positions = {name: position for position, name in enumerate(template.names)}
+    rank = {position: index for index, position in enumerate(template.order)}
+
+    durations = list(state["durations"])
+    early_start = list(state["early_start"])
+    early_finish = list(state["early_finish"])
+    tail = list(state["tail"])
+
+    slipped = []
+    for name, days in slips.items():
+        if name not in positions:
+            logger.warning(f"Slip reported for unknown phase {name}, ignoring")
+            continue
+        position = positions[name]
+        durations[position] = max(durations[position] + days, 0)
+        slipped.append(position)
+
+    touched = set()
+
+    queue = [(rank[position], position) for position in slipped]
+    heapq.heapify(queue)
+    seen = set()
+    while queue:
+        _, position = heapq.heappop(queue)
+        if position in seen:
+            continue
+        seen.add(position)
+
+        start = max((early_finish[pred] for pred in template.predecessors[position]), default=0)
+        finish = start + durations[position]
+        if start == early_start[position] and finish == early_finish[position] and position not in slipped:
+            continue
+
+        early_start[position], early_finish[position] = start, finish
+        touched.add(position)
+        for successor in template.successors[position]:
+            heapq.heappush(queue, (rank[successor], successor))
+
+    queue = [(-rank[position], position) for position in slipped]
+    heapq.heapify(queue)
+    seen = set()
+    while queue:
+        _, position = heapq.heappop(queue)
+        if position in seen:
+            continue
+        seen.add(position)
+
+        remaining = durations[position] + max((tail[succ] for succ in template.successors[position]), default=0)
+        if remaining == tail[position] and position not in slipped:
+            continue
+
+        tail[position] = remaining
+        touched.add(position)
+        for predecessor in template.predecessors[position]:
+            heapq.heappush(queue, (-rank[predecessor], predecessor))
+
+    sinks = [position for position in template.order if not template.successors[position]]
+    project_end = max((early_finish[position] for position in sinks), default=0)
+
+    candidates = touched | set(state["critical"])
+    if project_end < state["project_end"]:
+        candidates = set(range(len(template.names)))
+    old_critical = set(state["critical"])
+    critical = set(state["critical"]) - candidates
+    critical.update(position for position in candidates if early_start[position] + tail[position] == project_end)
+
+    changes = []
+    for position in sorted(candidates, key=lambda position: rank[position]):
+        start_shift = early_start[position] - state["early_start"][position]
+        finish_shift = early_finish[position] - state["early_finish"][position]
+        criticality_changed = (position in critical) != (position in old_critical)
+        if not start_shift and not finish_shift and not criticality_changed:
+            continue
+        changes.append({
+            "phase_name": template.names[position],
+            "early_start": early_start[position],
+            "early_finish": early_finish[position],
+            "start_shift_days": start_shift,
+            "finish_shift_days": finish_shift,
+            "slack_days": project_end - tail[position] - early_start[position],
+            "is_critical": position in critical
+        })
+
+    new_state = {
+        "durations": durations,
+        "early_start": early_start,
+        "early_finish": early_finish,
+        "tail": tail,
+        "project_end": project_end,
+        "critical": sorted(critical, key=lambda position: rank[position])
+    }
+
+    return new_state, changes
+
+
+def sample_pert_durations(low: Sequence[float], mode: Sequence[float], high: Sequence[float],
+                          rng: np.random.Generator, trials: int) -> np.ndarray:
+    low = np.asarray(low, dtype=float)[:, None]
+    mode = np.asarray(mode, dtype=float)[:, None]
+    high = np.asarray(high, dtype=float)[:, None]
+
+    span = high - low
+    safe_span = np.where(span > 0, span, 1.0)
+    alpha = 1 + 4 * (mode - low) / safe_span
+    beta = 1 + 4 * (high - mode) / safe_span
+
+    draws = rng.beta(np.broadcast_to(alpha, (len(alpha), trials)), np.broadcast_to(beta, (len(beta), trials)))
+    return np.where(span > 0, low + draws * span, mode)
+
+
+def simulate_completion(template: ScheduleTemplate, durations: np.ndarray) -> np.ndarray:
+    early_finish = np.zeros_like(durations)
+
+    for position in template.order:
+        preds = template.predecessors[position]
+        if preds:
+            start = early_finish[preds[0]]
+            for pred in preds[1:]:
+                start = np.maximum(start, early_finish[pred])
+            early_finish[position] = start + durations[position]
+        else:
+            early_finish[position] = durations[position]
+
+    return early_finish.max(axis=0)
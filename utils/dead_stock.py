@@ -0,0 +1,251 @@
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+import logging
+
+import numpy as np
+
+from utils.demand_stream import DemandStream, EventTime, to_period
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEASON_WEEKS = 16
+MIN_OBSERVED_DAYS = 14
+COVER_CAP_WEEKS = 999.0
+COVER_RATIO_CAP = 4.0
+AGING_HORIZON_WEEKS = 8.0
+COVER_WEIGHT = 0.5
+GAP_WEIGHT = 0.3
+AGING_WEIGHT = 0.2
+HIGH_RISK_SCORE = 0.6
+MEDIUM_RISK_SCORE = 0.35
+DEFAULT_TOP_K = 100
+INITIAL_CAPACITY = 1024
+
+INVENTORY_FIELDS = (
+    "on_hand", "initial_units", "received_period", "last_sale_period",
+    "season_weeks", "planned_weekly", "stream_position", "score"
+)
+PRICING_FIELDS = ("category", "full_price", "elasticity", "current_markdown")
+
+
+class DeadStockMonitor:
+    def __init__(self, demand_stream: Optional[DemandStream] = None, capacity: int = INITIAL_CAPACITY):
+        self.demand_stream = demand_stream
+        self.index: Dict[str, int] = {}
+        self.skus: List[str] = []
+        self.pricing: Dict[str, Dict] = {}
+        self.scored_period = -1
+        self.allocate(capacity)
+
+    def allocate(self, capacity: int):
+        self.capacity = capacity
+        self.on_hand = np.zeros(capacity)
+        self.initial_units = np.zeros(capacity)
+        self.received_period = np.zeros(capacity, dtype=np.int64)
+        self.last_sale_period = np.full(capacity, -1, dtype=np.int64)
+        self.season_weeks = np.full(capacity, float(DEFAULT_SEASON_WEEKS))
+        self.planned_weekly = np.zeros(capacity)
+        self.stream_position = np.full(capacity, -1, dtype=np.int64)
+        self.score = np.zeros(capacity)
+        self.dirty = np.zeros(capacity, dtype=bool)
+
+    def grow(self):
+        old = {field: getattr(self, field) for field in INVENTORY_FIELDS + ("dirty",)}
+        size = self.capacity
+        self.allocate(size * 2)
+        for field, values in old.items():
+            getattr(self, field)[:size] = values
+
+    def slot(self, sku: str) -> int:
+        position = self.index.get(sku)
+        if position is None:
+            position = len(self.skus)
+            if position >= self.capacity:
+                self.grow()
+            self.index[sku] = position
+            self.skus.append(sku)
+        return position
+
+    def link_stream(self, sku: str, position: int):
+        if self.demand_stream is not None and self.stream_position[position] < 0:
+            self.stream_position[position] = self.demand_stream.index.get(sku, -1)
+
+    def register(self, sku: str, units: float, planned_weekly: float, season_weeks: Optional[float] = None,
+                 received: EventTime = None, on_hand: Optional[float] = None):
+        position = self.slot(sku)
+        self.initial_units[position] = units
+        self.on_hand[position] = units if on_hand is None else on_hand
+        self.planned_weekly[position] = planned_weekly
+        self.season_weeks[position] = season_weeks or DEFAULT_SEASON_WEEKS
+        self.received_period[position] = to_period(received)
+        self.link_stream(sku, position)
+        self.dirty[position] = True
+
+    def register_inventory(self, records: Iterable[Dict]) -> int:
+        count = 0
+        for record in records:
+            sku = record.get("sku_code") or record.get("sku")
+            if not sku:
+                continue
+            try:
+                units = float(record.get("units", 0) or 0)
+                self.register(
+                    str(sku),
+                    units,
+                    float(record.get("planned_weekly_sales", 0) or 0),
+                    record.get("selling_season_weeks"),
+                    record.get("received_date"),
+                    record.get("on_hand")
+                )
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Skipping malformed inventory record for {sku}: {e}")
+                continue
+            self.pricing[str(sku)] = {field: record[field] for field in PRICING_FIELDS if record.get(field) is not None}
+            count += 1
+        return count
+
+    def record_sales(self, events: Iterable[Dict]) -> int:
+        count = 0
+        for event in events:
+            sku = event.get("sku") or event.get("sku_code")
+            position = self.index.get(str(sku)) if sku else None
+            if position is None:
+                continue
+            try:
+                units = float(event.get("units", event.get("quantity", 1)) or 0)
+                period = to_period(event.get("timestamp") or event.get("date"))
+            except (TypeError, ValueError):
+                continue
+            self.on_hand[position] = max(self.on_hand[position] - units, 0.0)
+            self.last_sale_period[position] = max(self.last_sale_period[position], period)
+            self.link_stream(str(sku), position)
+            self.dirty[position] = True
+            count += 1
+        return count
+
+    def weekly_velocity(self, positions: np.ndarray) -> np.ndarray:
+        velocity = self.planned_weekly[positions]
+        if self.demand_stream is None:
+            return velocity
+
+        linked = self.stream_position[positions]
+        has_stream = linked >= 0
+        if has_stream.any():
+            observed_rate, observed_days = self.demand_stream.weekly_rates(linked[has_stream])
+            velocity = velocity.copy()
+            velocity[has_stream] = np.where(observed_days >= MIN_OBSERVED_DAYS, observed_rate, velocity[has_stream])
+        return velocity
+
+    def metrics(self, positions: np.ndarray, period: int) -> Dict[str, np.ndarray]:
+        on_hand = self.on_hand[positions]
+        initial = np.maximum(self.initial_units[positions], 1.0)
+        season = np.maximum(self.season_weeks[positions], 1.0)
+        velocity = self.weekly_velocity(positions)
+
+        weeks_on_floor = np.maximum(period - self.received_period[positions], 0) / 7
+        remaining_weeks = np.maximum(season - weeks_on_floor, 1.0)
+        weeks_of_cover = np.where(velocity > 0, on_hand / np.maximum(velocity, 1e-9), COVER_CAP_WEEKS)
+        weeks_of_cover = np.where(on_hand > 0, np.minimum(weeks_of_cover, COVER_CAP_WEEKS), 0.0)
+
+        sell_through = 1 - on_hand / initial
+        planned_sell_through = np.clip(weeks_on_floor / season, 0.0, 1.0)
+        sell_through_gap = planned_sell_through - sell_through
+
+        last_activity = np.where(self.last_sale_period[positions] >= 0, self.last_sale_period[positions], self.received_period[positions])
+        weeks_since_sale = np.maximum(period - last_activity, 0) / 7
+
+        cover_ratio = np.minimum(weeks_of_cover / remaining_weeks, COVER_RATIO_CAP) / COVER_RATIO_CAP
+        score = (
+            COVER_WEIGHT * cover_ratio
+            + GAP_WEIGHT * np.clip(sell_through_gap, 0.0, 1.0)
+            + AGING_WEIGHT * np.minimum(weeks_since_sale / AGING_HORIZON_WEEKS, 1.0)
+        ) * (on_hand > 0)
+
+        return {
+            "weekly_velocity": velocity,
+            "weeks_of_cover": weeks_of_cover,
+            "remaining_weeks": remaining_weeks,
+            "sell_through": sell_through,
+            "sell_through_gap": sell_through_gap,
+            "weeks_since_sale": weeks_since_sale,
+            "excess_units": np.maximum(on_hand - velocity * remaining_weeks, 0.0),
+            "score": score
+        }
+
+    def refresh(self, today: EventTime = None) -> int:
+        period = to_period(today)
+        count = len(self.skus)
+        if period != self.scored_period:
+            if self.demand_stream is not None:
+                self.demand_stream.advance(date.fromordinal(min(period, to_period(None))))
+            positions = np.arange(count)
+            self.scored_period = period
+        else:
+            positions = np.nonzero(self.dirty[:count])[0]
+
+        if len(positions):
+            self.score[positions] = self.metrics(positions, period)["score"]
+            self.dirty[positions] = False
+        return len(positions)
+
+    def top_risks(self, limit: int = DEFAULT_TOP_K, today: EventTime = None,
+                  min_score: float = MEDIUM_RISK_SCORE) -> List[Dict]:
+        self.refresh(today)
+        count = len(self.skus)
+        scores = self.score[:count]
+        limit = min(limit, count)
+        if limit <= 0:
+            return []
+
+        candidates = np.argpartition(-scores, limit - 1)[:limit] if limit < count else np.arange(count)
+        candidates = candidates[scores[candidates] >= min_score]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        metrics = self.metrics(ranked, self.scored_period)
+
+        return [
+            {
+                **format_risk(self.skus[position], self.on_hand[position], {key: values[row] for key, values in metrics.items()}),
+                **self.pricing.get(self.skus[position], {})
+            }
+            for row, position in enumerate(ranked)
+        ]
+
+    def summary(self) -> Dict:
+        count = len(self.skus)
+        scores = self.score[:count]
+        high = scores >= HIGH_RISK_SCORE
+        medium = (scores >= MEDIUM_RISK_SCORE) & ~high
+
+        return {
+            "skus_tracked": count,
+            "high_risk_skus": int(high.sum()),
+            "medium_risk_skus": int(medium.sum()),
+            "units_on_hand": float(self.on_hand[:count].sum()),
+            "high_risk_units": float(self.on_hand[:count][high].sum())
+        }
+
+
+def classify_risk(score: float) -> str:
+    if score >= HIGH_RISK_SCORE:
+        return "high"
+    if score >= MEDIUM_RISK_SCORE:
+        return "medium"
+    return "low"
+
+
+def format_risk(sku: str, on_hand: float, metrics: Dict) -> Dict:
+    risk_level = classify_risk(metrics["score"])
+
+    return {
+        "sku_code": sku,
+        "units": int(on_hand),
+        "risk_score": round(float(metrics["score"]), 3),
+        "risk_level": risk_level,
+        "weekly_velocity": round(float(metrics["weekly_velocity"]), 2),
+        "weeks_of_cover": round(float(metrics["weeks_of_cover"]), 1),
+        "remaining_season_weeks": round(float(metrics["remaining_weeks"]), 1),
+        "sell_through_pct": round(float(metrics["sell_through"]) * 100, 1),
+        "sell_through_gap_pct": round(float(metrics["sell_through_gap"]) * 100, 1),
+        "weeks_since_last_sale": round(float(metrics["weeks_since_sale"]), 1),
+        "excess_units": int(metrics["excess_units"])
+    }
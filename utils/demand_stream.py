@@ -0,0 +1,295 @@
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import csv
+import io
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LEVEL_ALPHA = 0.2
+TREND_BETA = 0.05
+CROSTON_ALPHA = 0.1
+ERROR_GAMMA = 0.1
+VELOCITY_WINDOW = 28
+MAX_GAP_PERIODS = 730
+INTERMITTENT_INTERVAL = 1.32
+INITIAL_CAPACITY = 1024
+ADVANCE_GRACE_PERIODS = 1
+
+EventTime = Union[str, int, float, date, datetime, None]
+
+STATE_FIELDS = (
+    "period", "bucket", "level", "trend", "error_var", "croston_size", "croston_interval",
+    "periods_since_demand", "rolling_sum", "total_units", "event_count", "observed_periods"
+)
+
+
+def to_period(timestamp: EventTime) -> int:
+    if timestamp is None:
+        return date.today().toordinal()
+    if isinstance(timestamp, datetime):
+        return timestamp.date().toordinal()
+    if isinstance(timestamp, date):
+        return timestamp.toordinal()
+    if isinstance(timestamp, (int, float)):
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc).date().toordinal()
+    return datetime.fromisoformat(str(timestamp).strip().replace("Z", "+00:00")).date().toordinal()
+
+
+def build_decay_powers(alpha: float, beta: float, max_gap: int) -> np.ndarray:
+    step = np.array([[1 - alpha, 1 - alpha], [-alpha * beta, 1 - alpha * beta]])
+    powers = np.empty((max_gap + 1, 2, 2))
+    powers[0] = np.eye(2)
+    for gap in range(1, max_gap + 1):
+        powers[gap] = step @ powers[gap - 1]
+    return powers
+
+
+def build_error_forms(decay: np.ndarray, gamma: float) -> np.ndarray:
+    ones = np.ones(2)
+    forms = np.zeros_like(decay)
+    for gap in range(1, len(decay)):
+        forecast = ones @ decay[gap - 1]
+        forms[gap] = (1 - gamma) * forms[gap - 1] + gamma * np.outer(forecast, forecast)
+    return forms
+
+
+class DemandStream:
+    def __init__(self, alpha: float = LEVEL_ALPHA, beta: float = TREND_BETA, croston_alpha: float = CROSTON_ALPHA,
+                 window: int = VELOCITY_WINDOW, capacity: int = INITIAL_CAPACITY):
+        self.alpha = alpha
+        self.beta = beta
+        self.croston_alpha = croston_alpha
+        self.window = window
+        self.decay = build_decay_powers(alpha, beta, MAX_GAP_PERIODS)
+        self.error_forms = build_error_forms(self.decay, ERROR_GAMMA)
+
+        self.index: Dict[str, int] = {}
+        self.skus: List[str] = []
+        self.offsets: Dict[str, int] = {}
+        self.late_events = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity: int):
+        self.capacity = capacity
+        self.period = np.full(capacity, -1, dtype=np.int64)
+        self.bucket = np.zeros(capacity)
+        self.level = np.zeros(capacity)
+        self.trend = np.zeros(capacity)
+        self.error_var = np.zeros(capacity)
+        self.croston_size = np.zeros(capacity)
+        self.croston_interval = np.ones(capacity)
+        self.periods_since_demand = np.zeros(capacity, dtype=np.int64)
+        self.rolling_sum = np.zeros(capacity)
+        self.total_units = np.zeros(capacity)
+        self.event_count = np.zeros(capacity, dtype=np.int64)
+        self.observed_periods = np.zeros(capacity, dtype=np.int64)
+        self.ring = np.zeros((capacity, self.window))
+
+    def grow(self):
+        old = {field: getattr(self, field) for field in STATE_FIELDS + ("ring",)}
+        size = self.capacity
+        self.allocate(size * 2)
+        for field, values in old.items():
+            getattr(self, field)[:size] = values
+
+    def slot(self, sku: str) -> int:
+        position = self.index.get(sku)
+        if position is None:
+            position = len(self.skus)
+            if position >= self.capacity:
+                self.grow()
+            self.index[sku] = position
+            self.skus.append(sku)
+        return position
+
+    def ingest(self, sku: str, units: float, timestamp: EventTime = None) -> bool:
+        period = to_period(timestamp)
+        position = self.slot(sku)
+        current = self.period[position]
+
+        self.total_units[position] += units
+        self.event_count[position] += 1
+
+        if current < 0:
+            self.period[position] = period
+        elif period > current:
+            self.close_periods(position, period)
+        elif period < current:
+            self.late_events += 1
+            return False
+
+        self.bucket[position] += units
+        return True
+
+    def close_periods(self, position: int, period: int):
+        current = int(self.period[position])
+        demand = self.bucket[position]
+        gap = period - current - 1
+
+        if self.observed_periods[position] == 0:
+            self.level[position] = demand
+        else:
+            forecast = self.level[position] + self.trend[position]
+            error = demand - forecast
+            self.error_var[position] += ERROR_GAMMA * (error * error - self.error_var[position])
+            level = forecast + self.alpha * error
+            self.trend[position] += self.beta * (level - self.level[position] - self.trend[position])
+            self.level[position] = level
+
+        self.periods_since_demand[position] += 1
+        if demand > 0:
+            if self.croston_size[position] == 0:
+                self.croston_size[position] = demand
+                self.croston_interval[position] = self.periods_since_demand[position]
+            else:
+                self.croston_size[position] += self.croston_alpha * (demand - self.croston_size[position])
+                self.croston_interval[position] += self.croston_alpha * (self.periods_since_demand[position] - self.croston_interval[position])
+            self.periods_since_demand[position] = 0
+
+        slot = current % self.window
+        self.rolling_sum[position] += demand - self.ring[position, slot]
+        self.ring[position, slot] = demand
+
+        if gap > 0:
+            decay = self.decay[min(gap, MAX_GAP_PERIODS)]
+            level, trend = self.level[position], self.trend[position]
+            state = np.array([level, trend])
+            forms = self.error_forms[min(gap, MAX_GAP_PERIODS)]
+            self.error_var[position] = (1 - ERROR_GAMMA) ** gap * self.error_var[position] + state @ forms @ state
+            self.level[position] = decay[0, 0] * level + decay[0, 1] * trend
+            self.trend[position] = decay[1, 0] * level + decay[1, 1] * trend
+            self.periods_since_demand[position] += gap
+
+            if gap >= self.window:
+                self.ring[position] = 0.0
+                self.rolling_sum[position] = 0.0
+            else:
+                for skipped in range(current + 1, period):
+                    slot = skipped % self.window
+                    self.rolling_sum[position] -= self.ring[position, slot]
+                    self.ring[position, slot] = 0.0
+
+        self.observed_periods[position] += 1 + max(gap, 0)
+        self.period[position] = period
+        self.bucket[position] = 0.0
+
+    def advance(self, timestamp: EventTime = None, grace: int = ADVANCE_GRACE_PERIODS) -> int:
+        period = to_period(timestamp) - grace
+        active = np.nonzero((self.period[:len(self.skus)] >= 0) & (self.period[:len(self.skus)] < period))[0]
+        for position in active:
+            self.close_periods(int(position), period)
+        return len(active)
+
+    def ingest_events(self, events: Iterable[Dict]) -> int:
+        count = late = 0
+        for event in events:
+            sku = event.get("sku") or event.get("sku_code")
+            if not sku:
+                continue
+            try:
+                units = float(event.get("units", event.get("quantity", 1)) or 0)
+                timestamp = event.get("timestamp") or event.get("date")
+                on_time = self.ingest(str(sku), units, timestamp)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Skipping malformed sales event for {sku}: {e}")
+                continue
+            count += 1
+            late += not on_time
+
+        if late:
+            logger.warning(f"{late} sales events predate their SKU's open day, counted in totals but left out of the level and trend")
+        return count
+
+    def read_file_events(self, path: Union[str, Path]) -> List[Dict]:
+        path = Path(path)
+        if not path.exists():
+            return []
+
+        offset = self.offsets.get(str(path), 0)
+        if offset > path.stat().st_size:
+            offset = 0
+        with path.open("rb") as handle:
+            handle.seek(offset)
+            chunk = handle.read()
+
+        complete = chunk.rfind(b"\n") + 1
+        self.offsets[str(path)] = offset + complete
+        lines = chunk[:complete].decode("utf-8")
+        if path.suffix == ".csv":
+            header = self.csv_header(path)
+            if offset == 0:
+                lines = lines.split("\n", 1)[1] if "\n" in lines else ""
+            return list(csv.DictReader(io.StringIO(lines), fieldnames=header))
+
+        events = []
+        for number, line in enumerate(lines.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping malformed line {number} read from {path.name}: {e}")
+                continue
+            if isinstance(event, dict):
+                events.append(event)
+        return events
+
+    def ingest_file(self, path: Union[str, Path]) -> int:
+        count = self.ingest_events(self.read_file_events(path))
+        if count:
+            logger.info(f"Ingested {count} sales events from {Path(path).name}")
+        return count
+
+    def csv_header(self, path: Path) -> List[str]:
+        with path.open("r", encoding="utf-8") as handle:
+            return next(csv.reader(handle), [])
+
+    def forecast(self, sku: str) -> Optional[Dict]:
+        position = self.index.get(sku)
+        if position is None:
+            return None
+
+        interval = max(self.croston_interval[position], 1.0)
+
+        return {
+            "sku_code": sku,
+            "daily_level": round(float(self.level[position]), 3),
+            "daily_trend": round(float(self.trend[position]), 4),
+            "daily_forecast": round(float(max(self.level[position] + self.trend[position], 0.0)), 3),
+            "daily_std": round(float(np.sqrt(self.error_var[position])), 3),
+            "croston_daily_rate": round(float(self.croston_size[position] / interval * (1 - self.croston_alpha / 2)), 3),
+            "demand_interval_days": round(float(interval), 2),
+            "rolling_velocity": round(float(self.rolling_sum[position] / self.window), 3),
+            "total_units": float(self.total_units[position]),
+            "observed_days": int(self.observed_periods[position]),
+            "is_intermittent": bool(interval > INTERMITTENT_INTERVAL)
+        }
+
+    def weekly_rates(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        interval = np.maximum(self.croston_interval[positions], 1.0)
+        croston = self.croston_size[positions] / interval * (1 - self.croston_alpha / 2)
+        holt = np.maximum(self.level[positions] + self.trend[positions], 0.0)
+        daily = np.where(interval > INTERMITTENT_INTERVAL, croston, holt)
+        stale = self.periods_since_demand[positions] >= self.window
+        daily = np.where(stale, self.rolling_sum[positions] / self.window, daily)
+        return daily * 7, self.observed_periods[positions]
+
+    def weekly_demand(self, sku: str) -> Optional[Tuple[float, float]]:
+        position = self.index.get(sku)
+        if position is None or self.observed_periods[position] == 0:
+            return None
+
+        interval = max(self.croston_interval[position], 1.0)
+        if self.periods_since_demand[position] >= self.window:
+            daily = self.rolling_sum[position] / self.window
+        elif interval > INTERMITTENT_INTERVAL:
+            daily = self.croston_size[position] / interval * (1 - self.croston_alpha / 2)
+        else:
+            daily = max(self.level[position] + self.trend[position], 0.0)
+
+        return float(daily * 7), float(np.sqrt(self.error_var[position] * 7))
@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import hashlib
 
 
@@ -122,6 +122,12 @@ def get_current_timestamp() -> str:
     return datetime.utcnow().isoformat() + "Z"
 
 
+def clamp_trials(requested: Optional[int], default: int, maximum: int) -> int:
+    if not requested:
+        return default
+    return min(max(int(requested), 1), maximum)
+
+
 def format_percentage(value: float) -> str:
     return f"{value:.1f}%"
 
@@ -0,0 +1,295 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Dict, Optional, Sequence, Tuple
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ALPHA_GRID = (0.05, 0.1, 0.2, 0.35, 0.5)
+BETA_GRID = (0.01, 0.05, 0.15)
+GAMMA_GRID = (0.05, 0.15, 0.3)
+WARM_START_STEPS = (0.7, 1.0, 1.4)
+PARAMETER_BOUNDS = (0.01, 0.95)
+DEFAULT_CHUNK_SIZE = 1000
+EPSILON = 1e-9
+
+FULL_GRID = np.array(list(product(ALPHA_GRID, BETA_GRID, GAMMA_GRID)))
+
+
+def initial_state(sales: np.ndarray, season_length: int,
+                  multiplicative: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    first = sales[:, :season_length]
+    level = first.mean(axis=1)
+
+    if sales.shape[1] >= 2 * season_length:
+        trend = (sales[:, season_length:2 * season_length].mean(axis=1) - level) / season_length
+    else:
+        trend = np.zeros(len(sales))
+
+    if multiplicative:
+        season = first / np.maximum(level, EPSILON)[:, None]
+    else:
+        season = first - level[:, None]
+
+    return level, trend, season
+
+
+def run_filter(sales: np.ndarray, params: np.ndarray, season_length: int,
+               multiplicative: bool) -> Dict[str, np.ndarray]:
+    count, candidates = params.shape[:2]
+    alpha, beta, gamma = params[..., 0], params[..., 1], params[..., 2]
+
+    level, trend, season = initial_state(sales, season_length, multiplicative)
+    level = np.repeat(level[:, None], candidates, axis=1)
+    trend = np.repeat(trend[:, None], candidates, axis=1)
+    season = np.repeat(season[:, None, :], candidates, axis=1)
+    sse = np.zeros((count, candidates))
+
+    for step in range(sales.shape[1]):
+        actual = sales[:, step, None]
+        phase = step % season_length
+        seasonal = season[..., phase]
+        base = level + trend
+
+        if multiplicative:
+            error = actual - base * seasonal
+            new_level = alpha * actual / np.maximum(seasonal, EPSILON) + (1 - alpha) * base
+            season[..., phase] = gamma * actual / np.maximum(new_level, EPSILON) + (1 - gamma) * seasonal
+        else:
+            error = actual - base - seasonal
+            new_level = alpha * (actual - seasonal) + (1 - alpha) * base
+            season[..., phase] = gamma * (actual - new_level) + (1 - gamma) * seasonal
+
+        sse += error * error
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        level = new_level
+
+    return {"sse": sse, "level": level, "trend": trend, "season": season}
+
+
+def candidate_params(warm: Optional[np.ndarray], count: int) -> np.ndarray:
+    if warm is None:
+        return np.broadcast_to(FULL_GRID, (count, len(FULL_GRID), 3))
+
+    steps = np.array(list(product(WARM_START_STEPS, repeat=3)))
+    return np.clip(warm[:, None, :3] * steps[None, :, :], *PARAMETER_BOUNDS)
+
+
+def fit_chunk(sales: np.ndarray, season_length: int, warm: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    count = len(sales)
+    best = {
+        "alpha": np.zeros(count),
+        "beta": np.zeros(count),
+        "gamma": np.zeros(count),
+        "multiplicative": np.zeros(count, dtype=bool),
+        "sse": np.full(count, np.inf),
+        "level": np.zeros(count),
+        "trend": np.zeros(count),
+        "season": np.zeros((count, season_length))
+    }
+
+    positive = (sales > 0).all(axis=1)
+    is_warm = np.zeros(count, dtype=bool)
+    warm_multiplicative = np.zeros(count, dtype=bool)
+    if warm is not None:
+        warm_multiplicative = warm[:, 3] > 0.5
+        is_warm = ~np.isnan(warm[:, 0]) & (positive | ~warm_multiplicative)
+
+    for multiplicative in (False, True):
+        for warm_group in (False, True):
+            rows = is_warm == warm_group
+            if multiplicative:
+                rows &= positive
+            if warm_group:
+                rows &= warm_multiplicative == multiplicative
+            rows = np.nonzero(rows)[0]
+            if not len(rows):
+                continue
+
+            params = candidate_params(warm[rows] if warm_group else None, len(rows))
+            result = run_filter(sales[rows], params, season_length, multiplicative)
+
+            choice = np.argmin(np.where(np.isfinite(result["sse"]), result["sse"], np.inf), axis=1)
+            picked = np.arange(len(rows)), choice
+            improved = result["sse"][picked] < best["sse"][rows]
+            target = rows[improved]
+            picked = picked[0][improved], choice[improved]
+
+            best["alpha"][target] = params[picked][:, 0]
+            best["beta"][target] = params[picked][:, 1]
+            best["gamma"][target] = params[picked][:, 2]
+            best["multiplicative"][target] = multiplicative
+            best["sse"][target] = result["sse"][picked]
+            best["level"][target] = result["level"][picked]
+            best["trend"][target] = result["trend"][picked]
+            best["season"][target] = result["season"][picked]
+
+    return best
+
+
+def _fit_chunk_args(args: Tuple) -> Dict[str, np.ndarray]:
+    return fit_chunk(*args)
+
+
+def fit_holt_winters(sales: np.ndarray, season_length: int, warm: Optional[np.ndarray] = None,
+                     workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     lengths: Optional[Sequence[int]] = None) -> Dict[str, np.ndarray]:
+    sales = np.asarray(sales, dtype=np.float64)
+    if lengths is None:
+        if sales.shape[1] <= season_length:
+            raise ValueError(f"Need more than {season_length} periods of history, got {sales.shape[1]}")
+        lengths = np.full(len(sales), sales.shape[1])
+    lengths = np.clip(np.asarray(lengths, dtype=np.int64), 0, sales.shape[1])
+
+    count = len(sales)
+    fit = {
+        "alpha": np.full(count, FULL_GRID[0, 0]),
+        "beta": np.full(count, FULL_GRID[0, 1]),
+        "gamma": np.full(count, FULL_GRID[0, 2]),
+        "multiplicative": np.zeros(count, dtype=bool),
+        "sse": np.zeros(count),
+        "level": np.where(lengths > 0, sales[:, -1], 0.0),
+        "trend": np.zeros(count),
+        "season": np.zeros((count, season_length)),
+        "phase": np.zeros(count, dtype=np.int64),
+        "periods": lengths
+    }
+
+    tasks = []
+    for length in np.unique(lengths[lengths >= 2]).tolist():
+        rows = np.nonzero(lengths == length)[0]
+        period = season_length if length > season_length else 1
+        for start in range(0, len(rows), chunk_size):
+            part = rows[start:start + chunk_size]
+            tasks.append((part, period, (sales[part, -length:], period, None if warm is None else warm[part])))
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_fit_chunk_args, [args for _, _, args in tasks]))
+    else:
+        results = [fit_chunk(*args) for _, _, args in tasks]
+
+    for (rows, period, _), result in zip(tasks, results):
+        for key in ("alpha", "beta", "gamma", "multiplicative", "sse", "level", "trend"):
+            fit[key][rows] = result[key]
+        fit["season"][rows] = np.tile(result["season"], season_length // period)
+        fit["phase"][rows] = lengths[rows] % period
+
+    fit["season_length"] = season_length
+
+    logger.info(f"Fitted Holt-Winters on {count} series ({int(fit['multiplicative'].sum())} multiplicative) across {len(tasks)} chunks")
+    return fit
+
+
+def forecast_holt_winters(fit: Dict[str, np.ndarray], horizon: int) -> np.ndarray:
+    steps = np.arange(1, horizon + 1)
+    phases = (np.asarray(fit["phase"])[:, None] + steps[None, :] - 1) % fit["season_length"]
+    base = fit["level"][:, None] + fit["trend"][:, None] * steps[None, :]
+    seasonal = np.take_along_axis(fit["season"], phases, axis=1)
+
+    forecast = np.where(fit["multiplicative"][:, None], base * seasonal, base + seasonal)
+    return np.maximum(forecast, 0.0)
+
+
+def warm_start_params(keys: Sequence[str], cache: Dict[str, Dict]) -> np.ndarray:
+    warm = np.full((len(keys), 4), np.nan)
+    for row, key in enumerate(keys):
+        params = cache.get(key)
+        if params:
+            warm[row] = (params["alpha"], params["beta"], params["gamma"], float(params["multiplicative"]))
+    return warm
+
+
+def update_parameter_cache(cache: Dict[str, Dict], keys: Sequence[str], fit: Dict[str, np.ndarray]):
+    for row, key in enumerate(keys):
+        cache[key] = {
+            "alpha": float(fit["alpha"][row]),
+            "beta": float(fit["beta"][row]),
+            "gamma": float(fit["gamma"][row]),
+            "multiplicative": bool(fit["multiplicative"][row])
+        }
+
+
+def aggregate_rows(values: np.ndarray, groups: np.ndarray, group_count: int) -> np.ndarray:
+    totals = np.zeros((group_count,) + values.shape[1:])
+    np.add.at(totals, groups, values)
+    return totals
+
+
+def reconcile_hierarchy(sku_forecast: np.ndarray, color_forecast: np.ndarray, style_forecast: np.ndarray,
+                        sku_color: np.ndarray, color_style: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    sku_style = color_style[sku_color]
+    combined = sku_forecast + color_forecast[sku_color] + style_forecast[sku_style]
+
+    color_sizes = np.bincount(sku_color, minlength=len(color_forecast)).astype(np.float64)[:, None]
+    color_combined = aggregate_rows(combined, sku_color, len(color_forecast))
+
+    style_numerator = aggregate_rows(color_combined / (1 + color_sizes), color_style, len(style_forecast))
+    style_weight = 1 + aggregate_rows(color_sizes / (1 + color_sizes), color_style, len(style_forecast))
+    style_total = style_numerator / style_weight
+
+    color_total = (color_combined - color_sizes * style_total[color_style]) / (1 + color_sizes)
+    sku_reconciled = np.maximum(combined - color_total[sku_color] - style_total[sku_style], 0.0)
+
+    color_reconciled = aggregate_rows(sku_reconciled, sku_color, len(color_forecast))
+    style_reconciled = aggregate_rows(color_reconciled, color_style, len(style_forecast))
+    return sku_reconciled, color_reconciled, style_reconciled
+
+
+def shared_lengths(lengths: np.ndarray, groups: np.ndarray, group_count: int, periods: int) -> np.ndarray:
+    longest = np.zeros(group_count, dtype=np.int64)
+    np.maximum.at(longest, groups, lengths)
+    shortest = np.full(group_count, periods, dtype=np.int64)
+    np.minimum.at(shortest, groups, np.where(lengths >= 2, lengths, periods))
+    return np.minimum(shortest, longest)
+
+
+def forecast_hierarchy(sales: np.ndarray, colors: Sequence[str], styles: Sequence[str], season_length: int,
+                       horizon: int, keys: Optional[Sequence[str]] = None, cache: Optional[Dict[str, Dict]] = None,
+                       workers: Optional[int] = None, lengths: Optional[Sequence[int]] = None) -> Dict:
+    sales = np.asarray(sales, dtype=np.float64)
+    lengths = np.full(len(sales), sales.shape[1]) if lengths is None else np.asarray(lengths, dtype=np.int64)
+    keys = list(keys) if keys is not None else [str(row) for row in range(len(sales))]
+
+    style_labels, sku_style = np.unique(np.asarray(styles, dtype=str), return_inverse=True)
+    color_keys = [f"{style}/{color}" for style, color in zip(styles, colors)]
+    color_labels, sku_color = np.unique(np.asarray(color_keys, dtype=str), return_inverse=True)
+    color_style = np.zeros(len(color_labels), dtype=np.int64)
+    color_style[sku_color] = sku_style
+
+    color_sales = aggregate_rows(sales, sku_color, len(color_labels))
+    style_sales = aggregate_rows(color_sales, color_style, len(style_labels))
+    color_lengths = shared_lengths(lengths, sku_color, len(color_labels), sales.shape[1])
+    style_lengths = shared_lengths(lengths, sku_style, len(style_labels), sales.shape[1])
+
+    all_sales = np.vstack([sales, color_sales, style_sales])
+    all_keys = keys + [f"color:{label}" for label in color_labels] + [f"style:{label}" for label in style_labels]
+    warm = warm_start_params(all_keys, cache) if cache is not None else None
+
+    fit = fit_holt_winters(all_sales, season_length, warm, workers, lengths=np.concatenate([lengths, color_lengths, style_lengths]))
+    if cache is not None:
+        update_parameter_cache(cache, all_keys, fit)
+
+    base = forecast_holt_winters(fit, horizon)
+    sku_count, color_count = len(sales), len(color_labels)
+    sku_forecast, color_forecast, style_forecast = reconcile_hierarchy(
+        base[:sku_count],
+        base[sku_count:sku_count + color_count],
+        base[sku_count + color_count:],
+        sku_color,
+        color_style
+    )
+
+    return {
+        "sku_forecast": sku_forecast,
+        "color_forecast": color_forecast,
+        "style_forecast": style_forecast,
+        "color_labels": color_labels.tolist(),
+        "style_labels": style_labels.tolist(),
+        "fit": fit,
+        "warm_started": int((~np.isnan(warm[:, 0])).sum()) if warm is not None else 0
+    }
@@ -0,0 +1,156 @@
+from typing import Dict, Optional, Sequence
+import heapq
+import logging
+import math
+
+import numpy as np
+
+from utils.reorder_policy import normal_loss, normal_ppf
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PACK_SIZE = 1
+MIN_DEMAND_STD = 0.5
+RESERVE_THRESHOLD = 0.1
+SOLVER_ITERATIONS = 24
+MIN_PRESENTATION_BY_TYPE = {
+    "retail": 3,
+    "wholesale": 6,
+    "dtc-region": 0,
+    "3pl": 0,
+    "warehouse": 0,
+    "fulfillment-center": 0
+}
+
+SQRT_2 = math.sqrt(2)
+SQRT_2PI = math.sqrt(2 * math.pi)
+
+
+def round_to_packs(units: np.ndarray, pack: np.ndarray, up: bool = False) -> np.ndarray:
+    packs = np.ceil(units / pack) if up else np.floor(units / pack)
+    return (np.maximum(packs, 0) * pack).astype(np.int64)
+
+
+def pack_values(stock: np.ndarray, pack: np.ndarray, mean: np.ndarray, std: np.ndarray, unit_value: np.ndarray) -> np.ndarray:
+    before = std * normal_loss((stock - mean) / std)
+    after = std * normal_loss((stock + pack - mean) / std)
+    return unit_value * (before - after)
+
+
+def pack_value(stock: float, pack: int, mean: float, std: float, unit_value: float) -> float:
+    low = (stock - mean) / std
+    high = (stock + pack - mean) / std
+    loss_low = math.exp(-0.5 * low * low) / SQRT_2PI - low * 0.5 * math.erfc(low / SQRT_2)
+    loss_high = math.exp(-0.5 * high * high) / SQRT_2PI - high * 0.5 * math.erfc(high / SQRT_2)
+    return unit_value * std * (loss_low - loss_high)
+
+
+def presentation_eligibility(available: np.ndarray, pack: np.ndarray, demand: np.ndarray,
+                             presentation: np.ndarray, unit_value: np.ndarray) -> np.ndarray:
+    order = np.argsort(-demand * unit_value, axis=1, kind="stable")
+    ranked = np.take_along_axis(presentation, order, axis=1)
+    fits = np.cumsum(ranked, axis=1) <= available[:, None]
+
+    eligible = np.zeros(demand.shape, dtype=bool)
+    np.put_along_axis(eligible, order, fits, axis=1)
+    return eligible & (demand > 0)
+
+
+def threshold_allocation(available: np.ndarray, pack: np.ndarray, demand: np.ndarray, std: np.ndarray,
+                         unit_value: np.ndarray, presentation: np.ndarray, eligible: np.ndarray) -> np.ndarray:
+    def allocation_at(price: np.ndarray) -> np.ndarray:
+        sell_probability = np.maximum(price[:, None] / unit_value, RESERVE_THRESHOLD)
+        target = demand + std * normal_ppf(1 - np.minimum(sell_probability, 1.0))
+        units = np.maximum(round_to_packs(target + pack[:, None] / 2, pack[:, None]), presentation)
+        return np.where(eligible & (sell_probability < 1.0), units, np.where(eligible, presentation, 0))
+
+    low = np.zeros(len(available))
+    high = unit_value.max(axis=1)
+    for _ in range(SOLVER_ITERATIONS):
+        mid = (low + high) / 2
+        over = allocation_at(mid).sum(axis=1) > available
+        low = np.where(over, mid, low)
+        high = np.where(over, high, mid)
+
+    return allocation_at(high)
+
+
+def fill_remaining(allocation: np.ndarray, remaining: int, pack: int, demand: np.ndarray, std: np.ndarray,
+                   unit_value: np.ndarray, eligible: np.ndarray, capacity: np.ndarray,
+                   presentation: np.ndarray) -> int:
+    step = np.where(allocation > 0, pack, np.maximum(presentation, pack)).astype(np.int64)
+    locations = np.nonzero(eligible & (capacity >= allocation + step))[0]
+    values = pack_values(allocation[locations], step[locations], demand[locations], std[locations], unit_value[locations])
+    heap = list(zip((-values / (step[locations] // pack)).tolist(), locations.tolist(), step[locations].tolist()))
+    heapq.heapify(heap)
+    demand, std, unit_value = demand.tolist(), std.tolist(), unit_value.tolist()
+
+    while heap and remaining >= pack:
+        value, location, units = heapq.heappop(heap)
+        if -value < RESERVE_THRESHOLD * pack * unit_value[location]:
+            break
+        if units > remaining:
+            continue
+
+        allocation[location] += units
+        remaining -= units
+        if capacity[location] >= allocation[location] + pack:
+            next_value = pack_value(float(allocation[location]), pack, demand[location], std[location], unit_value[location])
+            heapq.heappush(heap, (-next_value, location, pack))
+
+    return remaining
+
+
+def allocate_locations(units: Sequence[int], demand: np.ndarray, pack_size: Optional[Sequence[int]] = None,
+                       min_presentation: Optional[np.ndarray] = None, demand_std: Optional[np.ndarray] = None,
+                       unit_value: Optional[np.ndarray] = None,
+                       capacity: Optional[Sequence[float]] = None) -> Dict[str, np.ndarray]:
+    units = np.asarray(units, dtype=np.int64)
+    demand = np.maximum(np.asarray(demand, dtype=np.float64), 0.0)
+    sku_count, location_count = demand.shape
+
+    pack = np.maximum(np.broadcast_to(np.asarray(DEFAULT_PACK_SIZE if pack_size is None else pack_size, dtype=np.int64), (sku_count,)), 1)
+    std = np.sqrt(demand) if demand_std is None else np.broadcast_to(np.asarray(demand_std, dtype=np.float64), demand.shape)
+    std = np.maximum(std, MIN_DEMAND_STD)
+    unit_value = np.maximum(np.broadcast_to(np.asarray(1.0 if unit_value is None else unit_value, dtype=np.float64), demand.shape), 1e-9)
+    presentation = np.broadcast_to(np.asarray(0 if min_presentation is None else min_presentation, dtype=np.float64), demand.shape)
+    presentation = round_to_packs(presentation, pack[:, None], up=True)
+    location_capacity = np.full(location_count, np.inf) if capacity is None else np.asarray(capacity, dtype=np.float64).copy()
+
+    available = units - units % pack
+    eligible = presentation_eligibility(available, pack, demand, presentation, unit_value)
+    allocation = threshold_allocation(available, pack, demand, std, unit_value, presentation, eligible)
+    reserve = units.copy()
+
+    order = np.argsort(-(demand * unit_value).sum(axis=1), kind="stable")
+    for sku in order:
+        row = allocation[sku]
+        if capacity is not None:
+            row[:] = np.minimum(row, round_to_packs(np.minimum(location_capacity, available[sku]), pack[sku]))
+            row[row < presentation[sku]] = 0
+
+        remaining = fill_remaining(
+            row,
+            int(available[sku] - row.sum()),
+            int(pack[sku]),
+            demand[sku],
+            std[sku],
+            unit_value[sku],
+            eligible[sku],
+            location_capacity,
+            presentation[sku]
+        )
+        reserve[sku] = remaining + units[sku] - available[sku]
+        location_capacity -= row
+
+    expected_sales = demand - std * normal_loss((allocation - demand) / std)
+    expected_sales = np.clip(expected_sales, 0.0, np.minimum(allocation, demand))
+
+    logger.info(f"Allocated {int(allocation.sum())} units across {sku_count} SKUs x {location_count} locations, {int(reserve.sum())} held in reserve")
+
+    return {
+        "allocation": allocation,
+        "reserve": reserve,
+        "expected_sales": expected_sales,
+        "remaining_capacity": location_capacity
+    }
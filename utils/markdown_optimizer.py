@@ -0,0 +1,195 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MARKDOWN_LADDER = (0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7)
+ELASTICITY_BANDS = (1.0, 1.25, 1.5, 1.75, 2.0, 2.5, 3.0, 3.5, 4.0)
+DEFAULT_ELASTICITY = 2.0
+CATEGORY_ELASTICITY = {
+    "basics": 1.5,
+    "activewear": 1.75,
+    "athleisure": 2.0,
+    "womens-fashion": 2.5,
+    "streetwear": 2.5,
+    "outerwear": 3.0,
+    "seasonal": 3.5
+}
+DEFAULT_SALVAGE_RATE = 0.2
+COVER_STEP_WEEKS = 0.1
+MAX_COVER_WEEKS = 60.0
+MAX_HORIZON_WEEKS = 52
+
+COVER_GRID = np.arange(0.0, MAX_COVER_WEEKS + COVER_STEP_WEEKS / 2, COVER_STEP_WEEKS)
+PRICE_FACTORS = 1 - np.array(MARKDOWN_LADDER)
+
+
+def elasticity_band(elasticity: np.ndarray) -> np.ndarray:
+    bands = np.array(ELASTICITY_BANDS)
+    return bands[np.argmin(np.abs(np.asarray(elasticity, dtype=np.float64)[..., None] - bands), axis=-1)]
+
+
+def category_elasticity(category: Optional[str]) -> float:
+    return CATEGORY_ELASTICITY.get(str(category or "").strip().lower(), DEFAULT_ELASTICITY)
+
+
+def interpolate_rows(values: np.ndarray, cover: np.ndarray) -> np.ndarray:
+    position = np.clip(cover / COVER_STEP_WEEKS, 0, len(COVER_GRID) - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, len(COVER_GRID) - 1)
+    weight = position - lower
+    return values[..., lower] * (1 - weight) + values[..., upper] * weight
+
+
+@lru_cache(maxsize=128)
+def build_value_table(elasticity: float, weeks: int, salvage_rate: float = DEFAULT_SALVAGE_RATE) -> Dict[str, np.ndarray]:
+    lift = PRICE_FACTORS ** -elasticity
+    levels = len(MARKDOWN_LADDER)
+
+    value = np.zeros((weeks + 1, levels, len(COVER_GRID)))
+    policy = np.zeros((weeks, levels, len(COVER_GRID)), dtype=np.int8)
+    value[weeks] = salvage_rate * COVER_GRID[None, :]
+
+    for week in range(weeks - 1, -1, -1):
+        sales = np.minimum(COVER_GRID[None, :], lift[:, None])
+        continuation = np.stack([
+            interpolate_rows(value[week + 1, level], COVER_GRID - sales[level])
+            for level in range(levels)
+        ])
+        choice_value = PRICE_FACTORS[:, None] * sales + continuation
+
+        best_from = np.maximum.accumulate(choice_value[::-1], axis=0)[::-1]
+        best_level = np.empty((levels, len(COVER_GRID)), dtype=np.int8)
+        best_level[-1] = levels - 1
+        for level in range(levels - 2, -1, -1):
+            keep = choice_value[level] >= best_from[level + 1]
+            best_level[level] = np.where(keep, level, best_level[level + 1])
+
+        value[week] = best_from
+        policy[week] = best_level
+
+    logger.info(f"Built markdown value table for elasticity {elasticity} over {weeks} weeks")
+    return {"value": value, "policy": policy, "lift": lift}
+
+
+def simulate_policy(table: Dict[str, np.ndarray], cover: np.ndarray, start_level: np.ndarray,
+                    weeks: int) -> Dict[str, np.ndarray]:
+    count = len(cover)
+    level = start_level.astype(np.int64)
+    remaining = cover.copy()
+    revenue = np.zeros(count)
+    schedule = np.zeros((count, weeks), dtype=np.int64)
+
+    for week in range(weeks):
+        grid_index = np.clip(np.rint(remaining / COVER_STEP_WEEKS).astype(np.int64), 0, len(COVER_GRID) - 1)
+        level = table["policy"][week, level, grid_index].astype(np.int64)
+        sales = np.minimum(remaining, table["lift"][level])
+        revenue += PRICE_FACTORS[level] * sales
+        remaining -= sales
+        schedule[:, week] = level
+
+    return {"schedule": schedule, "revenue": revenue, "leftover": remaining}
+
+
+def no_markdown_outcome(cover: np.ndarray, start_level: np.ndarray, weeks: int, lift: np.ndarray) -> Dict[str, np.ndarray]:
+    sold = np.minimum(cover, lift[start_level] * weeks)
+    return {"revenue": PRICE_FACTORS[start_level] * sold, "leftover": cover - sold}
+
+
+def optimize_markdowns(on_hand: Sequence[float], weekly_velocity: Sequence[float], remaining_weeks: Sequence[int],
+                       full_price: Sequence[float], elasticity: Sequence[float],
+                       current_markdown: Optional[Sequence[float]] = None,
+                       salvage_rate: float = DEFAULT_SALVAGE_RATE) -> Dict[str, np.ndarray]:
+    on_hand = np.maximum(np.asarray(on_hand, dtype=np.float64), 0.0)
+    velocity = np.maximum(np.asarray(weekly_velocity, dtype=np.float64), 1e-6)
+    weeks = np.clip(np.asarray(remaining_weeks, dtype=np.int64), 1, MAX_HORIZON_WEEKS)
+    price = np.asarray(full_price, dtype=np.float64)
+    bands = elasticity_band(elasticity)
+    ladder = np.array(MARKDOWN_LADDER)
+    current = np.zeros(len(on_hand)) if current_markdown is None else np.asarray(current_markdown, dtype=np.float64)
+    start_level = np.searchsorted(ladder, np.clip(current, 0.0, ladder[-1]) + 1e-9, side="right") - 1
+
+    count = len(on_hand)
+    cover = np.minimum(on_hand / velocity, MAX_COVER_WEEKS)
+    overflow = on_hand / velocity - cover
+    first_week = np.full(count, -1, dtype=np.int64)
+    first_depth = np.zeros(count)
+    final_depth = np.zeros(count)
+    revenue = np.zeros(count)
+    baseline_revenue = np.zeros(count)
+    leftover = np.zeros(count)
+    schedules: List[List[Dict]] = [[] for _ in range(count)]
+
+    groups: Dict[tuple, List[int]] = {}
+    for row, key in enumerate(zip(bands.tolist(), weeks.tolist())):
+        groups.setdefault(key, []).append(row)
+
+    for (band, horizon), rows in groups.items():
+        rows = np.array(rows)
+        table = build_value_table(band, horizon, salvage_rate)
+        result = simulate_policy(table, cover[rows], start_level[rows], horizon)
+        baseline = no_markdown_outcome(cover[rows], start_level[rows], horizon, table["lift"])
+
+        scale = velocity[rows] * price[rows]
+        revenue[rows] = (result["revenue"] + salvage_rate * (result["leftover"] + overflow[rows])) * scale
+        baseline_revenue[rows] = (baseline["revenue"] + salvage_rate * (baseline["leftover"] + overflow[rows])) * scale
+        leftover[rows] = (result["leftover"] + overflow[rows]) * velocity[rows]
+
+        schedule = result["schedule"]
+        changed = schedule > start_level[rows][:, None]
+        has_markdown = changed.any(axis=1)
+        first = np.argmax(changed, axis=1)
+        first_week[rows] = np.where(has_markdown, first + 1, -1)
+        first_depth[rows] = np.where(has_markdown, ladder[schedule[np.arange(len(rows)), first]], 0.0)
+        final_depth[rows] = ladder[schedule[:, -1]]
+
+        steps = np.diff(np.concatenate([start_level[rows][:, None], schedule], axis=1), axis=1) != 0
+        for local, step in zip(*np.nonzero(steps)):
+            schedules[rows[local]].append({"week": int(step) + 1, "markdown_pct": int(round(ladder[schedule[local, step]] * 100))})
+
+    return {
+        "first_markdown_week": first_week,
+        "first_markdown_depth": first_depth,
+        "final_markdown_depth": final_depth,
+        "expected_revenue": revenue,
+        "baseline_revenue": baseline_revenue,
+        "expected_leftover_units": leftover,
+        "elasticity_band": bands,
+        "schedules": schedules
+    }
+
+
+def build_markdown_plans(skus: List[Dict], default_weeks: int, salvage_rate: float = DEFAULT_SALVAGE_RATE) -> List[Dict]:
+    if not skus:
+        return []
+
+    result = optimize_markdowns(
+        [sku.get("on_hand", sku.get("units", 0)) or 0 for sku in skus],
+        [sku.get("weekly_velocity") or 0 for sku in skus],
+        [sku.get("remaining_weeks") or default_weeks for sku in skus],
+        [sku.get("full_price") or 1.0 for sku in skus],
+        [sku.get("elasticity") or category_elasticity(sku.get("category")) for sku in skus],
+        [sku.get("current_markdown") or 0.0 for sku in skus],
+        salvage_rate
+    )
+
+    plans = []
+    for row, sku in enumerate(skus):
+        first_week = int(result["first_markdown_week"][row])
+        plans.append({
+            "sku_code": sku.get("sku_code") or sku.get("sku"),
+            "first_markdown_week": first_week if first_week > 0 else None,
+            "first_markdown_pct": int(round(result["first_markdown_depth"][row] * 100)),
+            "final_markdown_pct": int(round(result["final_markdown_depth"][row] * 100)),
+            "markdown_schedule": result["schedules"][row],
+            "expected_revenue": round(float(result["expected_revenue"][row]), 2),
+            "revenue_without_markdown": round(float(result["baseline_revenue"][row]), 2),
+            "revenue_uplift": round(float(result["expected_revenue"][row] - result["baseline_revenue"][row]), 2),
+            "expected_leftover_units": int(round(result["expected_leftover_units"][row])),
+            "elasticity": float(result["elasticity_band"][row])
+        })
+
+    return plans
@@ -0,0 +1,96 @@
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import logging
+import re
+
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+Expr = Union[str, List["Expr"]]
+
+_TOKEN_PATTERN = re.compile(r'\(|\)|[^\s()]+')
+_NUMBER_PATTERN = re.compile(r'^-?\d+(?:\.\d+)?')
+_RANGE_PATTERN = re.compile(r'^(-?\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)')
+
+
+def parse_metta(text: str) -> List[Expr]:
+    expressions = []
+    stack = []
+
+    for line in text.splitlines():
+        line = line.split(";", 1)[0]
+        for token in _TOKEN_PATTERN.findall(line):
+            if token == "(":
+                stack.append([])
+            elif token == ")":
+                if not stack:
+                    continue
+                expr = stack.pop()
+                if stack:
+                    stack[-1].append(expr)
+                else:
+                    expressions.append(expr)
+            elif stack:
+                stack[-1].append(token)
+
+    return expressions
+
+
+@lru_cache(maxsize=None)
+def load_metta_file(filename: str) -> Tuple[Expr, ...]:
+    filepath = Config.get_knowledge_dir() / filename
+    try:
+        text = filepath.read_text(encoding="utf-8")
+    except OSError as e:
+        logger.warning(f"MeTTa facts unavailable for {filename}: {e}")
+        return ()
+
+    return tuple(parse_metta(text))
+
+
+def iter_entities(filename: str, head: str) -> Iterator[Tuple[str, Dict[str, List[Expr]]]]:
+    for expr in load_metta_file(filename):
+        if not isinstance(expr, list) or len(expr) < 2 or expr[0] != head:
+            continue
+        if not isinstance(expr[1], str):
+            continue
+
+        attributes = {}
+        for item in expr[2:]:
+            if isinstance(item, list) and item and isinstance(item[0], str):
+                attributes[item[0]] = item[1:]
+
+        yield expr[1], attributes
+
+
+def get_entities(filename: str, head: str) -> Dict[str, Dict[str, List[Expr]]]:
+    return {name: attributes for name, attributes in iter_entities(filename, head)}
+
+
+def parse_number(token: Expr, default: Optional[float] = None) -> Optional[float]:
+    if not isinstance(token, str):
+        return default
+
+    match = _NUMBER_PATTERN.match(token)
+    return float(match.group(0)) if match else default
+
+
+def parse_range(token: Expr) -> Optional[Tuple[float, float]]:
+    if not isinstance(token, str):
+        return None
+
+    match = _RANGE_PATTERN.match(token)
+    if match:
+        return float(match.group(1)), float(match.group(2))
+
+    value = parse_number(token)
+    return (value, value) if value is not None else None
+
+
+def first_number(values: List[Expr], default: Optional[float] = None) -> Optional[float]:
+    for value in values or []:
+        number = parse_number(value)
+        if number is not None:
+            return number
+    return default
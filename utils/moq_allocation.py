@@ -0,0 +1,218 @@
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+MAX_TOTAL_REDUCTION = 0.65
+
+MULTI_STYLE_TIERS = [(5, 0.40), (3, 0.30)]
+
+DEFAULT_TIME_LIMIT_SECONDS = 1.0
+
+OBJECTIVES = ("cost", "overbuy")
+
+
+class SupplierOption(NamedTuple):
+    name: str
+    unit_cost: float
+    moq_standard: int
+    moq_negotiable: int
+    lever_reduction: float
+
+
+def style_target_units(style: Dict) -> int:
+    for key in ("target_units", "units"):
+        value = style.get(key)
+        if value is not None:
+            try:
+                return max(int(float(value)), 0)
+            except (TypeError, ValueError):
+                return 0
+
+    total = 0.0
+    for colorway in style.get("colorways") or []:
+        try:
+            total += float(colorway.get("units", 0) or 0)
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return int(total)
+
+
+def multi_style_reduction(style_count: int) -> float:
+    for minimum_styles, reduction in MULTI_STYLE_TIERS:
+        if style_count >= minimum_styles:
+            return reduction
+    return 0.0
+
+
+def pooled_moq(option: SupplierOption, style_count: int) -> int:
+    reduction = min(option.lever_reduction + multi_style_reduction(style_count), MAX_TOTAL_REDUCTION)
+    return max(int(option.moq_standard * (1 - reduction)), option.moq_negotiable)
+
+
+def evaluate_assignment(demands: Sequence[int], options: Sequence[SupplierOption],
+                        assignment: Sequence[int], budget: float, objective: str) -> Tuple[float, float, float]:
+    counts = [0] * len(options)
+    for supplier_idx in assignment:
+        counts[supplier_idx] += 1
+    moqs = [pooled_moq(option, count) for option, count in zip(options, counts)]
+
+    cost = 0.0
+    overbuy = 0
+    for demand, supplier_idx in zip(demands, assignment):
+        units = max(demand, moqs[supplier_idx])
+        cost += units * options[supplier_idx].unit_cost
+        overbuy += units - demand
+
+    primary = cost if objective == "cost" else overbuy
+    return max(cost - budget, 0.0), primary, cost
+
+
+def greedy_allocation(demands: Sequence[int], options: Sequence[SupplierOption],
+                      budget: float, objective: str) -> List[int]:
+    candidates = [[supplier_idx] * len(demands) for supplier_idx in range(len(options))]
+
+    assignment = []
+    for style_idx in range(len(demands)):
+        best = None
+        for supplier_idx in range(len(options)):
+            trial = assignment + [supplier_idx]
+            score = evaluate_assignment(demands[:style_idx + 1], options, trial, budget, objective)
+            if best is None or score < best[0]:
+                best = (score, supplier_idx)
+        assignment.append(best[1])
+    candidates.append(assignment)
+
+    return min(candidates, key=lambda candidate: evaluate_assignment(demands, options, candidate, budget, objective))
+
+
+def solve_moq_allocation(styles: List[Dict], options: List[SupplierOption], budget: float,
+                         objective: str = "cost",
+                         time_limit: float = DEFAULT_TIME_LIMIT_SECONDS) -> Optional[Dict]:
+
+    if not styles or not options:
+        return None
+    if objective not in OBJECTIVES:
+        logger.warning(f"Unknown allocation objective {objective}, using cost")
+        objective = "cost"
+
+    units = [style_target_units(style) for style in styles]
+    skipped = [style.get("style_id", f"style-{i + 1}") for i, style in enumerate(styles) if units[i] <= 0]
+    if skipped:
+        logger.warning(f"Skipping {len(skipped)} styles without target units: {skipped}")
+    if len(skipped) == len(styles):
+        return None
+
+    started = time.perf_counter()
+    order = sorted((i for i in range(len(styles)) if units[i] > 0), key=lambda i: units[i], reverse=True)
+    demands = [units[i] for i in order]
+
+    floor_moqs = [pooled_moq(option, math.inf) for option in options]
+    style_bounds = []
+    for demand in demands:
+        bounds = []
+        for supplier_idx, option in enumerate(options):
+            units = max(demand, floor_moqs[supplier_idx])
+            cost = units * option.unit_cost
+            primary = cost if objective == "cost" else units - demand
+            bounds.append((primary, cost, supplier_idx))
+        bounds.sort()
+        style_bounds.append(bounds)
+
+    suffix_primary = [0.0] * (len(demands) + 1)
+    suffix_cost = [0.0] * (len(demands) + 1)
+    for style_idx in range(len(demands) - 1, -1, -1):
+        suffix_primary[style_idx] = suffix_primary[style_idx + 1] + min(b[0] for b in style_bounds[style_idx])
+        suffix_cost[style_idx] = suffix_cost[style_idx + 1] + min(b[1] for b in style_bounds[style_idx])
+
+    incumbent = greedy_allocation(demands, options, budget, objective)
+    incumbent_score = evaluate_assignment(demands, options, incumbent, budget, objective)
+    warm_start_score = incumbent_score
+
+    assignment = [0] * len(demands)
+    nodes = 0
+    timed_out = False
+
+    def search(style_idx: int, primary_lb: float, cost_lb: float):
+        nonlocal incumbent, incumbent_score, nodes, timed_out
+
+        nodes += 1
+        if nodes % 1024 == 0 and time.perf_counter() - started > time_limit:
+            timed_out = True
+        if timed_out:
+            return
+
+        if style_idx == len(demands):
+            score = evaluate_assignment(demands, options, assignment, budget, objective)
+            if score < incumbent_score:
+                incumbent, incumbent_score = list(assignment), score
+            return
+
+        for primary, cost, supplier_idx in style_bounds[style_idx]:
+            next_primary = primary_lb + primary
+            next_cost = cost_lb + cost
+            total_cost = next_cost + suffix_cost[style_idx + 1]
+            bound = (max(total_cost - budget, 0.0), next_primary + suffix_primary[style_idx + 1], total_cost)
+            if bound >= incumbent_score:
+                continue
+            assignment[style_idx] = supplier_idx
+            search(style_idx + 1, next_primary, next_cost)
+            if timed_out:
+                return
+
+    search(0, 0.0, 0.0)
+
+    status = "time_limit" if timed_out else "optimal"
+
+    counts = [0] * len(options)
+    for supplier_idx in incumbent:
+        counts[supplier_idx] += 1
+
+    assignments = []
+    for position, supplier_idx in enumerate(incumbent):
+        option = options[supplier_idx]
+        units = max(demands[position], pooled_moq(option, counts[supplier_idx]))
+        assignments.append({
+            "style_id": styles[order[position]].get("style_id", f"style-{order[position] + 1}"),
+            "supplier": option.name,
+            "target_units": demands[position],
+            "order_units": units,
+            "overbuy_units": units - demands[position],
+            "unit_cost": round(option.unit_cost, 2),
+            "cost": round(units * option.unit_cost, 2)
+        })
+
+    supplier_summary = []
+    for supplier_idx, option in enumerate(options):
+        if not counts[supplier_idx]:
+            continue
+        rows = [row for row in assignments if row["supplier"] == option.name]
+        supplier_summary.append({
+            "supplier": option.name,
+            "styles": counts[supplier_idx],
+            "moq_per_style": pooled_moq(option, counts[supplier_idx]),
+            "units": sum(row["order_units"] for row in rows),
+            "cost": round(sum(row["cost"] for row in rows), 2)
+        })
+
+    over_budget, _, total_cost = incumbent_score
+    solve_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"MOQ allocation: {status} after {nodes} nodes in {solve_ms:.1f}ms")
+
+    return {
+        "status": status,
+        "objective": objective,
+        "assignments": assignments,
+        "suppliers": supplier_summary,
+        "total_units": sum(row["order_units"] for row in assignments),
+        "target_units": sum(demands),
+        "overbuy_units": sum(row["overbuy_units"] for row in assignments),
+        "total_cost": round(total_cost, 2),
+        "within_budget": over_budget == 0,
+        "warm_start_cost": round(warm_start_score[2], 2),
+        "nodes_explored": nodes,
+        "solve_time_ms": round(solve_ms, 1),
+        "skipped_styles": skipped
+    }
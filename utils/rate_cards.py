@@ -0,0 +1,136 @@
+from bisect import bisect_right
+from datetime import date, datetime
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Union
+import logging
+
+from utils.metta_facts import iter_entities, parse_number
+
+logger = logging.getLogger(__name__)
+
+RATE_CARD_FILE = "rate_cards.metta"
+
+RATE_SECTIONS = {
+    "fabric-price-per-meter": ("fabric_prices", 1.0),
+    "labor-cost-per-minute": ("labor_rates", 1.0),
+    "overhead-percentage": ("overhead_rates", 0.01),
+    "profit-margin": ("profit_rates", 0.01),
+    "freight-per-unit": ("freight_costs", 1.0),
+    "duty-rate": ("duty_rates", 0.01)
+}
+
+DateLike = Union[date, datetime, str, None]
+
+
+class RateCard(NamedTuple):
+    version: str
+    effective_date: date
+    fabric_prices: Mapping[str, float]
+    labor_rates: Mapping[str, float]
+    overhead_rates: Mapping[str, float]
+    profit_rates: Mapping[str, float]
+    freight_costs: Mapping[str, float]
+    duty_rates: Mapping[str, float]
+
+
+def parse_date(value: DateLike) -> Optional[date]:
+    if value is None:
+        return datetime.utcnow().date()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def to_date(value: DateLike) -> date:
+    parsed = parse_date(value)
+    if parsed is None:
+        logger.warning(f"Invalid rate card date {value!r}, using today")
+        return datetime.utcnow().date()
+    return parsed
+
+
+def rate_card_warning(card: RateCard, when: DateLike = None) -> Optional[str]:
+    parsed = parse_date(when)
+    if parsed is None:
+        return f"Invalid as-of date {when!r}; priced on the current rate card {card.version}"
+    if parsed < card.effective_date:
+        return f"No rate card effective on {parsed.isoformat()}; priced on the earliest card {card.version} ({card.effective_date.isoformat()})"
+    return None
+
+
+def build_rate_card(version: str, effective_date: date, rates: Dict[str, Dict[str, float]]) -> RateCard:
+    return RateCard(
+        version=version,
+        effective_date=effective_date,
+        **{field: MappingProxyType(dict(rates.get(field, {}))) for field, _ in RATE_SECTIONS.values()}
+    )
+
+
+class RateCardIndex:
+    def __init__(self, cards: List[RateCard]):
+        self.cards = sorted(cards, key=lambda card: card.effective_date)
+        self.effective_dates = [card.effective_date for card in self.cards]
+
+    def as_of(self, when: DateLike = None) -> Optional[RateCard]:
+        if not self.cards:
+            return None
+
+        position = bisect_right(self.effective_dates, to_date(when))
+        if position == 0:
+            logger.warning(f"No rate card effective on {to_date(when)}, using earliest {self.cards[0].version}")
+            return self.cards[0]
+
+        return self.cards[position - 1]
+
+    def versions(self) -> List[Dict]:
+        return [
+            {"version": card.version, "effective_date": card.effective_date.isoformat()}
+            for card in self.cards
+        ]
+
+
+def load_rate_cards() -> List[RateCard]:
+    versions = []
+    for version, attributes in iter_entities(RATE_CARD_FILE, "rate-card"):
+        effective = attributes.get("effective-date", [])
+        if not effective or not isinstance(effective[0], str):
+            logger.warning(f"Rate card {version} has no effective-date, skipping")
+            continue
+        effective_date = parse_date(effective[0])
+        if effective_date is None:
+            logger.warning(f"Rate card {version} has invalid effective-date {effective[0]!r}, skipping")
+            continue
+
+        sections = {}
+        for section, (field, scale) in RATE_SECTIONS.items():
+            for entry in attributes.get(section, []):
+                if isinstance(entry, list) and len(entry) >= 2:
+                    value = parse_number(entry[1])
+                    if value is not None:
+                        sections.setdefault(field, {})[entry[0]] = round(value * scale, 6)
+
+        versions.append((effective_date, version, sections))
+
+    cards = []
+    inherited = {}
+    for effective_date, version, sections in sorted(versions, key=lambda item: item[0]):
+        inherited = {
+            field: {**inherited.get(field, {}), **sections.get(field, {})}
+            for field, _ in RATE_SECTIONS.values()
+        }
+        cards.append(build_rate_card(version, effective_date, inherited))
+
+    return cards
+
+
+@lru_cache(maxsize=None)
+def get_rate_card_index() -> RateCardIndex:
+    cards = load_rate_cards()
+    logger.info(f"Loaded {len(cards)} rate card versions")
+    return RateCardIndex(cards)
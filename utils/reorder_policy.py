@@ -0,0 +1,169 @@
+from functools import lru_cache
+from statistics import NormalDist
+from typing import Dict, Optional, Union
+import logging
+
+import numpy as np
+
+from utils.metta_facts import iter_entities, parse_range
+from utils.supplier_index import get_supplier_index
+
+logger = logging.getLogger(__name__)
+
+ArrayLike = Union[float, np.ndarray]
+
+DEFAULT_SERVICE_LEVEL = 0.95
+DEFAULT_LEAD_TIME_CV = 0.2
+DEFAULT_ORDER_COST = 150.0
+DEFAULT_HOLDING_RATE = 0.25
+DEFAULT_ORDER_CYCLE_WEEKS = 4
+WEEKS_PER_YEAR = 52
+Z_BOUNDS = (-4.0, 6.0)
+SOLVER_ITERATIONS = 40
+DOMESTIC_ORIGIN = "usa"
+
+
+def normal_cdf(z: np.ndarray) -> np.ndarray:
+    x = np.abs(z) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - poly * np.exp(-x * x)
+    return 0.5 * (1 + np.sign(z) * erf)
+
+
+def normal_pdf(z: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * z * z) / np.sqrt(2 * np.pi)
+
+
+def normal_loss(z: np.ndarray) -> np.ndarray:
+    return normal_pdf(z) - z * (1 - normal_cdf(z))
+
+
+def normal_ppf(p: np.ndarray) -> np.ndarray:
+    p = np.clip(np.asarray(p, dtype=np.float64), 1e-12, 1 - 1e-12)
+    a = (-39.69683028665376, 220.9460984245205, -275.9285104469687, 138.3577518672690, -30.66479806614716, 2.506628277459239)
+    b = (-54.47609879822406, 161.5858368580409, -155.6989798598866, 66.80131188771972, -13.28068155288572)
+    c = (-0.007784894002430293, -0.3223964580411365, -2.400758277161838, -2.549732539343734, 4.374664141464968, 2.938163982698783)
+    d = (0.007784695709041462, 0.3224671290700398, 2.445134137142996, 3.754408661907416)
+
+    r = (p - 0.5) ** 2
+    z = (p - 0.5) * (((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) / (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1)
+
+    tail = np.minimum(p, 1 - p)
+    in_tail = tail < 0.02425
+    if in_tail.any():
+        q = np.sqrt(-2 * np.log(tail[in_tail]))
+        tail_z = (((((c[0] * q + c[1]) * q + c[2]) * q + c[3]) * q + c[4]) * q + c[5]) / ((((d[0] * q + d[1]) * q + d[2]) * q + d[3]) * q + 1)
+        z[in_tail] = np.where(p[in_tail] < 0.5, tail_z, -tail_z)
+
+    return z
+
+
+def service_level_z(service_level: ArrayLike) -> np.ndarray:
+    levels = np.clip(np.asarray(service_level, dtype=np.float64), 0.5, 0.9999)
+    unique, inverse = np.unique(levels, return_inverse=True)
+    z_values = np.array([NormalDist().inv_cdf(level) for level in unique])
+    return z_values[inverse].reshape(levels.shape)
+
+
+def fill_rate_z(target_loss: np.ndarray) -> np.ndarray:
+    low = np.full(target_loss.shape, Z_BOUNDS[0])
+    high = np.full(target_loss.shape, Z_BOUNDS[1])
+
+    for _ in range(SOLVER_ITERATIONS):
+        mid = (low + high) / 2
+        too_low = normal_loss(mid) > target_loss
+        low = np.where(too_low, mid, low)
+        high = np.where(too_low, high, mid)
+
+    return (low + high) / 2
+
+
+@lru_cache(maxsize=None)
+def get_transit_days(location: str) -> Optional[float]:
+    origin_prefix = location.lower().replace(" ", "-")
+    if origin_prefix == DOMESTIC_ORIGIN:
+        return 0.0
+
+    clearance = (0.0, 0.0)
+    for _, attributes in iter_entities("financial_logistics.metta", "customs-clearance"):
+        clearance = parse_range(attributes.get("clearance-time-days", [None])[0]) or clearance
+        break
+
+    for name, attributes in iter_entities("financial_logistics.metta", "shipping-cost"):
+        origin = attributes.get("origin", [""])[0]
+        transit = parse_range(attributes.get("transit-days", [None])[0])
+        if name == "sea-freight" and isinstance(origin, str) and origin.startswith(origin_prefix) and transit:
+            return (transit[0] + transit[1] + clearance[0] + clearance[1]) / 2
+    return None
+
+
+def get_supplier_lead_time_weeks(supplier_name: str) -> Optional[float]:
+    for record in get_supplier_index().records:
+        if record["name"] == supplier_name and record["lead_time_days"]:
+            transit = get_transit_days(record["location"])
+            if transit is None:
+                return None
+            return (record["lead_time_days"] + transit) / 7
+    return None
+
+
+def compute_reorder_policy(mean_demand: ArrayLike, demand_std: ArrayLike, lead_time: ArrayLike,
+                           lead_time_std: Optional[ArrayLike] = None, review_period: ArrayLike = 0.0,
+                           service_level: ArrayLike = DEFAULT_SERVICE_LEVEL, fill_rate: Optional[ArrayLike] = None,
+                           unit_cost: Optional[ArrayLike] = None, order_cost: ArrayLike = DEFAULT_ORDER_COST,
+                           holding_rate: ArrayLike = DEFAULT_HOLDING_RATE, on_hand: ArrayLike = 0.0,
+                           min_order_qty: ArrayLike = 0.0) -> Dict[str, np.ndarray]:
+
+    mean_demand = np.maximum(np.asarray(mean_demand, dtype=np.float64), 0.0)
+    shape = mean_demand.shape
+    demand_std = np.broadcast_to(np.asarray(demand_std, dtype=np.float64), shape)
+    lead_time = np.broadcast_to(np.asarray(lead_time, dtype=np.float64), shape)
+    lead_time_std = lead_time * DEFAULT_LEAD_TIME_CV if lead_time_std is None else np.broadcast_to(np.asarray(lead_time_std, dtype=np.float64), shape)
+    review_period = np.broadcast_to(np.asarray(review_period, dtype=np.float64), shape)
+    on_hand = np.broadcast_to(np.asarray(on_hand, dtype=np.float64), shape)
+
+    exposure = lead_time + review_period
+    sigma = np.sqrt(exposure * demand_std ** 2 + mean_demand ** 2 * lead_time_std ** 2)
+
+    cycle_quantity = mean_demand * np.maximum(review_period, DEFAULT_ORDER_CYCLE_WEEKS)
+    if unit_cost is not None:
+        unit_cost = np.broadcast_to(np.asarray(unit_cost, dtype=np.float64), shape)
+        holding = np.maximum(np.asarray(holding_rate) * unit_cost, 1e-9)
+        eoq = np.sqrt(2 * mean_demand * WEEKS_PER_YEAR * np.asarray(order_cost) / holding)
+        eoq = np.where(unit_cost > 0, eoq, cycle_quantity)
+    else:
+        eoq = cycle_quantity
+    order_quantity = np.ceil(np.maximum(eoq, min_order_qty))
+
+    if fill_rate is not None:
+        target_loss = (1 - np.asarray(fill_rate, dtype=np.float64)) * np.maximum(order_quantity, 1.0) / np.maximum(sigma, 1e-9)
+        z = np.maximum(fill_rate_z(np.broadcast_to(target_loss, shape)), 0.0)
+    else:
+        z = np.broadcast_to(service_level_z(service_level), shape)
+
+    safety_stock = z * sigma
+    reorder_point = mean_demand * lead_time + safety_stock
+    order_up_to = np.where(review_period > 0, mean_demand * exposure + safety_stock, reorder_point + order_quantity)
+    expected_fill_rate = np.where(
+        sigma > 0,
+        1 - sigma * normal_loss(z) / np.maximum(order_quantity, 1.0),
+        1.0
+    )
+
+    with np.errstate(divide="ignore"):
+        weeks_of_inventory = np.where(mean_demand > 0, on_hand / mean_demand, np.inf)
+
+    return {
+        "lead_time_demand": mean_demand * lead_time,
+        "demand_std_over_lead_time": sigma,
+        "z": z,
+        "safety_stock": safety_stock,
+        "reorder_point": reorder_point,
+        "order_up_to": order_up_to,
+        "order_quantity": order_quantity,
+        "suggested_order": np.maximum(order_up_to - on_hand, 0.0) * (on_hand <= reorder_point),
+        "cycle_service_level": normal_cdf(z),
+        "expected_fill_rate": np.clip(expected_fill_rate, 0.0, 1.0),
+        "weeks_of_inventory": weeks_of_inventory
+    }
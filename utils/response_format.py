@@ -0,0 +1,51 @@
+from typing import Any, Iterable
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+_JSON_REQUEST_PATTERN = re.compile(r'(?:\b(?:as|in|format[:=]?|accept[:=]?)\s*|--)json\b|application/json')
+
+
+def to_payload(result: Any) -> Any:
+    if hasattr(result, "model_dump"):
+        return result.model_dump()
+    if hasattr(result, "dict"):
+        return result.dict()
+    return result
+
+
+def encode_json_bytes(result: Any, sort_keys: bool = False) -> bytes:
+    payload = to_payload(result)
+
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(payload, default=str, option=option)
+
+    return json.dumps(payload, separators=(",", ":"), sort_keys=sort_keys, default=str).encode("utf-8")
+
+
+def encode_json(result: Any) -> str:
+    return encode_json_bytes(result).decode("utf-8")
+
+
+def wants_structured_response(content: Iterable[Any]) -> bool:
+    for item in content:
+        metadata = getattr(item, "metadata", None)
+        if isinstance(metadata, dict):
+            accept = f"{metadata.get('accept', '')} {metadata.get('format', '')}".lower()
+            if "json" in accept:
+                return True
+
+        text = getattr(item, "text", None)
+        if isinstance(text, str) and _JSON_REQUEST_PATTERN.search(text.lower()):
+            return True
+
+    return False
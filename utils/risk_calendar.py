@@ -0,0 +1,213 @@
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import logging
+import re
+
+from utils.metta_facts import first_number, iter_entities, load_metta_file
+
+logger = logging.getLogger(__name__)
+
+RISK_CALENDAR_FILE = "risk_calendar.metta"
+GLOBAL_REGION = "global"
+RECURRING_YEARS = range(2024, 2032)
+
+PROBABILITY_LABELS = {
+    "high": "High",
+    "medium-high": "Medium-High",
+    "medium": "Medium",
+    "low": "Low"
+}
+
+
+class RiskWindow(NamedTuple):
+    start: date
+    end: date
+    risk_type: str
+    label: str
+    region: str
+
+
+def phase_slug(phase_name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', phase_name.lower()).strip('-')
+
+
+def display_name(token: str) -> str:
+    return " ".join(word.upper() if word in ("cny", "usa") else word.capitalize() for word in token.split("-"))
+
+
+class IntervalTree:
+    def __init__(self, windows: List[RiskWindow]):
+        self.windows = sorted(windows, key=lambda window: (window.start, window.end))
+        self.max_end = [window.end for window in self.windows]
+        self.build(0, len(self.windows))
+
+    def build(self, lo: int, hi: int) -> Optional[date]:
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        left = self.build(lo, mid)
+        right = self.build(mid + 1, hi)
+        self.max_end[mid] = max(end for end in (self.windows[mid].end, left, right) if end is not None)
+        return self.max_end[mid]
+
+    def query(self, start: date, end: date) -> List[RiskWindow]:
+        matches = []
+        stack = [(0, len(self.windows))]
+
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self.max_end[mid] < start:
+                continue
+
+            stack.append((lo, mid))
+            window = self.windows[mid]
+            if window.start <= end:
+                if window.end >= start:
+                    matches.append(window)
+                stack.append((mid + 1, hi))
+
+        return matches
+
+
+class RiskCalendar:
+    def __init__(self, risk_types: Dict[str, Dict], windows: List[RiskWindow],
+                 coverage: Optional[Tuple[date, date]] = None):
+        self.risk_types = risk_types
+        by_region = {}
+        for window in windows:
+            by_region.setdefault(window.region, []).append(window)
+        self.trees = {region: IntervalTree(items) for region, items in by_region.items()}
+        self.coverage = coverage or (date(RECURRING_YEARS.start, 1, 1), date(RECURRING_YEARS.stop - 1, 12, 31))
+
+    def coverage_gap(self, start: date, end: date) -> Optional[Dict]:
+        covered_from, covered_until = self.coverage
+        if covered_from <= start and end <= covered_until:
+            return None
+
+        logger.warning(f"Risk calendar covers {covered_from} to {covered_until}, query {start} to {end} falls outside it")
+        return {
+            "risk_name": "Risk Calendar Coverage Gap",
+            "impact": f"Holiday and seasonal risks are only dated from {covered_from.isoformat()} to {covered_until.isoformat()}",
+            "probability": "Low",
+            "mitigation": "Confirm factory holidays and port seasons with the supplier for dates outside the calendar",
+            "delay_days": 0,
+            "window_start": covered_from.isoformat(),
+            "window_end": covered_until.isoformat()
+        }
+
+    def overlapping(self, region: str, start: date, end: date) -> List[RiskWindow]:
+        matches = []
+        for key in (region.lower(), GLOBAL_REGION):
+            tree = self.trees.get(key)
+            if tree:
+                matches.extend(tree.query(start, end))
+        return matches
+
+    def assess_phases(self, region: str, phases: List[Dict], start_date: date) -> List[Dict]:
+        risks = {}
+        active = [phase for phase in phases if phase["duration_days"] > 0]
+        if active:
+            gap = self.coverage_gap(
+                start_date + timedelta(days=min(phase["early_start"] for phase in active)),
+                start_date + timedelta(days=max(phase["early_finish"] for phase in active) - 1)
+            )
+            if gap:
+                risks[("coverage-gap",)] = gap
+
+        for phase in phases:
+            if phase["duration_days"] <= 0:
+                continue
+            phase_start = start_date + timedelta(days=phase["early_start"])
+            phase_end = start_date + timedelta(days=phase["early_finish"] - 1)
+            slug = phase_slug(phase["phase_name"])
+
+            for window in self.overlapping(region, phase_start, phase_end):
+                terms = self.risk_types.get(window.risk_type, {})
+                if slug not in terms.get("phases", ()):
+                    continue
+
+                overlap = (min(window.end, phase_end) - max(window.start, phase_start)).days + 1
+                delay = min(round(overlap * terms["delay_factor"]), terms["max_delay_days"])
+                key = (window.risk_type, window.label, window.start)
+                current = risks.get(key)
+                if current and current["delay_days"] >= delay:
+                    continue
+
+                risks[key] = {
+                    "risk_name": terms["display_name"] if window.risk_type != "factory-holiday" else f"{display_name(window.label)} Factory Closure",
+                    "impact": display_name(terms["impact"]),
+                    "probability": terms["probability"],
+                    "mitigation": display_name(terms["mitigation"]),
+                    "delay_days": max(delay, 1),
+                    "phase": phase["phase_name"],
+                    "overlap_days": overlap,
+                    "window_start": window.start.isoformat(),
+                    "window_end": window.end.isoformat(),
+                    "affected_regions": terms["countries"]
+                }
+
+        return sorted(risks.values(), key=lambda risk: risk["window_start"])
+
+
+def load_risk_calendar() -> RiskCalendar:
+    risk_types = {}
+    for risk_type, attributes in iter_entities(RISK_CALENDAR_FILE, "risk-type"):
+        risk_types[risk_type] = {
+            "display_name": display_name(attributes.get("display-name", [risk_type])[0]),
+            "countries": [display_name(country) for country in attributes.get("countries", [])],
+            "regions": [country.lower() for country in attributes.get("countries", [])],
+            "phases": tuple(attributes.get("phases", [])),
+            "delay_factor": first_number(attributes.get("delay-factor", []), 1.0),
+            "max_delay_days": first_number(attributes.get("max-delay-days", []), 14),
+            "probability": PROBABILITY_LABELS.get(attributes.get("probability", ["medium"])[0], "Medium"),
+            "impact": attributes.get("impact", ["schedule-delay"])[0],
+            "mitigation": attributes.get("mitigation", ["add-buffer"])[0]
+        }
+
+    windows = []
+    dated = []
+    for expr in load_metta_file(RISK_CALENDAR_FILE):
+        if not isinstance(expr, list) or not all(isinstance(token, str) for token in expr):
+            continue
+
+        if expr[0] == "risk-window" and len(expr) == 4:
+            regions = risk_types.get(expr[1], {}).get("regions", [])
+            if not regions:
+                logger.warning(f"Risk window for {expr[1]} has no known risk type or regions, skipping")
+                continue
+            for region in regions:
+                window = RiskWindow(date.fromisoformat(expr[2]), date.fromisoformat(expr[3]), expr[1], expr[1], region)
+                windows.append(window)
+                dated.append(window)
+
+        elif expr[0] == "risk-recurring" and len(expr) == 4:
+            for year in RECURRING_YEARS:
+                start = date.fromisoformat(f"{year}-{expr[2]}")
+                end = date.fromisoformat(f"{year}-{expr[3]}")
+                for region in risk_types.get(expr[1], {}).get("regions", []):
+                    windows.append(RiskWindow(start, end, expr[1], expr[1], region))
+
+        elif expr[0] == "holiday" and len(expr) == 5:
+            windows.append(RiskWindow(date.fromisoformat(expr[3]), date.fromisoformat(expr[4]), "factory-holiday", expr[2], expr[1]))
+            dated.append(windows[-1])
+
+    spans = {}
+    for window in dated:
+        first, last = spans.get(window.risk_type, (window.start, window.end))
+        spans[window.risk_type] = (min(first, window.start), max(last, window.end))
+
+    coverage_from = max([date(RECURRING_YEARS.start, 1, 1)] + [date(first.year, 1, 1) for first, _ in spans.values()])
+    coverage_until = min([date(RECURRING_YEARS.stop - 1, 12, 31)] + [date(last.year, 12, 31) for _, last in spans.values()])
+
+    return RiskCalendar(risk_types, windows, (coverage_from, coverage_until))
+
+
+@lru_cache(maxsize=None)
+def get_risk_calendar() -> RiskCalendar:
+    calendar = load_risk_calendar()
+    logger.info(f"Risk calendar loaded with {sum(len(tree.windows) for tree in calendar.trees.values())} windows")
+    return calendar
@@ -0,0 +1,182 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import re
+
+import numpy as np
+
+from utils.metta_facts import iter_entities, parse_number
+
+logger = logging.getLogger(__name__)
+
+SIZE_RUN_FILES = ("materials_database.metta", "fashion_ontology.metta")
+SIZE_ORDER = ("XS", "S", "M", "L", "XL", "XXL", "3XL", "4XL")
+SIZE_ALIASES = {"2XL": "XXL", "XXXL": "3XL", "XXXXL": "4XL", "EXTRA-SMALL": "XS", "SMALL": "S", "MEDIUM": "M", "LARGE": "L"}
+DEFAULT_SIZE_RUN = "activewear-standard"
+PRIOR_STRENGTH = 400.0
+LEVEL_STRENGTH = 100.0
+FIT_TAG_WEIGHT = 2
+LEVEL_NAMES = ("category", "fit", "demographic", "region")
+
+_TAG_SPLIT = re.compile(r"[^a-z0-9]+")
+
+SIZE_INDEX = {size: position for position, size in enumerate(SIZE_ORDER)}
+
+
+def normalize_size(size: Optional[str]) -> Optional[str]:
+    if not size:
+        return None
+    size = str(size).strip().upper()
+    size = SIZE_ALIASES.get(size, size)
+    return size if size in SIZE_INDEX else None
+
+
+def normalize_attribute(value: Optional[str]) -> str:
+    return str(value).strip().lower() if value else ""
+
+
+def attribute_tags(value: str) -> set:
+    value = normalize_attribute(value)
+    return ({value} | set(_TAG_SPLIT.split(value))) - {""}
+
+
+@lru_cache(maxsize=None)
+def load_size_runs() -> Dict[str, Dict]:
+    runs = {}
+    for filename in SIZE_RUN_FILES:
+        for name, attributes in iter_entities(filename, "size-run"):
+            shares = np.zeros(len(SIZE_ORDER))
+            for entry in attributes.get("distribution", []):
+                if not isinstance(entry, list) or len(entry) < 2:
+                    continue
+                size = normalize_size(entry[0])
+                if size:
+                    shares[SIZE_INDEX[size]] = parse_number(entry[1], 0.0)
+            if shares.sum() <= 0:
+                continue
+
+            display = attributes.get("display-name") or [name]
+            runs[name] = {
+                "key": name,
+                "name": " ".join(str(token) for token in display).replace("-", " "),
+                "reasoning": " ".join(str(token) for token in attributes.get("reasoning", [])),
+                "shares": shares / shares.sum(),
+                "tags": {normalize_attribute(tag) for tag in attributes.get("match-tags", []) if isinstance(tag, str)} | {name}
+            }
+
+    if not runs:
+        logger.warning("No size-run facts found, falling back to a uniform six-size prior")
+        shares = np.zeros(len(SIZE_ORDER))
+        shares[:6] = 1 / 6
+        runs[DEFAULT_SIZE_RUN] = {"key": DEFAULT_SIZE_RUN, "name": "Uniform Six Size", "reasoning": "", "shares": shares, "tags": set()}
+
+    return runs
+
+
+def select_size_run(category: str, fit_type: str, demographic: str) -> Dict:
+    runs = load_size_runs()
+    fit_tags = attribute_tags(fit_type)
+    other_tags = attribute_tags(category) | attribute_tags(demographic)
+
+    best, best_score = None, 0
+    for run in runs.values():
+        score = FIT_TAG_WEIGHT * len(run["tags"] & fit_tags) + len(run["tags"] & other_tags)
+        if score > best_score:
+            best, best_score = run, score
+
+    return best or runs.get(DEFAULT_SIZE_RUN) or next(iter(runs.values()))
+
+
+def level_keys(category: str, fit_type: str, demographic: str, region: str) -> List[Tuple[str, ...]]:
+    attributes = (category, fit_type, demographic, region)
+    return [attributes[:depth] for depth in range(1, len(attributes) + 1) if attributes[depth - 1]]
+
+
+class SizeCurveStore:
+    def __init__(self, prior_strength: float = PRIOR_STRENGTH, level_strength: float = LEVEL_STRENGTH):
+        self.prior_strength = prior_strength
+        self.level_strength = level_strength
+        self.counts: Dict[Tuple[str, ...], np.ndarray] = {}
+        self.versions: Dict[Tuple[str, ...], int] = {}
+        self.cache: Dict[Tuple[str, ...], Tuple[Tuple[int, ...], Dict]] = {}
+
+    def record(self, size: str, units: float, category: str, fit_type: str = "", demographic: str = "", region: str = ""):
+        size = normalize_size(size)
+        category = normalize_attribute(category)
+        if not size or not category:
+            return False
+
+        keys = level_keys(category, normalize_attribute(fit_type), normalize_attribute(demographic), normalize_attribute(region))
+        for key in keys:
+            counts = self.counts.get(key)
+            if counts is None:
+                counts = self.counts[key] = np.zeros(len(SIZE_ORDER))
+            counts[SIZE_INDEX[size]] += units
+            self.versions[key] = self.versions.get(key, 0) + 1
+        return True
+
+    def record_events(self, events: Iterable[Dict]) -> int:
+        count = 0
+        for event in events:
+            try:
+                units = float(event.get("units", event.get("quantity", 1)) or 0)
+            except (TypeError, ValueError):
+                continue
+            recorded = self.record(
+                event.get("size"),
+                units,
+                event.get("category"),
+                event.get("fit_type") or event.get("fit"),
+                event.get("target_demographic") or event.get("demographic"),
+                event.get("region")
+            )
+            count += int(recorded)
+        return count
+
+    def get_curve(self, category: str, fit_type: str, demographic: str, region: Optional[str] = None) -> Dict:
+        attributes = tuple(normalize_attribute(value) for value in (category, fit_type, demographic, region))
+        keys = level_keys(*attributes)
+        signature = tuple(self.versions.get(key, 0) for key in keys)
+
+        cached = self.cache.get(attributes)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        curve = self.build_curve(attributes, keys)
+        self.cache[attributes] = (signature, curve)
+        return curve
+
+    def build_curve(self, attributes: Tuple[str, ...], keys: List[Tuple[str, ...]]) -> Dict:
+        run = select_size_run(attributes[0], attributes[1], attributes[2])
+        data, data_units, observed = None, 0.0, 0.0
+        support = run["shares"] > 0
+        levels_used = []
+
+        for key in keys:
+            counts = self.counts.get(key)
+            if counts is None or counts.sum() <= 0:
+                continue
+            total = counts.sum()
+            if data is None:
+                data, data_units = counts / total, total
+            else:
+                data = (counts + self.level_strength * data) / (total + self.level_strength)
+            support |= counts > 0
+            observed = total
+            levels_used.append(LEVEL_NAMES[len(key) - 1])
+
+        shares = run["shares"]
+        if data is not None:
+            shares = (data_units * data + self.prior_strength * shares) / (data_units + self.prior_strength)
+
+        percentages = {size: round(float(share * 100), 1) for size, share, keep in zip(SIZE_ORDER, shares, support) if keep}
+
+        return {
+            "name": run["name"] if not levels_used else f"{run['name']} (learned from {int(observed)} units)",
+            "prior": run["key"],
+            "reasoning": run["reasoning"],
+            "source": "sales-history" if levels_used else "knowledge-base",
+            "levels": levels_used,
+            "observed_units": int(observed),
+            "sizes": percentages
+        }
@@ -0,0 +1,108 @@
+from typing import Dict, Optional, Sequence
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCATION = "all"
+
+
+def largest_remainder(total: int, weights: Sequence[float]) -> np.ndarray:
+    weights = np.asarray(weights, dtype=np.float64)
+    if len(weights) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if weights.sum() <= 0:
+        weights = np.ones(len(weights))
+
+    quotas = total * weights / weights.sum()
+    units = np.floor(quotas).astype(np.int64)
+    shortfall = int(total - units.sum())
+    if shortfall > 0:
+        order = np.argsort(-(quotas - units), kind="stable")
+        units[order[:shortfall]] += 1
+
+    return units
+
+
+def round_matrix(values: np.ndarray, row_totals: np.ndarray, col_totals: np.ndarray) -> np.ndarray:
+    if values.shape[1] > values.shape[0]:
+        return round_matrix(values.T, col_totals, row_totals).T
+
+    units = np.floor(values).astype(np.int64)
+    remainders = values - units
+    row_need = np.asarray(row_totals, dtype=np.int64) - units.sum(axis=1)
+    col_need = np.asarray(col_totals, dtype=np.int64) - units.sum(axis=0)
+
+    for column in np.argsort(-col_need, kind="stable"):
+        need = int(col_need[column])
+        if need <= 0:
+            continue
+        priority = row_need * 2.0 + remainders[:, column]
+        rows = np.argpartition(-priority, need - 1)[:need]
+        units[rows, column] += 1
+        row_need[rows] -= 1
+
+    if row_need.any():
+        raise ValueError("Row and column totals are inconsistent with the matrix")
+
+    return units
+
+
+def allocate_sku_units(total_units: int, color_weights: Sequence[float], size_weights: Sequence[float],
+                       location_weights: Optional[Sequence[float]] = None) -> np.ndarray:
+    location_weights = location_weights if location_weights is not None and len(location_weights) else [1.0]
+
+    color_totals = largest_remainder(total_units, color_weights)
+    size_totals = largest_remainder(total_units, size_weights)
+    location_totals = largest_remainder(total_units, location_weights)
+
+    size_shares = np.asarray(size_weights, dtype=np.float64)
+    size_shares = size_shares / size_shares.sum() if size_shares.sum() > 0 else np.full(len(size_shares), 1 / len(size_shares))
+    sku_totals = round_matrix(np.outer(color_totals, size_shares), color_totals, size_totals)
+
+    location_shares = location_totals / max(total_units, 1)
+    cells = round_matrix(np.outer(sku_totals.ravel(), location_shares), sku_totals.ravel(), location_totals)
+
+    return cells.reshape(len(color_totals), len(size_totals), len(location_totals))
+
+
+def build_sku_records(product_name: str, colors: Sequence[str], sizes: Sequence[str],
+                      locations: Sequence[str], units: np.ndarray) -> np.ndarray:
+    prefix = product_name[:3].upper()
+    codes = [f"{prefix}-{color[:3].upper()}-{size}" for color in colors for size in sizes]
+    location_count = len(locations)
+    cell_count = len(codes) * location_count
+
+    dtype = [
+        ("sku_code", f"U{max((len(code) for code in codes), default=1)}"),
+        ("color", f"U{max((len(color) for color in colors), default=1)}"),
+        ("size", f"U{max((len(size) for size in sizes), default=1)}"),
+        ("location", f"U{max((len(location) for location in locations), default=1)}"),
+        ("units", np.int64)
+    ]
+    records = np.empty(cell_count, dtype=dtype)
+    records["sku_code"] = np.repeat(codes, location_count)
+    records["color"] = np.repeat(colors, len(sizes) * location_count)
+    records["size"] = np.tile(np.repeat(sizes, location_count), len(colors))
+    records["location"] = np.tile(locations, len(codes))
+    records["units"] = units.reshape(-1)
+
+    return records
+
+
+def generate_sku_records(product_name: str, total_units: int, color_weights: Dict[str, float],
+                         size_weights: Dict[str, float],
+                         location_weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    location_weights = location_weights or {DEFAULT_LOCATION: 1.0}
+
+    units = allocate_sku_units(
+        total_units,
+        list(color_weights.values()),
+        list(size_weights.values()),
+        list(location_weights.values())
+    )
+    records = build_sku_records(product_name, list(color_weights), list(size_weights), list(location_weights), units)
+
+    logger.info(f"SKU matrix allocated {total_units} units across {len(records)} SKU-location cells")
+    return records
@@ -0,0 +1,320 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+import logging
+import mmap
+import os
+import zlib
+
+import numpy as np
+
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+STORE_MAGIC = 0x534B5553
+STORE_VERSION = 1
+HEADER_FIELDS = 8
+CODE_BYTES = 32
+INITIAL_CAPACITY = 4096
+MAX_LOAD_FACTOR = 0.5
+SECTION_ALIGNMENT = 64
+
+COLUMNS = (
+    ("on_hand", np.float32),
+    ("on_order", np.float32),
+    ("velocity", np.float32),
+    ("reorder_point", np.float32),
+    ("updated_at", np.int32)
+)
+COLUMN_NAMES = tuple(name for name, _ in COLUMNS)
+
+
+def code_hash(code: bytes) -> int:
+    return zlib.crc32(code)
+
+
+def align(offset: int) -> int:
+    return -(-offset // SECTION_ALIGNMENT) * SECTION_ALIGNMENT
+
+
+def store_layout(capacity: int, code_bytes: int) -> Dict[str, tuple]:
+    slots = 1 << max(int(np.ceil(np.log2(capacity / MAX_LOAD_FACTOR))), 1)
+    sections = [("header", np.int64, HEADER_FIELDS), ("slots", np.int32, slots), ("codes", f"S{code_bytes}", capacity)]
+    sections += [(name, dtype, capacity) for name, dtype in COLUMNS]
+
+    layout, offset = {}, 0
+    for name, dtype, count in sections:
+        offset = align(offset)
+        layout[name] = (np.dtype(dtype), count, offset)
+        offset += np.dtype(dtype).itemsize * count
+    layout["size"] = (None, None, align(offset))
+    return layout
+
+
+class SkuStore:
+    def __init__(self, path: Optional[Union[str, Path]] = None, capacity: int = INITIAL_CAPACITY,
+                 code_bytes: int = CODE_BYTES):
+        self.path = Path(path) if path else None
+        self.buffer = None
+        self.handle = None
+
+        if self.path and self.path.exists():
+            self.open_existing()
+        else:
+            self.create(capacity, code_bytes)
+
+    def create(self, capacity: int, code_bytes: int):
+        layout = store_layout(capacity, code_bytes)
+        size = layout["size"][2]
+
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            staging = self.path.with_suffix(self.path.suffix + ".tmp")
+            with staging.open("wb") as handle:
+                handle.truncate(size)
+            self.map_file(staging, layout)
+        else:
+            self.buffer = bytearray(size)
+            self.bind(layout)
+
+        self.header[:] = (STORE_MAGIC, STORE_VERSION, 0, capacity, code_bytes, 0, 0, 0)
+        self.slots[:] = -1
+
+        if self.path:
+            self.flush()
+            self.release()
+            os.replace(staging, self.path)
+            self.open_existing()
+
+    def open_existing(self):
+        with self.path.open("rb") as handle:
+            header = np.frombuffer(handle.read(HEADER_FIELDS * 8), dtype=np.int64)
+        if len(header) < HEADER_FIELDS or header[0] != STORE_MAGIC or header[1] != STORE_VERSION:
+            raise ValueError(f"{self.path} is not a SKU store")
+
+        self.map_file(self.path, store_layout(int(header[3]), int(header[4])))
+        logger.info(f"Opened SKU store {self.path.name} with {len(self)} SKUs")
+
+    def map_file(self, path: Path, layout: Dict[str, tuple]):
+        self.handle = path.open("r+b")
+        self.buffer = mmap.mmap(self.handle.fileno(), layout["size"][2])
+        self.bind(layout)
+
+    def bind(self, layout: Dict[str, tuple]):
+        self.layout = layout
+        for name, (dtype, count, offset) in layout.items():
+            if dtype is not None:
+                setattr(self, name, np.frombuffer(self.buffer, dtype=dtype, count=count, offset=offset))
+
+    def release(self):
+        for name, (dtype, _, _) in self.layout.items():
+            if dtype is not None:
+                setattr(self, name, None)
+        if isinstance(self.buffer, mmap.mmap):
+            try:
+                self.buffer.close()
+            except BufferError:
+                logger.warning("SKU store mapping still referenced, leaving it to close on release")
+        if self.handle:
+            self.handle.close()
+        self.buffer = self.handle = None
+
+    def __len__(self) -> int:
+        return int(self.header[2])
+
+    @property
+    def capacity(self) -> int:
+        return int(self.header[3])
+
+    @property
+    def code_bytes(self) -> int:
+        return int(self.header[4])
+
+    def accepts(self, code: str) -> bool:
+        return len(str(code).encode("utf-8")) <= self.code_bytes
+
+    def encode(self, code: str) -> bytes:
+        encoded = str(code).encode("utf-8")
+        if len(encoded) > self.code_bytes:
+            raise ValueError(f"SKU code {code!r} exceeds {self.code_bytes} bytes")
+        return encoded
+
+    def probe(self, encoded: bytes) -> int:
+        mask = len(self.slots) - 1
+        slot = code_hash(encoded) & mask
+        while True:
+            sku_id = self.slots[slot]
+            if sku_id < 0 or self.codes[sku_id] == encoded:
+                return slot
+            slot = (slot + 1) & mask
+
+    def lookup(self, code: str) -> Optional[int]:
+        sku_id = int(self.slots[self.probe(self.encode(code))])
+        return sku_id if sku_id >= 0 else None
+
+    def lookup_many(self, codes: Sequence[str]) -> np.ndarray:
+        ids = np.full(len(codes), -1, dtype=np.int64)
+        rows = [row for row, code in enumerate(codes) if self.accepts(code)]
+        if rows:
+            encoded = np.array([self.encode(codes[row]) for row in rows], dtype=f"S{self.code_bytes}")
+            ids[rows] = self.find_many(encoded)
+        return ids
+
+    def intern(self, code: str) -> int:
+        encoded = self.encode(code)
+        slot = self.probe(encoded)
+        sku_id = int(self.slots[slot])
+        if sku_id >= 0:
+            return sku_id
+
+        if len(self) >= self.capacity:
+            self.grow()
+            slot = self.probe(encoded)
+
+        sku_id = len(self)
+        self.codes[sku_id] = encoded
+        for name in COLUMN_NAMES:
+            getattr(self, name)[sku_id] = 0
+        self.slots[slot] = sku_id
+        self.header[2] = sku_id + 1
+        return sku_id
+
+    def intern_many(self, codes: Iterable[str]) -> np.ndarray:
+        encoded = np.array([self.encode(code) for code in codes], dtype=f"S{self.code_bytes}")
+        if not len(encoded):
+            return np.zeros(0, dtype=np.int64)
+
+        unique, first, inverse = np.unique(encoded, return_index=True, return_inverse=True)
+        ids = self.find_many(unique)
+        missing = np.nonzero(ids < 0)[0]
+        missing = missing[np.argsort(first[missing], kind="stable")]
+
+        if len(missing):
+            while len(self) + len(missing) > self.capacity:
+                self.grow()
+            new_ids = np.arange(len(self), len(self) + len(missing))
+            self.codes[new_ids] = unique[missing]
+            for name in COLUMN_NAMES:
+                getattr(self, name)[new_ids] = 0
+            self.insert_slots(unique[missing], new_ids)
+            self.header[2] = new_ids[-1] + 1
+            ids[missing] = new_ids
+
+        return ids[inverse]
+
+    def home_slots(self, encoded: np.ndarray) -> np.ndarray:
+        return np.array([code_hash(code) for code in encoded.tolist()], dtype=np.int64) & (len(self.slots) - 1)
+
+    def find_many(self, encoded: np.ndarray) -> np.ndarray:
+        mask = len(self.slots) - 1
+        target = self.home_slots(encoded)
+        ids = np.full(len(encoded), -1, dtype=np.int64)
+        pending = np.arange(len(encoded))
+
+        while len(pending):
+            found = self.slots[target[pending]].astype(np.int64)
+            occupied = found >= 0
+            match = occupied & (self.codes[np.maximum(found, 0)] == encoded[pending])
+            ids[pending[match]] = found[match]
+            pending = pending[occupied & ~match]
+            target[pending] = (target[pending] + 1) & mask
+
+        return ids
+
+    def grow(self):
+        count, capacity, code_bytes = len(self), self.capacity * 2, self.code_bytes
+        old = {name: getattr(self, name)[:count].copy() for name in ("codes",) + COLUMN_NAMES}
+        path = self.path
+        self.release()
+        self.path = path.with_suffix(path.suffix + ".grow") if path else None
+        self.create(capacity, code_bytes)
+
+        self.insert_slots(old["codes"], np.arange(count))
+        for name, values in old.items():
+            getattr(self, name)[:count] = values
+        self.header[2] = count
+
+        if path:
+            self.flush()
+            self.release()
+            os.replace(self.path, path)
+            self.path = path
+            self.open_existing()
+        logger.info(f"Grew SKU store to {capacity} SKUs")
+
+    def insert_slots(self, encoded: np.ndarray, ids: np.ndarray):
+        mask = len(self.slots) - 1
+        target = self.home_slots(encoded)
+        pending = np.arange(len(encoded))
+
+        while len(pending):
+            free = self.slots[target[pending]] < 0
+            claimed, first = np.unique(target[pending[free]], return_index=True)
+            self.slots[claimed] = ids[pending[free][first]]
+
+            placed = np.zeros(len(pending), dtype=bool)
+            placed[np.nonzero(free)[0][first]] = True
+            pending = pending[~placed]
+            target[pending] = (target[pending] + 1) & mask
+
+    def code(self, sku_id: int) -> str:
+        return self.codes[sku_id].decode("utf-8")
+
+    def column(self, name: str) -> np.ndarray:
+        return getattr(self, name)[:len(self)]
+
+    def get(self, code: str) -> Optional[Dict]:
+        sku_id = self.lookup(code)
+        if sku_id is None:
+            return None
+        record = {name: getattr(self, name)[sku_id].item() for name in COLUMN_NAMES}
+        record["sku_code"] = code
+        return record
+
+    def set(self, code: str, **values):
+        sku_id = self.intern(code)
+        for name, value in values.items():
+            getattr(self, name)[sku_id] = value
+        return sku_id
+
+    def add(self, code: str, name: str, delta: float) -> int:
+        sku_id = self.intern(code)
+        getattr(self, name)[sku_id] += delta
+        return sku_id
+
+    def update_many(self, codes: Sequence[str], name: str, values: Sequence[float], accumulate: bool = False) -> np.ndarray:
+        ids = self.intern_many(codes)
+        column = getattr(self, name)
+        if accumulate:
+            np.add.at(column, ids, np.asarray(values, dtype=column.dtype))
+        else:
+            column[ids] = values
+        return ids
+
+    def codes_for(self, ids: np.ndarray) -> List[str]:
+        return [code.decode("utf-8") for code in self.codes[ids].tolist()]
+
+    def below_reorder_point(self, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        count = len(self)
+        ids = np.arange(count) if ids is None else np.asarray(ids, dtype=np.int64)
+        position = self.on_hand[ids] + self.on_order[ids]
+        return ids[(self.reorder_point[ids] > 0) & (position <= self.reorder_point[ids])]
+
+    def weeks_of_cover(self) -> np.ndarray:
+        velocity = self.column("velocity")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(velocity > 0, self.column("on_hand") / velocity, np.inf)
+
+    def flush(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.flush()
+
+    def close(self):
+        self.flush()
+        self.release()
+
+
+def open_sku_store(name: str) -> SkuStore:
+    if not Config.SKU_STORE_DIR:
+        return SkuStore()
+    return SkuStore(Path(Config.SKU_STORE_DIR) / f"{name}.skus")
@@ -0,0 +1,195 @@
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from utils.metta_facts import first_number, iter_entities, load_metta_file
+
+logger = logging.getLogger(__name__)
+
+SUPPLIER_FILES = ["supplier_intelligence.metta", "suppliers.metta"]
+
+MOQ_BANDS = [100, 250, 500, 1000, 2000]
+
+DEFAULT_DEPOSIT_PCT = 0.30
+NEUTRAL_SUCCESS_RATE = 0.50
+
+
+def normalize_word(word: str) -> str:
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def split_tag(tag: str, singular: bool = True) -> List[str]:
+    words = [word for word in tag.strip().lower().replace(" ", "-").split("-") if word]
+    return [normalize_word(word) for word in words] if singular else words
+
+
+def normalize_tag(tag: str, singular: bool = True) -> str:
+    return "-".join(split_tag(tag, singular))
+
+
+def expand_tags(tags: Iterable[str], singular: bool = True) -> set:
+    expanded = set()
+    for tag in tags:
+        if not isinstance(tag, str):
+            continue
+        words = split_tag(tag, singular)
+        for start in range(len(words)):
+            for end in range(start + 1, len(words) + 1):
+                expanded.add("-".join(words[start:end]))
+    return expanded
+
+
+def moq_band(moq: float) -> str:
+    for limit in MOQ_BANDS:
+        if moq <= limit:
+            return f"<={limit}"
+    return f">{MOQ_BANDS[-1]}"
+
+
+def format_location(tokens: List[str], country_first: bool) -> str:
+    country = tokens[0] if country_first else tokens[-1]
+    name = country.replace("-", " ")
+    return name.upper() if len(name) <= 3 else name.title()
+
+
+def build_supplier_record(name: str, attributes: Dict, source: str) -> Optional[Dict]:
+    moq_standard = first_number(attributes.get("moq-standard", []))
+    moq_negotiable = first_number(attributes.get("moq-negotiable", []), moq_standard)
+    if moq_standard is None:
+        logger.warning(f"Supplier {name} in {source} has no moq-standard, skipping")
+        return None
+
+    raw_location = [token for token in attributes.get("location", []) if isinstance(token, str)]
+    country_first = len(raw_location) == 1
+    location_tokens = raw_location[0].split("-") if country_first else raw_location
+    location = format_location(location_tokens, country_first) if location_tokens else "Unknown"
+
+    success_rate = first_number(attributes.get("moq-negotiation-success-rate", []))
+    deposit = first_number(attributes.get("payment-terms", []))
+
+    return {
+        "name": name,
+        "source": source,
+        "specialization": [tag for tag in attributes.get("specialization", []) if isinstance(tag, str)],
+        "certifications": [cert for cert in attributes.get("certifications", []) if isinstance(cert, str)],
+        "moq_standard": int(moq_standard),
+        "moq_negotiable": int(moq_negotiable),
+        "success_rate": success_rate / 100 if success_rate is not None else None,
+        "success_rate_source": "knowledge-base" if success_rate is not None else "unknown",
+        "labor_rate": first_number(attributes.get("labor-cost-per-minute", [])),
+        "cost_per_unit": first_number(attributes.get("cost-per-unit", [])),
+        "overhead_pct": first_number(attributes.get("overhead-percentage", []), 15) / 100,
+        "deposit_pct": deposit / 100 if deposit is not None else DEFAULT_DEPOSIT_PCT,
+        "lead_time_days": first_number(attributes.get("lead-time", []) or attributes.get("lead-time-bulk-standard", [])),
+        "location": location,
+        "location_tags": sorted(expand_tags(location_tokens, singular=False))
+    }
+
+
+def load_supplier_records() -> List[Dict]:
+    records = []
+    seen = set()
+
+    for filename in SUPPLIER_FILES:
+        for name, attributes in iter_entities(filename, "supplier"):
+            if name in seen:
+                continue
+            record = build_supplier_record(name, attributes, filename)
+            if record:
+                seen.add(name)
+                records.append(record)
+
+    return records
+
+
+class SupplierIndex:
+    def __init__(self, records: List[Dict]):
+        self.records = records
+        self.all_mask = (1 << len(records)) - 1
+        self.postings = {"specialization": {}, "location": {}, "certification": {}, "moq_band": {}}
+
+        for position, record in enumerate(records):
+            bit = 1 << position
+            for tag in expand_tags(record["specialization"]):
+                self.postings["specialization"][tag] = self.postings["specialization"].get(tag, 0) | bit
+            for tag in record["location_tags"]:
+                self.postings["location"][tag] = self.postings["location"].get(tag, 0) | bit
+            for cert in record["certifications"]:
+                key = cert.lower()
+                self.postings["certification"][key] = self.postings["certification"].get(key, 0) | bit
+            band = moq_band(record["moq_negotiable"])
+            self.postings["moq_band"][band] = self.postings["moq_band"].get(band, 0) | bit
+
+        known_rates = [record["success_rate"] for record in records if record["success_rate"] is not None]
+        self.unknown_success_rate = min(known_rates) if known_rates else NEUTRAL_SUCCESS_RATE
+
+        order = sorted(range(len(records)), key=lambda position: records[position]["moq_negotiable"])
+        self.moq_values = [records[position]["moq_negotiable"] for position in order]
+        self.moq_prefix_masks = [0]
+        for position in order:
+            self.moq_prefix_masks.append(self.moq_prefix_masks[-1] | (1 << position))
+
+    def lookup(self, field: str, value: str) -> int:
+        if field == "certification":
+            return self.postings[field].get(value.lower(), 0)
+        if field == "moq_band":
+            return self.postings[field].get(value, 0)
+
+        mask = 0
+        for tag in expand_tags([value], singular=False) if field == "location" else [normalize_tag(value)]:
+            mask |= self.postings[field].get(tag, 0)
+        return mask
+
+    def planning_success_rate(self, record: Dict) -> float:
+        if record["success_rate"] is not None:
+            return record["success_rate"]
+        return self.unknown_success_rate
+
+    def max_moq_mask(self, max_moq: float) -> int:
+        return self.moq_prefix_masks[bisect_right(self.moq_values, max_moq)]
+
+    def match_mask(self, category: Optional[str] = None, location: Optional[str] = None,
+                   certifications: Optional[List[str]] = None, max_moq: Optional[float] = None,
+                   band: Optional[str] = None) -> int:
+        mask = self.all_mask
+
+        if category:
+            mask &= self.lookup("specialization", category)
+        if location:
+            mask &= self.lookup("location", location)
+        for cert in certifications or []:
+            mask &= self.lookup("certification", cert)
+        if band:
+            mask &= self.lookup("moq_band", band)
+        if max_moq is not None:
+            mask &= self.max_moq_mask(max_moq)
+
+        return mask
+
+    def records_for(self, mask: int) -> List[Dict]:
+        matches = []
+        while mask:
+            low_bit = mask & -mask
+            matches.append(self.records[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return matches
+
+    def query(self, category: Optional[str] = None, location: Optional[str] = None,
+              certifications: Optional[List[str]] = None, max_moq: Optional[float] = None,
+              band: Optional[str] = None) -> List[Dict]:
+        return self.records_for(self.match_mask(category, location, certifications, max_moq, band))
+
+
+@lru_cache(maxsize=None)
+def get_supplier_index() -> SupplierIndex:
+    records = load_supplier_records()
+    logger.info(f"Supplier index built with {len(records)} suppliers")
+    return SupplierIndex(records)
+
+
+def reload_supplier_index():
+    load_metta_file.cache_clear()
+    get_supplier_index.cache_clear()